@@ -23,6 +23,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "guide.routing.ReplicaPinMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -31,8 +32,40 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Development slow-query log: SQL slower than the threshold (ms) is written to
+# SLOW_QUERY_LOG_DIR with its call site and EXPLAIN plan, one JSON file per request.
+SLOW_QUERY_LOG = DEBUG and os.environ.get("DJANGO_SLOW_QUERY_LOG", "1") == "1"
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get("DJANGO_SLOW_QUERY_MS", "50"))
+SLOW_QUERY_LOG_DIR = BASE_DIR / "querylog"
+
+if SLOW_QUERY_LOG:
+    MIDDLEWARE.insert(0, "guide.querylog.SlowQueryLogMiddleware")
+
 ROOT_URLCONF = "antkeeping_guide.urls"
 
+# Shared cache for bookmarks, sessions (SESSION_BACKEND=cache) and friends.
+# Without DJANGO_REDIS_URL (which needs the redis package) each process keeps
+# its own in-memory cache.
+if os.environ.get("DJANGO_REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["DJANGO_REDIS_URL"],
+        }
+    }
+
+# Sessions: guide.sessions wraps one of Django's stores so unchanged
+# sessions are never re-saved. SESSION_BACKEND picks the store:
+# "db" (default, Django's usual store), "cached_db", "cache" (needs
+# DJANGO_REDIS_URL when running several workers) or, opt-in,
+# "signed_cookies": no server-side writes at all, but nothing server-side to
+# revoke either, so logging out or changing a password cannot invalidate a
+# copied cookie, and switching to it logs every user out once.
+# `manage.py clearsessions` removes expired database sessions in batches;
+# `manage.py session_write_report` measures writes per 1,000 requests.
+SESSION_ENGINE = "guide.sessions"
+SESSION_BACKEND = os.environ.get("DJANGO_SESSION_BACKEND", "db")
+
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
@@ -68,9 +101,37 @@ else:
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
             "NAME": BASE_DIR / "db.sqlite3",
+            # Wait for the write lock instead of failing when replies arrive together.
+            "OPTIONS": {"timeout": 20},
+            # A file, not the default in-memory database: threads in the
+            # concurrency tests then wait for the lock instead of failing
+            # with "database table is locked".
+            "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
         }
     }
 
+# Read replicas. GET requests read from a random replica (guide.routing),
+# writes and everything else use "default", and a browser that just POSTed
+# (or whose request wrote anything) reads from the primary for
+# REPLICA_PIN_SECONDS so it sees its own changes.
+# Postgres: DB_REPLICA_HOSTS=host1,host2 (same name and credentials).
+# Local: DJANGO_SQLITE_REPLICA=replica.sqlite3 opens that file read-only as a
+# stand-in replica; `manage.py sync_sqlite_replica` copies the primary into it.
+DATABASE_REPLICAS = []
+if os.environ.get("DB_NAME"):
+    for n, host in enumerate(filter(None, os.environ.get("DB_REPLICA_HOSTS", "").split(",")), 1):
+        DATABASES[f"replica{n}"] = dict(DATABASES["default"], HOST=host.strip(), TEST={"MIRROR": "default"})
+        DATABASE_REPLICAS.append(f"replica{n}")
+elif os.environ.get("DJANGO_SQLITE_REPLICA"):
+    DATABASES["replica"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": f"file:{Path(os.environ['DJANGO_SQLITE_REPLICA']).resolve()}?mode=ro",
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append("replica")
+DATABASE_ROUTERS = ["guide.routing.ReplicaRouter"]
+REPLICA_PIN_SECONDS = int(os.environ.get("REPLICA_PIN_SECONDS", "10"))
+
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
     {"NAME": "django.contrib.auth.password_validation.MinimumLengthValidator"},
@@ -86,11 +147,98 @@ USE_TZ = True
 STATIC_URL = "/static/"
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
+# collectstatic writes content-hashed names plus .gz/.br variants so nginx can
+# serve them pre-compressed with a one-year immutable Cache-Control.
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "guide.storage.CompressedManifestStaticFilesStorage"},
+}
+
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Media is served by guide.delivery: behind nginx the response is just an
+# X-Accel-Redirect into MEDIA_ACCEL_PREFIX (an `internal` location aliasing
+# MEDIA_ROOT); without nginx (runserver) Django streams the file itself.
+# Content-hashed names get the immutable max-age, other files the short one.
+MEDIA_ACCEL_REDIRECT = os.environ.get("DJANGO_MEDIA_ACCEL_REDIRECT", "0" if DEBUG else "1") == "1"
+MEDIA_ACCEL_PREFIX = "/protected-media/"
+MEDIA_IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+MEDIA_MAX_AGE = 60 * 60
+
+# Species thumbnails: uploads are capped at THUMBNAIL_MAX_DIMENSION pixels
+# and get WebP/JPEG copies at these widths for srcset (guide.thumbnails;
+# `manage.py build_thumbnails` backfills existing images).
+THUMBNAIL_WIDTHS = (320, 640, 960)
+THUMBNAIL_MAX_DIMENSION = int(os.environ.get("THUMBNAIL_MAX_DIMENSION", "2048"))
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Flood protection for write endpoints. Each budget is (burst size, seconds to
+# refill it), applied separately per user and per client IP.
+RATELIMIT_ENABLED = os.environ.get("DJANGO_RATELIMIT", "1") == "1"
+RATELIMIT_BACKEND = os.environ.get("DJANGO_RATELIMIT_BACKEND", "guide.ratelimit.CacheBackend")
+RATELIMIT_IP_HEADER = "HTTP_X_REAL_IP"
+# RATELIMIT_IP_HEADER is only trusted on requests from these addresses (the
+# nginx in front of gunicorn).
+RATELIMIT_TRUSTED_PROXIES = os.environ.get("DJANGO_RATELIMIT_TRUSTED_PROXIES", "127.0.0.1,::1").split(",")
+RATELIMIT_BUDGETS = {
+    "flights_add": (10, 600),
+    "forum_post": (6, 60),
+    "forum_thread_create": (3, 300),
+    "suggestion_create": (5, 3600),
+    "register": (5, 3600),
+}
+
+# Reports of the same species within this distance and day window are merged
+# into one FlightEvent. Run `manage.py cluster_flights` after changing them.
+FLIGHT_DEDUP_DISTANCE_KM = float(os.environ.get("FLIGHT_DEDUP_DISTANCE_KM", "5"))
+FLIGHT_DEDUP_DAYS = int(os.environ.get("FLIGHT_DEDUP_DAYS", "1"))
+
+# New forum posts at least this similar (Jaccard over word shingles) to a post
+# from the last SPAM_WINDOW_DAYS days are held for review (guide.spam).
+SPAM_SIMILARITY = float(os.environ.get("SPAM_SIMILARITY", "0.5"))
+SPAM_WINDOW_DAYS = int(os.environ.get("SPAM_WINDOW_DAYS", "30"))
+
+# Flight season model written by `manage.py train_flight_model`, which
+# deploy/entrypoint.sh runs on every start; rerun it (e.g. nightly) to
+# pick up new reports without a deploy.
+FLIGHT_MODEL_PATH = BASE_DIR / "var" / "flight_season.npz"
+
+# Offline reverse geocoding for flight reports. The dataset is compiled into
+# GEOCODER_INDEX_DIR by `manage.py build_geocoder` (or on first use).
+GEOCODER_DATASET = os.environ.get("GEOCODER_DATASET", str(BASE_DIR / "guide" / "data" / "admin_areas.csv"))
+GEOCODER_INDEX_DIR = BASE_DIR / "var" / "geocoder"
+# Further than this from every reference point (open sea, say) gets no code.
+# Stored codes keep the old limit until `manage.py geocode_flights --all`.
+GEOCODER_MAX_DISTANCE_KM = float(os.environ.get("GEOCODER_MAX_DISTANCE_KM", "300"))
+
+# Activity digests (`manage.py send_activity_digest`). Locally mail goes to
+# the console; set DJANGO_EMAIL_BACKEND to the file backend to keep copies in
+# EMAIL_FILE_PATH, or to the SMTP backend in production.
+EMAIL_BACKEND = os.environ.get("DJANGO_EMAIL_BACKEND", "django.core.mail.backends.console.EmailBackend")
+EMAIL_FILE_PATH = BASE_DIR / "var" / "mail"
+EMAIL_HOST = os.environ.get("DJANGO_EMAIL_HOST", "localhost")
+EMAIL_PORT = int(os.environ.get("DJANGO_EMAIL_PORT", "25"))
+EMAIL_HOST_USER = os.environ.get("DJANGO_EMAIL_HOST_USER", "")
+EMAIL_HOST_PASSWORD = os.environ.get("DJANGO_EMAIL_HOST_PASSWORD", "")
+EMAIL_USE_TLS = os.environ.get("DJANGO_EMAIL_USE_TLS", "0") == "1"
+DEFAULT_FROM_EMAIL = os.environ.get("DJANGO_DEFAULT_FROM_EMAIL", "webmaster@localhost")
+SITE_URL = os.environ.get("SITE_URL", "http://localhost:8000")
+
+# Live updates (server-sent events) for forum threads and the flight map.
+# The default broker only reaches clients of the same process; point
+# LIVE_BROKER at a shared (e.g. Redis) broker when running several workers.
+# Each stream holds a worker thread, so LIVE_MAX_CONNECTIONS per process
+# must stay below gunicorn's --threads. A client whose queue of
+# LIVE_QUEUE_SIZE events fills up is told to resync instead.
+LIVE_BROKER = os.environ.get("LIVE_BROKER", "guide.live.InProcessBroker")
+LIVE_MAX_CONNECTIONS = int(os.environ.get("LIVE_MAX_CONNECTIONS", "8"))
+LIVE_QUEUE_SIZE = 100
+LIVE_HEARTBEAT = 15
+LIVE_MAX_LIFETIME = 300
+LIVE_RETRY_MS = 5000
+
 LOGIN_REDIRECT_URL = "guide:home"
 LOGOUT_REDIRECT_URL = "guide:home"
 LOGIN_URL = "login"
@@ -2,10 +2,19 @@
 set -e
 
 python manage.py migrate --noinput
+python manage.py cluster_flights --unclustered
+python manage.py geocode_flights
+python manage.py train_flight_model
+python manage.py build_thumbnails
+python manage.py render_forum_posts
+python manage.py index_post_shingles
+python manage.py clearsessions
 
 gunicorn antkeeping_guide.wsgi:application \
     --bind 0.0.0.0:8000 \
     --workers 3 \
+    --worker-class gthread \
+    --threads 16 \
     --log-level info &
 
 nginx -g "daemon off;"
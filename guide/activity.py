@@ -0,0 +1,182 @@
+from itertools import groupby
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Activity, ForumPost, InboxItem, SpeciesBookmark
+
+
+FAN_OUT_BATCH = 1000
+
+
+def fan_out(activity, user_ids):
+    # Copy the activity into each follower's inbox with batched inserts.
+    # `user_ids` may be a lazy values_list; it is streamed, never loaded
+    # whole, and the actor is skipped.
+    batch, total = [], 0
+    for user_id in user_ids:
+        if user_id == activity.actor_id:
+            continue
+        batch.append(InboxItem(user_id=user_id, activity=activity, created_at=activity.created_at))
+        if len(batch) >= FAN_OUT_BATCH:
+            InboxItem.objects.bulk_create(batch, ignore_conflicts=True)
+            total += len(batch)
+            batch = []
+    if batch:
+        InboxItem.objects.bulk_create(batch, ignore_conflicts=True)
+        total += len(batch)
+    return total
+
+
+def species_followers(species_id):
+    return (
+        SpeciesBookmark.objects.filter(species_id=species_id)
+        .values_list("user_id", flat=True)
+        .iterator(chunk_size=FAN_OUT_BATCH)
+    )
+
+
+def thread_followers(thread_id):
+    return (
+        ForumPost.objects.filter(thread_id=thread_id)
+        .values_list("author_id", flat=True)
+        .distinct()
+        .iterator(chunk_size=FAN_OUT_BATCH)
+    )
+
+
+def publish(verb, summary, url, followers, species=None, actor=None):
+    # Record the activity and fan it out once the surrounding transaction
+    # commits, so a rolled-back post never notifies anyone.
+    def deliver():
+        with transaction.atomic():
+            activity = Activity.objects.create(
+                verb=verb,
+                species=species,
+                actor=actor,
+                summary=summary[:255],
+                url=url,
+            )
+            fan_out(activity, followers())
+
+    transaction.on_commit(deliver)
+
+
+def flight_reported(flight):
+    publish(
+        "flight",
+        f"{flight.species.display_name()} flying at {flight.location_name} on {flight.date:%b %d}",
+        reverse("guide:species_detail", kwargs={"slug": flight.species.slug}),
+        lambda: species_followers(flight.species_id),
+        species=flight.species,
+        actor=flight.user,
+    )
+
+
+def thread_started(thread):
+    publish(
+        "thread",
+        f"New thread about {thread.species.display_name()}: {thread.title}",
+        reverse("guide:forum_thread", kwargs={"pk": thread.pk}),
+        lambda: species_followers(thread.species_id),
+        species=thread.species,
+        actor=thread.author,
+    )
+
+
+def post_replied(post):
+    publish(
+        "reply",
+        f"{post.author.username} replied in {post.thread.title}",
+        reverse("guide:forum_thread", kwargs={"pk": post.thread_id}),
+        lambda: thread_followers(post.thread_id),
+        species=post.thread.species,
+        actor=post.author,
+    )
+
+
+def care_edited(care, actor=None):
+    publish(
+        "care",
+        f"Care guide updated for {care.species.display_name()}",
+        reverse("guide:species_detail", kwargs={"slug": care.species.slug}),
+        lambda: species_followers(care.species_id),
+        species=care.species,
+        actor=actor,
+    )
+
+
+DIGEST_SEND_BATCH = 100
+
+
+def skip_opted_out(now):
+    # Users who opted out (or have no address) never get a digest; retire
+    # their pending rows in one UPDATE so later runs do not scan them.
+    return (
+        InboxItem.objects.filter(digested_at__isnull=True)
+        .filter(Q(user__profile__receive_email_updates=False) | Q(user__email="") | Q(user__is_active=False))
+        .update(digested_at=now)
+    )
+
+
+def digest_message(user, items, per_user):
+    shown = items[:per_user]
+    body = render_to_string(
+        "guide/email/activity_digest.txt",
+        {
+            "user": user,
+            "items": shown,
+            "more": len(items) - len(shown),
+            "site_url": settings.SITE_URL.rstrip("/"),
+        },
+    )
+    subject = f"{len(items)} update{'s' if len(items) != 1 else ''} from the Ant Keeping Guide"
+    return EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [user.email])
+
+
+def send_digests(per_user=20, dry_run=False, connection=None):
+    # Email every user their pending inbox items, one message each, sent
+    # through the configured EMAIL_BACKEND a batch of users at a time.
+    # Returns (messages sent, items covered, items skipped).
+    now = timezone.now()
+    skipped = 0 if dry_run else skip_opted_out(now)
+    pending = InboxItem.objects.filter(digested_at__isnull=True)
+    if dry_run:
+        pending = pending.filter(user__profile__receive_email_updates=True, user__is_active=True).exclude(user__email="")
+
+    connection = connection or get_connection()
+    sent = covered = 0
+    last_user_id = 0
+    while True:
+        # Walk users in id order; each batch is read in full before its
+        # rows are marked, so no cursor is open while we write.
+        user_ids = list(
+            pending.filter(user_id__gt=last_user_id)
+            .order_by("user_id")
+            .values_list("user_id", flat=True)
+            .distinct()[:DIGEST_SEND_BATCH]
+        )
+        if not user_ids:
+            break
+        last_user_id = user_ids[-1]
+        items = (
+            pending.filter(user_id__in=user_ids)
+            .select_related("user", "user__profile", "activity")
+            .order_by("user_id", "-id")
+        )
+        messages, item_ids = [], []
+        for _, rows in groupby(items, key=lambda item: item.user_id):
+            rows = list(rows)
+            messages.append(digest_message(rows[0].user, rows, per_user))
+            item_ids.extend(item.pk for item in rows)
+        if not dry_run:
+            connection.send_messages(messages)
+            InboxItem.objects.filter(pk__in=item_ids).update(digested_at=now)
+        sent += len(messages)
+        covered += len(item_ids)
+    return sent, covered, skipped
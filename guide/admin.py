@@ -1,25 +1,148 @@
 from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Sum
+from django.utils.functional import cached_property
+
 from .models import (
     Profile,
     Species,
     SpeciesCare,
     Vendor,
     NuptialFlight,
+    FlightCalendarCount,
     ForumSection,
     ForumThread,
     ForumPost,
     SpeciesBookmark,
     SpeciesSuggestion,
+    Revision,
 )
+from .forum import release_post
+
+try:
+    from . import geocoding
+except ImportError:  # NumPy not installed
+    geocoding = None
+
+
+# Below this many rows the exact count is cheap enough to keep.
+ESTIMATE_THRESHOLD = 100_000
+
+
+class EstimatedCountPaginator(Paginator):
+    # COUNT(*) over a whole million-row table is a full scan on Postgres.
+    # For the unfiltered changelist the planner's row estimate (kept fresh by
+    # autovacuum) is close enough for the page links; filtered lists, small
+    # tables and other databases still count exactly.
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if not queryset.query.where and connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            if row and row[0] >= ESTIMATE_THRESHOLD:
+                return row[0]
+        return super().count
+
+    def page(self, number):
+        # OFFSET over ids alone is an index-only scan; only the rows on the
+        # page are then read in full, so deep pages cost about the same as
+        # the first one.
+        number = self.validate_number(number)
+        queryset = self.object_list
+        if number == 1 or not connections[queryset.db].features.allow_sliced_subqueries_with_in:
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        if top + self.orphans >= self.count:
+            top = self.count
+        ids = queryset.values("pk")[bottom:top]
+        return self._get_page(queryset.filter(pk__in=ids), number, self)
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    # For tables that grow without bound (flights, forum, bookmarks,
+    # revisions): estimated totals, and no second COUNT(*) of the whole
+    # table under a filtered list.
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    # Swaps in {% indexed_date_hierarchy %} for the stock date hierarchy.
+    change_list_template = "admin/guide/large_change_list.html"
+
+
+class FlightSpeciesFilter(admin.SimpleListFilter):
+    # The stock related-field filter lists every species in the sidebar.
+    # This one offers the species with the most reports, read from the
+    # materialised calendar counts rather than the flights table, plus the
+    # one currently picked; any other species is ?species=<id>.
+    title = "species"
+    parameter_name = "species"
+    limit = 25
+
+    def lookups(self, request, model_admin):
+        top = (
+            FlightCalendarCount.objects.filter(period="month")
+            .values("species")
+            .annotate(n=Sum("count"))
+            .order_by("-n")[: self.limit]
+        )
+        ids = [row["species"] for row in top]
+        if self.value() and self.value().isdigit() and int(self.value()) not in ids:
+            ids.append(int(self.value()))
+        species = Species.objects.in_bulk(ids)
+        return [(str(pk), str(species[pk])) for pk in ids if pk in species]
+
+    def queryset(self, request, queryset):
+        if not self.value():
+            return queryset
+        if not self.value().isdigit():
+            raise IncorrectLookupParameters(f"Unknown species id {self.value()!r}")
+        return queryset.filter(species_id=self.value())
+
+
+class FlightCountryFilter(admin.SimpleListFilter):
+    # Countries the geocoder knows, instead of a SELECT DISTINCT over every
+    # flight; the filter itself runs on flight_country_idx.
+    title = "country"
+    parameter_name = "country"
+
+    def lookups(self, request, model_admin):
+        if geocoding is None:
+            return []
+        return [(code, code) for code in sorted(geocoding.get_geocoder().country_codes)]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(country_code=self.value().upper())
+        return queryset
+
+
+class RevisionAuthorMixin:
+    # Tag the revision that guide.signals records with the editing user.
+    def save_model(self, request, obj, form, change):
+        obj._revision_author = request.user
+        obj._revision_reason = "Edited in admin" if change else "Added in admin"
+        super().save_model(request, obj, form, change)
 
 @admin.register(Species)
-class SpeciesAdmin(admin.ModelAdmin):
+class SpeciesAdmin(RevisionAuthorMixin, admin.ModelAdmin):
     list_display = ("genus", "species", "common_name", "difficulty", "region", "diapause")
     prepopulated_fields = {"slug": ("genus", "species")}
+    # Also what the species autocomplete widgets search.
+    search_fields = ("genus", "species", "common_name")
 
 @admin.register(SpeciesCare)
-class SpeciesCareAdmin(admin.ModelAdmin):
+class SpeciesCareAdmin(RevisionAuthorMixin, admin.ModelAdmin):
     list_display = ("species", "temperature_min_c", "temperature_max_c", "humidity_min", "humidity_max")
+    list_select_related = ("species",)
+    autocomplete_fields = ("species",)
 
 @admin.register(Vendor)
 class VendorAdmin(admin.ModelAdmin):
@@ -27,30 +150,76 @@ class VendorAdmin(admin.ModelAdmin):
     list_filter = ("category", "is_trusted")
 
 @admin.register(NuptialFlight)
-class NuptialFlightAdmin(admin.ModelAdmin):
+class NuptialFlightAdmin(LargeTableAdmin):
     list_display = ("species", "date", "location_name", "region")
-    list_filter = ("species", "region", "date")
+    list_select_related = ("species",)
+    list_filter = (FlightSpeciesFilter, FlightCountryFilter)
+    date_hierarchy = "date"
+    autocomplete_fields = ("species", "user")
+    raw_id_fields = ("event",)
 
 @admin.register(ForumSection)
 class ForumSectionAdmin(admin.ModelAdmin):
     prepopulated_fields = {"slug": ("name",)}
 
 @admin.register(ForumThread)
-class ForumThreadAdmin(admin.ModelAdmin):
-    list_display = ("title", "section", "author", "created_at", "is_locked")
-    list_filter = ("section", "is_locked")
+class ForumThreadAdmin(LargeTableAdmin):
+    list_display = ("title", "section", "author", "created_at", "is_locked", "is_held")
+    list_select_related = ("section", "author")
+    # Held threads are released with their opening post (ForumPostAdmin).
+    list_filter = ("section", "is_locked", "is_held")
+    search_fields = ("title",)
+    autocomplete_fields = ("species", "author")
 
 @admin.register(ForumPost)
-class ForumPostAdmin(admin.ModelAdmin):
-    list_display = ("thread", "author", "created_at")
+class ForumPostAdmin(LargeTableAdmin):
+    list_display = ("thread", "author", "created_at", "is_held")
+    list_select_related = ("thread", "author")
+    # "Yes" is the queue of posts held by guide.spam (post_held_idx).
+    list_filter = ("is_held",)
+    date_hierarchy = "created_at"
+    ordering = ("-created_at",)
+    autocomplete_fields = ("thread", "author")
+    raw_id_fields = ("duplicate_of",)
+    actions = ("release_held_posts",)
+
+    @admin.action(description="Release selected held posts")
+    def release_held_posts(self, request, queryset):
+        # One at a time, oldest first, so each is bumped and announced as if
+        # it had just been posted.
+        posts = queryset.filter(is_held=True).select_related("author", "thread__species").order_by("created_at", "pk")
+        released = sum(release_post(post) for post in posts)
+        self.message_user(request, f"Released {released} post(s).")
 
 @admin.register(SpeciesBookmark)
-class SpeciesBookmarkAdmin(admin.ModelAdmin):
+class SpeciesBookmarkAdmin(LargeTableAdmin):
     list_display = ("user", "species", "created_at")
+    list_select_related = ("user", "species")
+    autocomplete_fields = ("user", "species")
 
 @admin.register(SpeciesSuggestion)
-class SpeciesSuggestionAdmin(admin.ModelAdmin):
+class SpeciesSuggestionAdmin(LargeTableAdmin):
     list_display = ("proposed_genus", "proposed_species", "status", "created_at")
     list_filter = ("status",)
+    autocomplete_fields = ("user", "species", "reviewer")
+
+@admin.register(Revision)
+class RevisionAdmin(LargeTableAdmin):
+    # Append-only: restore through the species history page instead.
+    list_display = ("target", "object_id", "number", "is_snapshot", "author", "reason", "created_at")
+    list_select_related = ("author",)
+    list_filter = ("target", "is_snapshot")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
 
-admin.site.register(Profile)
+@admin.register(Profile)
+class ProfileAdmin(admin.ModelAdmin):
+    list_select_related = ("user",)
+    autocomplete_fields = ("user",)
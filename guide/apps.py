@@ -6,3 +6,4 @@ class GuideConfig(AppConfig):
 
     def ready(self):
         from . import signals  # noqa
+        from . import ratelimit  # noqa: registers its system check
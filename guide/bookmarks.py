@@ -0,0 +1,71 @@
+from django.core.cache import cache
+from django.db import transaction
+
+from . import caching
+from .models import Species, SpeciesBookmark
+
+
+# The id set is only for display (bookmark buttons, the JSON API); changes
+# are always decided from the database. It is cached only in a shared cache:
+# invalidate() runs in one worker, and a per-process cache would leave every
+# other worker showing the old set. Invalidated on every change below and by
+# guide.signals, so the timeout only bounds how long an idle user's set stays
+# in memory.
+CACHE_TIMEOUT = 60 * 60
+
+
+def cache_key(user_id):
+    return f"bookmarks:{user_id}"
+
+
+def invalidate(user_id):
+    # After commit, so a concurrent read cannot re-cache the old set.
+    transaction.on_commit(lambda: cache.delete(cache_key(user_id)))
+
+
+def bookmarked_ids(user):
+    # Species ids on the user's shelf: one cache hit, or one query.
+    if not user.is_authenticated:
+        return frozenset()
+    if not caching.is_shared():
+        return frozenset(SpeciesBookmark.objects.filter(user=user).values_list("species_id", flat=True))
+    key = cache_key(user.pk)
+    ids = cache.get(key)
+    if ids is None:
+        ids = list(SpeciesBookmark.objects.filter(user=user).values_list("species_id", flat=True))
+        cache.set(key, ids, CACHE_TIMEOUT)
+    return frozenset(ids)
+
+
+def update(user, add=(), remove=()):
+    # Apply a batch of adds and removes in one transaction. Unknown species
+    # ids are ignored. Returns (added, removed) as sets of species ids.
+    add, remove = set(add) - set(remove), set(remove)
+    with transaction.atomic():
+        current = set(
+            SpeciesBookmark.objects.filter(user=user, species_id__in=add | remove).values_list("species_id", flat=True)
+        )
+        added = set(Species.objects.filter(pk__in=add - current).values_list("pk", flat=True))
+        SpeciesBookmark.objects.bulk_create(
+            [SpeciesBookmark(user=user, species_id=species_id) for species_id in added],
+            ignore_conflicts=True,
+        )
+        removed = remove & current
+        if removed:
+            SpeciesBookmark.objects.filter(user=user, species_id__in=removed).delete()
+        if added or removed:
+            invalidate(user.pk)
+    return added, removed
+
+
+def toggle(user, species_id):
+    # Returns True when the species is now bookmarked. Decided by the
+    # database, never the cached set: remove the bookmark, and add it only
+    # when there was none to remove.
+    with transaction.atomic():
+        removed, _ = SpeciesBookmark.objects.filter(user=user, species_id=species_id).delete()
+        if removed:
+            invalidate(user.pk)
+            return False
+        added, _ = update(user, add=[species_id])
+    return bool(added)
@@ -0,0 +1,14 @@
+from django.conf import settings
+
+
+# Cache backends that live inside one process. With several gunicorn workers
+# each keeps its own copy, and a delete in one worker leaves the others stale.
+PER_PROCESS_CACHES = {
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+}
+
+
+def is_shared(alias="default"):
+    # True when every worker sees the same cache (DJANGO_REDIS_URL).
+    return settings.CACHES[alias]["BACKEND"] not in PER_PROCESS_CACHES
@@ -0,0 +1,92 @@
+import hashlib
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from .models import SpeciesCare
+
+
+# Generated care-card PDFs, named <slug>.<hash of the text>.pdf so an edit
+# produces a new file and an unchanged card is rendered only once.
+CARE_CARD_DIR = "care_cards"
+
+
+def care_card_lines(species):
+    try:
+        care = species.care
+    except SpeciesCare.DoesNotExist:
+        care = None
+
+    lines = [f"Care card for {species.display_name()}"]
+    if care:
+        lines.append(f"Temperature: {care.temperature_min_c} to {care.temperature_max_c} C")
+        lines.append(f"Humidity: {care.humidity_min} to {care.humidity_max} percent")
+        lines.append(f"Diapause: {species.get_diapause_display()}")
+        lines.append("")
+        lines.append("Founding setup:")
+        lines.extend(care.founding_setup.splitlines())
+        lines.append("")
+        lines.append("Small colony setup:")
+        lines.extend(care.small_colony_setup.splitlines())
+        lines.append("")
+        lines.append("Diet:")
+        lines.extend(care.diet.splitlines())
+        lines.append("")
+        lines.append("Common issues:")
+        lines.extend(care.common_issues.splitlines())
+    else:
+        lines.append("No detailed care record has been added for this species yet.")
+    return lines
+
+
+def render_pdf(lines):
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    buffer = BytesIO()
+    # invariant=True keeps timestamps and ids out of the file, so the same
+    # text always renders to the same bytes.
+    p = canvas.Canvas(buffer, pagesize=letter, invariant=True)
+    width, height = letter
+
+    title, lines = lines[0], lines[1:]
+    y = height - 72
+    p.setFont("Helvetica-Bold", 16)
+    p.drawString(72, y, title)
+    y -= 30
+
+    p.setFont("Helvetica", 11)
+    for line in lines:
+        if y < 72:
+            p.showPage()
+            y = height - 72
+            p.setFont("Helvetica", 11)
+        p.drawString(72, y, line[:100])
+        y -= 14
+
+    p.showPage()
+    p.save()
+    return buffer.getvalue()
+
+
+def care_card(species):
+    # Storage name of the species' current care card, rendering it first if
+    # the text changed since the last one. Older cards are deleted.
+    lines = care_card_lines(species)
+    digest = hashlib.sha256("\n".join(lines).encode()).hexdigest()[:12]
+    name = f"{CARE_CARD_DIR}/{species.slug}.{digest}.pdf"
+    if default_storage.exists(name):
+        return name
+
+    name = default_storage.save(name, ContentFile(render_pdf(lines)))
+    try:
+        _, files = default_storage.listdir(CARE_CARD_DIR)
+    except FileNotFoundError:
+        files = []
+    for filename in files:
+        stale = f"{CARE_CARD_DIR}/{filename}"
+        if filename.startswith(f"{species.slug}.") and stale != name and filename.count(".") == 2:
+            default_storage.delete(stale)
+    return name
@@ -0,0 +1,112 @@
+import threading
+import time
+
+import numpy as np
+from django.db import transaction
+
+from .models import Species, SpeciesCare
+
+
+# Care ranges of every species, as NumPy columns held by each process. Built
+# on first use, dropped on commit of any Species/SpeciesCare change in this
+# process (guide.signals) and rebuilt at most INDEX_TTL seconds after a
+# change made by another worker.
+INDEX_TTL = 60
+
+RANK_SCALE = 1e9
+
+_index = None
+_built_at = 0.0
+_lock = threading.Lock()
+
+
+class ClimateIndex:
+    def __init__(self, rows):
+        rows = list(rows)
+        self.species_ids = np.array([r[0] for r in rows], dtype=np.int64)
+        self.species = [
+            {"id": r[0], "slug": r[1], "name": Species.format_display_name(r[2], r[3], r[4])} for r in rows
+        ]
+        columns = np.array([r[5:9] for r in rows], dtype=np.float32).reshape(-1, 4)
+        self.temp_min, self.temp_max, self.humidity_min, self.humidity_max = columns.T
+
+    def __len__(self):
+        return len(self.species_ids)
+
+    def match(self, temperature=None, humidity=None, mode="contains", limit=20):
+        # Species whose care ranges contain (or, for mode="overlap", overlap)
+        # the room's (min, max) ranges; either range may be None. Ranked by
+        # fit, the share of the room's range inside the species' range
+        # (multiplied across both), then by how close the room sits to the
+        # middle of the species' range. Returns (total matches, best rows).
+        score = np.ones(len(self))
+        off_centre = np.zeros(len(self))
+        for query, lo, hi in (
+            (temperature, self.temp_min, self.temp_max),
+            (humidity, self.humidity_min, self.humidity_max),
+        ):
+            if query is None:
+                continue
+            q_lo, q_hi = query
+            if q_hi > q_lo:
+                fit = np.clip((np.minimum(hi, q_hi) - np.maximum(lo, q_lo)) / (q_hi - q_lo), 0.0, 1.0)
+            else:
+                fit = ((lo <= q_lo) & (hi >= q_hi)).astype(np.float64)
+            score *= fit
+            off_centre += np.abs((lo + hi) / 2 - (q_lo + q_hi) / 2) / np.maximum(hi - lo, 1.0)
+
+        matches = np.flatnonzero(score >= 1.0 if mode == "contains" else score > 0.0)
+        # One float key orders by score, then centring (off_centre stays far
+        # below RANK_SCALE times the smallest score step), so the top rows
+        # come from argpartition instead of sorting every match.
+        key = (1.0 - score[matches]) * RANK_SCALE + off_centre[matches]
+        if len(matches) > limit:
+            top = np.argpartition(key, limit)[:limit]
+        else:
+            top = np.arange(len(matches))
+        best = matches[top[np.argsort(key[top], kind="stable")]]
+        results = [
+            dict(
+                species=self.species[i],
+                temperature=[int(self.temp_min[i]), int(self.temp_max[i])],
+                humidity=[int(self.humidity_min[i]), int(self.humidity_max[i])],
+                score=round(float(score[i]), 3),
+            )
+            for i in best
+        ]
+        return len(matches), results
+
+
+def build():
+    return ClimateIndex(
+        SpeciesCare.objects.order_by("species_id").values_list(
+            "species_id",
+            "species__slug",
+            "species__genus",
+            "species__species",
+            "species__common_name",
+            "temperature_min_c",
+            "temperature_max_c",
+            "humidity_min",
+            "humidity_max",
+        )
+    )
+
+
+def get_index():
+    global _index, _built_at
+    index = _index
+    if index is None or time.monotonic() - _built_at > INDEX_TTL:
+        with _lock:
+            if _index is None or time.monotonic() - _built_at > INDEX_TTL:
+                _index, _built_at = build(), time.monotonic()
+            index = _index
+    return index
+
+
+def invalidate():
+    def drop():
+        global _index
+        _index = None
+
+    transaction.on_commit(drop)
@@ -0,0 +1,203 @@
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F
+
+from .models import FlightEvent, NuptialFlight
+
+
+KM_PER_DEGREE = 111.32
+ROW_STRIDE = 10 ** 7
+
+
+def distance_km(lat1, lng1, lat2, lng2):
+    # Haversine; plenty accurate at swarm scale.
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * 6371.0 * math.asin(min(1.0, math.sqrt(a)))
+
+
+class Grid:
+    # Equal-distance grid: rows are `radius` tall, and each row's cells are
+    # widened by 1/cos(latitude) so a cell is never narrower than `radius`.
+    # Any report within `radius` of a point therefore sits in the point's row
+    # or the rows either side, in a handful of columns.
+
+    def __init__(self, radius_km):
+        self.radius_km = radius_km
+        self.row_deg = radius_km / KM_PER_DEGREE
+
+    def row(self, latitude):
+        return int((latitude + 90) // self.row_deg)
+
+    def row_width(self, row):
+        # Use the pole-side edge of the row so the width covers the whole row,
+        # then round up so a whole number of cells wraps the antimeridian.
+        edge = max(abs(row * self.row_deg - 90), abs((row + 1) * self.row_deg - 90))
+        width = self.row_deg / max(math.cos(math.radians(min(edge, 89.9))), 1e-6)
+        return 360.0 / max(1, int(360.0 // width))
+
+    def column(self, row, longitude):
+        return int(((longitude + 180) % 360) // self.row_width(row))
+
+    def cell(self, latitude, longitude):
+        row = self.row(latitude)
+        return row * ROW_STRIDE + self.column(row, longitude)
+
+    def neighbour_cells(self, latitude, longitude):
+        reach_lat = min(abs(latitude) + self.row_deg, 89.9)
+        reach_lng = self.radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(reach_lat)), 1e-6))
+        centre = self.row(latitude)
+        cells = set()
+        for row in (centre - 1, centre, centre + 1):
+            if row < 0 or row * self.row_deg > 180:
+                continue
+            width = self.row_width(row)
+            columns = round(360 / width)
+            if reach_lng * 2 >= 360:
+                first, last = 0, columns - 1
+            else:
+                first = int(math.floor((longitude - reach_lng + 180) / width))
+                last = int(math.floor((longitude + reach_lng + 180) / width))
+            for column in range(first, last + 1):
+                cells.add(row * ROW_STRIDE + column % columns)
+        return cells
+
+
+def get_grid():
+    return Grid(settings.FLIGHT_DEDUP_DISTANCE_KM)
+
+
+def nearest_event(candidates, latitude, longitude, radius_km):
+    best, best_distance = None, radius_km
+    for lat, lng, event_id in candidates:
+        d = distance_km(latitude, longitude, lat, lng)
+        if d <= best_distance:
+            best, best_distance = event_id, d
+    return best
+
+
+def assign_event(flight):
+    # Attach an unsaved or unclustered flight to the matching event for the
+    # same species nearby within the day window, or start a new event. Only
+    # the neighbouring grid cells are read, through the (species, grid_cell,
+    # date) index.
+    grid = get_grid()
+    window = timedelta(days=settings.FLIGHT_DEDUP_DAYS)
+
+    if flight.latitude is None or flight.longitude is None:
+        flight.grid_cell = None
+    else:
+        flight.grid_cell = grid.cell(flight.latitude, flight.longitude)
+        candidates = (
+            NuptialFlight.objects.filter(
+                species_id=flight.species_id,
+                grid_cell__in=grid.neighbour_cells(flight.latitude, flight.longitude),
+                date__range=(flight.date - window, flight.date + window),
+                event__isnull=False,
+            )
+            .exclude(pk=flight.pk)
+            .values_list("latitude", "longitude", "event_id")
+        )
+        event_id = nearest_event(candidates, flight.latitude, flight.longitude, grid.radius_km)
+        if event_id is not None:
+            FlightEvent.objects.filter(pk=event_id).update(report_count=F("report_count") + 1)
+            flight.event_id = event_id
+            return
+
+    flight.event = FlightEvent.objects.create(
+        species_id=flight.species_id,
+        date=flight.date,
+        latitude=flight.latitude,
+        longitude=flight.longitude,
+        report_count=1,
+    )
+
+
+def release_event(event_id):
+    # A report left its event; drop the event once nothing points at it.
+    FlightEvent.objects.filter(pk=event_id).update(report_count=F("report_count") - 1)
+    FlightEvent.objects.filter(pk=event_id, report_count__lte=0).delete()
+
+
+def cluster_unclustered(batch_size=1000):
+    # Give every report without an event one, oldest first, matching events
+    # that already exist (reports from before events existed, or written
+    # with raw saves). Returns the number of reports clustered.
+    pks = list(
+        NuptialFlight.objects.filter(event__isnull=True).order_by("date", "created_at", "pk").values_list("pk", flat=True)
+    )
+    for start in range(0, len(pks), batch_size):
+        flights = NuptialFlight.objects.in_bulk(pks[start:start + batch_size])
+        for pk in pks[start:start + batch_size]:
+            flight = flights[pk]
+            assign_event(flight)
+            # update(), not save(): the other pre_save work has already run.
+            NuptialFlight.objects.filter(pk=pk).update(grid_cell=flight.grid_cell, event=flight.event_id)
+    return len(pks)
+
+
+def recluster(batch_size=1000):
+    # Rebuild every event from scratch using an in-memory grid, in date order
+    # so the earliest report anchors each event.
+    grid = get_grid()
+    window = settings.FLIGHT_DEDUP_DAYS
+    cells = {}
+    events = []
+    flights = list(
+        NuptialFlight.objects.order_by("date", "created_at", "pk").values_list(
+            "pk", "species_id", "date", "latitude", "longitude"
+        )
+    )
+
+    assignments = []
+    for pk, species_id, day, lat, lng in flights:
+        if lat is None or lng is None:
+            events.append([species_id, day, lat, lng, 1])
+            assignments.append((pk, None, len(events) - 1))
+            continue
+        cell = grid.cell(lat, lng)
+        ordinal = day.toordinal()
+        candidates = []
+        for neighbour in grid.neighbour_cells(lat, lng):
+            for other_lat, other_lng, other_ordinal, event_index in cells.get((species_id, neighbour), ()):
+                if abs(other_ordinal - ordinal) <= window:
+                    candidates.append((other_lat, other_lng, event_index))
+        event_index = nearest_event(candidates, lat, lng, grid.radius_km)
+        if event_index is None:
+            events.append([species_id, day, lat, lng, 1])
+            event_index = len(events) - 1
+        else:
+            events[event_index][4] += 1
+        cells.setdefault((species_id, cell), []).append((lat, lng, ordinal, event_index))
+        assignments.append((pk, cell, event_index))
+
+    NuptialFlight.objects.update(event=None)
+    FlightEvent.objects.all().delete()
+    created = FlightEvent.objects.bulk_create(
+        [
+            FlightEvent(species_id=s, date=d, latitude=lat, longitude=lng, report_count=n)
+            for s, d, lat, lng, n in events
+        ],
+        batch_size=batch_size,
+    )
+
+    # bulk_update() builds one CASE per row, which crawls at this size; a
+    # plain executemany of a parameterised UPDATE is linear.
+    qn = connection.ops.quote_name
+    meta = NuptialFlight._meta
+    sql = "UPDATE {} SET {} = %s, {} = %s WHERE {} = %s".format(
+        qn(meta.db_table),
+        qn(meta.get_field("grid_cell").column),
+        qn(meta.get_field("event").column),
+        qn(meta.pk.column),
+    )
+    rows = [(cell, created[event_index].pk, pk) for pk, cell, event_index in assignments]
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            cursor.executemany(sql, rows[start:start + batch_size])
+    return len(flights), len(created)
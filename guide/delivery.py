@@ -0,0 +1,63 @@
+import mimetypes
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse
+
+
+# name.0123456789ab.ext: the content hash is part of the name, so the file
+# behind a URL never changes and may be cached forever.
+HASHED_NAME = re.compile(r"\.[0-9a-f]{12}\.[A-Za-z0-9]+$")
+
+# Media directories the public may read; anything else under MEDIA_ROOT 404s.
+PUBLIC_DIRS = ("species_thumbs/", "care_cards/")
+
+
+def cache_control(name):
+    if HASHED_NAME.search(name):
+        return f"public, max-age={settings.MEDIA_IMMUTABLE_MAX_AGE}, immutable"
+    return f"public, max-age={settings.MEDIA_MAX_AGE}"
+
+
+def clean_name(name):
+    # Normalise a URL path into a storage name, refusing escapes like "../".
+    name = posixpath.normpath(name.lstrip("/"))
+    if name.startswith("..") or name.startswith("/") or name == ".":
+        raise Http404("Not found")
+    return name
+
+
+def send_file(name, download_name=None, cache=None):
+    # Respond with a stored media file without Python touching its bytes:
+    # behind nginx the response is empty and X-Accel-Redirect tells nginx to
+    # send the file from its internal location (which also handles Range,
+    # ETag and If-Modified-Since). Cache-Control and Content-Disposition set
+    # here are passed through. Without nginx (runserver) fall back to
+    # streaming it ourselves.
+    if not default_storage.exists(name):
+        raise Http404("Not found")
+
+    if settings.MEDIA_ACCEL_REDIRECT:
+        response = HttpResponse()
+        response["X-Accel-Redirect"] = settings.MEDIA_ACCEL_PREFIX + quote(name)
+        # Let nginx pick the type from the file extension.
+        del response["Content-Type"]
+    else:
+        content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        response = FileResponse(default_storage.open(name), content_type=content_type)
+
+    response["Cache-Control"] = cache or cache_control(name)
+    if download_name:
+        response["Content-Disposition"] = f'attachment; filename="{download_name}"'
+    return response
+
+
+def public_name(path):
+    # Storage name for a /media/ URL path; 404 for anything outside PUBLIC_DIRS.
+    name = clean_name(path)
+    if not name.startswith(PUBLIC_DIRS):
+        raise Http404("Not found")
+    return name
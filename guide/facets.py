@@ -0,0 +1,75 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+
+from . import caching
+from .models import Species
+
+
+# Species choice fields offered as filters, with their choices.
+FACETS = {
+    "difficulty": Species.DIFFICULTY_CHOICES,
+    "region": Species.REGION_CHOICES,
+    "founding_mode": Species.FOUNDING_MODE_CHOICES,
+    "diapause": Species.DIAPAUSE_CHOICES,
+}
+
+# The unfiltered table is cached; invalidate() runs on every species change
+# (guide.signals, moderation bulk inserts). In a shared cache that reaches
+# every worker and the timeout is only a backstop. A per-process cache is
+# only cleared in the worker that made the change, so the others can show
+# counts up to LOCAL_CACHE_TIMEOUT seconds old.
+CACHE_KEY = "species:facet-combinations"
+CACHE_TIMEOUT = 60 * 10
+LOCAL_CACHE_TIMEOUT = 30
+
+
+def search_filter(q):
+    return Q(genus__icontains=q) | Q(species__icontains=q) | Q(common_name__icontains=q)
+
+
+def invalidate():
+    transaction.on_commit(lambda: cache.delete(CACHE_KEY))
+
+
+def combinations(q=""):
+    # Species counted per combination of facet values: one GROUP BY over the
+    # (difficulty, region, founding_mode, diapause) index, at most a few
+    # hundred rows however many species there are.
+    rows = None if q else cache.get(CACHE_KEY)
+    if rows is None:
+        qs = Species.objects.all()
+        if q:
+            qs = qs.filter(search_filter(q))
+        rows = [
+            (tuple(row[f] for f in FACETS), row["n"])
+            for row in qs.order_by().values(*FACETS).annotate(n=Count("pk"))
+        ]
+        if not q:
+            cache.set(CACHE_KEY, rows, CACHE_TIMEOUT if caching.is_shared() else LOCAL_CACHE_TIMEOUT)
+    return rows
+
+
+def facet_counts(selected, q=""):
+    # For every facet value, how many species match it together with the
+    # other active filters (a facet's own selection is ignored, so the
+    # counts show what picking another option would give). Returns
+    # (total matching all filters, {facet: {value: count}}).
+    selected = {f: v for f, v in selected.items() if f in FACETS and v}
+    names = list(FACETS)
+    counts = {f: dict.fromkeys((value for value, _ in choices), 0) for f, choices in FACETS.items()}
+    total = 0
+    for values, n in combinations(q):
+        misses = [f for f, v in zip(names, values) if f in selected and selected[f] != v]
+        if not misses:
+            total += n
+            for f, v in zip(names, values):
+                if v in counts[f]:
+                    counts[f][v] += n
+        elif len(misses) == 1:
+            # Only this facet's own selection excludes the row.
+            f = misses[0]
+            v = values[names.index(f)]
+            if v in counts[f]:
+                counts[f][v] += n
+    return total, counts
@@ -4,6 +4,7 @@ from django.contrib.auth.models import User
 
 from .models import (
     NuptialFlight,
+    ForumSection,
     ForumThread,
     ForumPost,
     SpeciesSuggestion,
@@ -49,6 +50,47 @@ class SpeciesFilterForm(forms.Form):
         required=False,
     )
 
+    def show_counts(self, counts):
+        # Append facet counts from guide.facets to each option label.
+        for name, values in counts.items():
+            field = self.fields[name]
+            field.choices = [
+                (value, f"{label} ({values[value] if value else sum(values.values())})")
+                for value, label in field.choices
+            ]
+
+
+class ClimateMatchForm(forms.Form):
+    MODE_CHOICES = [
+        ("contains", "Species range covers my whole range"),
+        ("overlap", "Species range overlaps my range"),
+    ]
+
+    temperature_min = forms.IntegerField(label="Min temperature (°C)", min_value=0, max_value=50, required=False)
+    temperature_max = forms.IntegerField(label="Max temperature (°C)", min_value=0, max_value=50, required=False)
+    humidity_min = forms.IntegerField(label="Min humidity (%)", min_value=0, max_value=100, required=False)
+    humidity_max = forms.IntegerField(label="Max humidity (%)", min_value=0, max_value=100, required=False)
+    mode = forms.ChoiceField(choices=MODE_CHOICES, required=False)
+
+    def range(self, name):
+        # (min, max) for "temperature" or "humidity"; one given end stands for both.
+        low, high = self.cleaned_data.get(f"{name}_min"), self.cleaned_data.get(f"{name}_max")
+        if low is None and high is None:
+            return None
+        low = high if low is None else low
+        high = low if high is None else high
+        return low, high
+
+    def clean(self):
+        cleaned = super().clean()
+        for name in ("temperature", "humidity"):
+            low, high = cleaned.get(f"{name}_min"), cleaned.get(f"{name}_max")
+            if low is not None and high is not None and low > high:
+                self.add_error(f"{name}_max", "Must not be below the minimum.")
+        if not self.errors and self.range("temperature") is None and self.range("humidity") is None:
+            raise forms.ValidationError("Enter a temperature or humidity range.")
+        return cleaned
+
 
 class NuptialFlightForm(forms.ModelForm):
     class Meta:
@@ -65,6 +107,30 @@ class ForumThreadForm(forms.ModelForm):
         fields = ["title", "species"]
 
 
+class ForumSearchForm(forms.Form):
+    ORDER_CHOICES = [
+        ("relevance", "Best match"),
+        ("recent", "Newest first"),
+    ]
+
+    q = forms.CharField(label="Search the forum", max_length=200)
+    section = forms.ModelChoiceField(
+        queryset=ForumSection.objects.all(),
+        to_field_name="slug",
+        required=False,
+        empty_label="All sections",
+    )
+    # Set from links on species pages rather than picked from a list.
+    species = forms.ModelChoiceField(
+        queryset=Species.objects.all(),
+        to_field_name="slug",
+        required=False,
+        widget=forms.HiddenInput,
+    )
+    order = forms.ChoiceField(choices=ORDER_CHOICES, required=False)
+    page = forms.IntegerField(min_value=1, required=False, widget=forms.HiddenInput)
+
+
 class ForumPostForm(forms.ModelForm):
     class Meta:
         model = ForumPost
@@ -72,6 +138,9 @@ class ForumPostForm(forms.ModelForm):
         widgets = {
             "content": forms.Textarea(attrs={"rows": 4}),
         }
+        help_texts = {
+            "content": '**bold**, *italic*, `code`, "> " to quote, "- " for a list. Species names link to their page.',
+        }
 
 
 class SpeciesSuggestionForm(forms.ModelForm):
@@ -0,0 +1,66 @@
+from django.db import transaction
+from django.db.models import DateTimeField, F, Value
+from django.db.models.functions import Greatest
+
+from .models import ForumPost, ForumThread
+from . import activity, live
+
+
+# Posting and releasing forum replies, shared by the views and the admin.
+
+
+class ThreadLocked(Exception):
+    pass
+
+
+def bump_thread(post):
+    # Move the reply's thread up the lists and notify its followers. The bump
+    # is a single UPDATE on the row (never a read-modify-write of the
+    # thread), and Greatest() keeps updated_at from moving backwards when
+    # replies race. Returns 0 when the thread is locked or gone.
+    bumped = ForumThread.objects.filter(pk=post.thread_id, is_locked=False).update(
+        updated_at=Greatest(F("updated_at"), Value(post.created_at, output_field=DateTimeField()))
+    )
+    if bumped:
+        activity.post_replied(post)
+    return bumped
+
+
+def publish_post(post, thread_id):
+    # Insert the reply and bump the thread in one transaction.
+    with transaction.atomic():
+        post.thread_id = thread_id
+        post.save()
+        if post.is_held:
+            # Held for review (guide.spam): no bump and no notifications
+            # until release_post().
+            bumped = ForumThread.objects.filter(pk=thread_id, is_locked=False).exists()
+        else:
+            bumped = bump_thread(post)
+        if not bumped:
+            # Locked (or deleted) between the page load and the POST; undo the insert.
+            raise ThreadLocked
+    return post
+
+
+def release_post(post):
+    # Publish a held post as publish_post() would have: bump the thread,
+    # notify its followers and push the post to open pages. Releasing a
+    # held thread's opening post releases the thread instead, announced as
+    # new. A reply to a thread locked meanwhile is shown but not bumped.
+    # Returns False when the post was no longer held.
+    with transaction.atomic():
+        if not ForumPost.objects.filter(pk=post.pk, is_held=True).update(is_held=False):
+            return False
+        post.is_held = False
+        thread = post.thread
+        opening = thread.posts.order_by("created_at", "pk").values_list("pk", flat=True).first()
+        if thread.is_held and post.pk == opening:
+            ForumThread.objects.filter(pk=thread.pk).update(is_held=False)
+            thread.is_held = False
+            if thread.species_id:
+                activity.thread_started(thread)
+        else:
+            bump_thread(post)
+            live.publish_on_commit(f"thread:{thread.pk}", live.post_event(post))
+    return True
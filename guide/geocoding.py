@@ -0,0 +1,219 @@
+import csv
+import json
+import math
+import os
+import threading
+from collections import namedtuple
+
+import numpy as np
+from django.conf import settings
+from django.db import connection
+
+from .models import NuptialFlight
+
+
+CELL_DEGREES = 5
+ROWS = 180 // CELL_DEGREES
+COLUMNS = 360 // CELL_DEGREES
+KM_PER_DEGREE = 111.32
+INDEX_FILES = ("points.npy", "areas.npy", "cell_offsets.npy", "area_table.json")
+
+Area = namedtuple("Area", ["country_code", "admin1_code", "name"])
+
+
+def cells_for(latitudes, longitudes):
+    rows = np.clip((np.asarray(latitudes) + 90) // CELL_DEGREES, 0, ROWS - 1).astype(np.int64)
+    columns = (((np.asarray(longitudes) + 180) % 360) // CELL_DEGREES).astype(np.int64)
+    return rows * COLUMNS + columns
+
+
+def distances_km(latitude, longitude, points):
+    # Haversine from one point to an (n, 2) array of lat/lng.
+    p1 = math.radians(latitude)
+    p2 = np.radians(points[:, 0].astype(np.float64))
+    dl = np.radians(points[:, 1].astype(np.float64) - longitude)
+    a = np.sin((p2 - p1) / 2) ** 2 + math.cos(p1) * np.cos(p2) * np.sin(dl / 2) ** 2
+    return 2 * 6371.0 * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def read_dataset(path):
+    # CSV of reference points: latitude, longitude, ISO country code,
+    # ISO 3166-2 subdivision code (may be blank) and a display name.
+    with open(path, newline="", encoding="utf-8") as handle:
+        for row in csv.DictReader(handle):
+            yield (
+                float(row["latitude"]),
+                float(row["longitude"]),
+                row["country_code"].strip().upper(),
+                row["admin1_code"].strip().upper(),
+                row["name"].strip(),
+            )
+
+
+def build_index(source=None, directory=None):
+    # Compile the dataset into arrays sorted by grid cell, so a lookup reads
+    # one contiguous slice per cell straight out of the memory map.
+    source = source or settings.GEOCODER_DATASET
+    directory = directory or settings.GEOCODER_INDEX_DIR
+    os.makedirs(directory, exist_ok=True)
+
+    table, area_index, lats, lngs, areas = [], {}, [], [], []
+    for lat, lng, country, admin1, name in read_dataset(source):
+        key = (country, admin1, name)
+        if key not in area_index:
+            area_index[key] = len(table)
+            table.append(key)
+        lats.append(lat)
+        lngs.append(lng)
+        areas.append(area_index[key])
+
+    cells = cells_for(lats, lngs)
+    order = np.argsort(cells, kind="stable")
+    arrays = {
+        "points": np.column_stack([lats, lngs]).astype(np.float32)[order],
+        "areas": np.asarray(areas, dtype=np.int32)[order],
+        "cell_offsets": np.searchsorted(cells[order], np.arange(ROWS * COLUMNS + 1)).astype(np.int32),
+    }
+
+    # Write beside the live files and swap them in, so a running process
+    # never maps a half-written array.
+    for name, array in arrays.items():
+        tmp = os.path.join(directory, f"{name}.tmp.npy")
+        np.save(tmp, array)
+        os.replace(tmp, os.path.join(directory, f"{name}.npy"))
+    tmp = os.path.join(directory, "area_table.json.tmp")
+    with open(tmp, "w", encoding="utf-8") as handle:
+        json.dump(table, handle)
+    os.replace(tmp, os.path.join(directory, "area_table.json"))
+    return len(lats), len(table)
+
+
+class Geocoder:
+    # Nearest reference point within a fixed lat/lng grid. Arrays are
+    # memory-mapped, so every worker shares one copy through the page cache.
+
+    def __init__(self, directory):
+        load = lambda name: np.load(os.path.join(directory, name), mmap_mode="r")
+        self.points = load("points.npy")
+        self.areas = load("areas.npy")
+        self.cell_offsets = load("cell_offsets.npy")
+        with open(os.path.join(directory, "area_table.json"), encoding="utf-8") as handle:
+            self.area_table = [Area(*row) for row in json.load(handle)]
+        self.country_codes = {a.country_code for a in self.area_table}
+        self.admin1_codes = {a.admin1_code for a in self.area_table if a.admin1_code}
+
+    def _cells_within(self, row, column, ring, latitude):
+        # Cells whose row is within `ring` rows; columns are widened towards
+        # the poles so the box stays roughly square on the ground.
+        stretch = 1 / max(math.cos(math.radians(min(abs(latitude) + ring * CELL_DEGREES, 89))), 1e-6)
+        reach = min(int(math.ceil(ring * stretch)), COLUMNS // 2)
+        for r in range(max(row - ring, 0), min(row + ring, ROWS - 1) + 1):
+            for c in range(column - reach, column + reach + 1):
+                yield r * COLUMNS + c % COLUMNS
+
+    def lookup(self, latitude, longitude, max_km=None):
+        max_km = settings.GEOCODER_MAX_DISTANCE_KM if max_km is None else max_km
+        cell = int(cells_for(latitude, longitude))
+        row, column = divmod(cell, COLUMNS)
+        max_ring = int(math.ceil(max_km / (CELL_DEGREES * KM_PER_DEGREE))) + 1
+
+        seen, best, best_km, found_at = set(), None, max_km, None
+        for ring in range(max_ring + 1):
+            # Once something turns up, one more ring covers points that sit
+            # closer but across a cell edge.
+            if found_at is not None and ring > found_at + 1:
+                break
+            slices = []
+            for c in self._cells_within(row, column, ring, latitude):
+                if c in seen:
+                    continue
+                seen.add(c)
+                start, stop = self.cell_offsets[c], self.cell_offsets[c + 1]
+                if start != stop:
+                    slices.append(np.arange(start, stop))
+            if not slices:
+                continue
+            if found_at is None:
+                found_at = ring
+            candidates = np.concatenate(slices)
+            km = distances_km(latitude, longitude, self.points[candidates])
+            nearest = int(np.argmin(km))
+            if km[nearest] <= best_km:
+                best, best_km = int(self.areas[candidates[nearest]]), float(km[nearest])
+        return None if best is None else self.area_table[best]
+
+
+_geocoder = None
+_lock = threading.Lock()
+
+
+def index_is_stale():
+    directory = settings.GEOCODER_INDEX_DIR
+    try:
+        built = min(os.path.getmtime(os.path.join(directory, name)) for name in INDEX_FILES)
+    except OSError:
+        return True
+    return built < os.path.getmtime(settings.GEOCODER_DATASET)
+
+
+def get_geocoder():
+    # Build the index on first use if the deploy step has not, then map it
+    # once per process.
+    global _geocoder
+    if _geocoder is None:
+        with _lock:
+            if _geocoder is None:
+                if index_is_stale():
+                    build_index()
+                _geocoder = Geocoder(settings.GEOCODER_INDEX_DIR)
+    return _geocoder
+
+
+def area_label(area):
+    return f"{area.name}, {area.country_code}" if area.admin1_code else area.name
+
+
+def geocode_flight(flight):
+    # Fill the normalised codes from the coordinates, and the free-text
+    # region too when the reporter left it blank.
+    area = None
+    if flight.latitude is not None and flight.longitude is not None:
+        area = get_geocoder().lookup(flight.latitude, flight.longitude)
+    flight.country_code = area.country_code if area else ""
+    flight.admin1_code = area.admin1_code if area else ""
+    if area and not flight.region:
+        flight.region = area_label(area)
+
+
+def region_lookup(value):
+    # Map a region filter onto the indexed subdivision column when it is a
+    # known ISO 3166-2 code ("US-WA", "us-wa"); anything else, two letters
+    # included ("CA" may mean California as well as Canada), stays a text
+    # search. Country codes are only matched through an explicit ?code=.
+    code = value.strip().upper()
+    if "-" in code and code in get_geocoder().admin1_codes:
+        return {"admin1_code": code}
+    return {"region__icontains": value}
+
+
+def backfill(queryset, batch_size=1000):
+    # Geocode many flights with one executemany UPDATE per batch; returns
+    # the number of rows written.
+    geocoder = get_geocoder()
+    qn = connection.ops.quote_name
+    meta = NuptialFlight._meta
+    sql = "UPDATE {} SET {} = %s, {} = %s WHERE {} = %s".format(
+        qn(meta.db_table),
+        qn(meta.get_field("country_code").column),
+        qn(meta.get_field("admin1_code").column),
+        qn(meta.pk.column),
+    )
+    rows = []
+    for pk, lat, lng in queryset.values_list("pk", "latitude", "longitude").iterator(chunk_size=batch_size):
+        area = geocoder.lookup(lat, lng) if lat is not None and lng is not None else None
+        rows.append((area.country_code if area else "", area.admin1_code if area else "", pk))
+
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            cursor.executemany(sql, rows[start:start + batch_size])
+    return len(rows)
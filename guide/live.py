@@ -0,0 +1,184 @@
+import json
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.template.defaultfilters import linebreaks_filter
+from django.utils.module_loading import import_string
+
+
+# Put on a subscriber's queue when it fell behind and events were dropped;
+# the stream tells the browser to refetch instead of replaying the gap.
+LAGGED = object()
+
+
+class Subscription:
+    def __init__(self, broker, channel, max_queue):
+        self.broker = broker
+        self.channel = channel
+        self.queue = queue.Queue(maxsize=max_queue)
+
+    def offer(self, event):
+        # Never block the publisher. A full queue means this client is not
+        # keeping up: drop what it has and flag it for a resync.
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            with self.queue.mutex:
+                self.queue.queue.clear()
+                self.queue.queue.append(LAGGED)
+                self.queue.not_empty.notify()
+
+    def get(self, timeout):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    # Pub/sub between threads of one process: what a single dev server or
+    # the tests need. A multi-worker deploy swaps in a broker with the same
+    # publish/subscribe/unsubscribe methods backed by e.g. Redis pub/sub.
+
+    def __init__(self, max_queue=None):
+        self.max_queue = max_queue or settings.LIVE_QUEUE_SIZE
+        self.channels = {}
+        self.lock = threading.Lock()
+
+    def subscribe(self, channel):
+        subscription = Subscription(self, channel, self.max_queue)
+        with self.lock:
+            self.channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscribers = self.channels.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self.channels[subscription.channel]
+
+    def publish(self, channel, event):
+        with self.lock:
+            subscribers = list(self.channels.get(channel, ()))
+        for subscription in subscribers:
+            subscription.offer(event)
+        return len(subscribers)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+_slots = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.LIVE_BROKER)()
+    return _broker
+
+
+def reset_broker():
+    global _broker, _slots
+    _broker = None
+    _slots = None
+
+
+def connection_slots():
+    global _slots
+    if _slots is None:
+        with _broker_lock:
+            if _slots is None:
+                _slots = threading.BoundedSemaphore(settings.LIVE_MAX_CONNECTIONS)
+    return _slots
+
+
+def publish_on_commit(channel, event):
+    transaction.on_commit(lambda: get_broker().publish(channel, event))
+
+
+def format_event(event_id, name, data):
+    return f"id: {event_id}\nevent: {name}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+class EventStream:
+    # Iterable body for StreamingHttpResponse. Django calls close() when the
+    # response finishes or the client goes away, which frees the slot even
+    # if streaming never started.
+
+    def __init__(self, subscription, slot, name, catch_up):
+        self.subscription = subscription
+        self.slot = slot
+        self.name = name
+        self.catch_up = catch_up
+        self.closed = False
+
+    def __iter__(self):
+        yield f"retry: {settings.LIVE_RETRY_MS}\n\n"
+        for event_id, data in self.catch_up():
+            yield format_event(event_id, self.name, data)
+
+        # Hand the thread back now and then; the browser reconnects with
+        # Last-Event-ID and catches up from the database.
+        deadline = time.monotonic() + settings.LIVE_MAX_LIFETIME
+        while time.monotonic() < deadline:
+            event = self.subscription.get(timeout=settings.LIVE_HEARTBEAT)
+            if event is None:
+                # Comment line: keeps proxies from timing out and lets a dead
+                # client surface as a write error.
+                yield ": ping\n\n"
+            elif event is LAGGED:
+                yield "event: resync\ndata: {}\n\n"
+            else:
+                yield format_event(event["id"], self.name, event)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.subscription.close()
+            self.slot.release()
+
+
+def stream(channel, name, catch_up):
+    # Server-sent events for one channel. `catch_up()` yields (id, data) for
+    # anything the client missed (from Last-Event-ID or ?after=); it runs
+    # after subscribing so nothing falls in the gap, and the browser drops
+    # duplicates by id.
+    slot = connection_slots()
+    if not slot.acquire(blocking=False):
+        response = HttpResponse("Too many live connections, retry shortly.", status=503, content_type="text/plain")
+        response["Retry-After"] = "10"
+        return response
+
+    body = EventStream(get_broker().subscribe(channel), slot, name, catch_up)
+    response = StreamingHttpResponse(body, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Tell nginx not to buffer the stream.
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+def post_event(post):
+    return {
+        "id": post.pk,
+        "author": post.author.username,
+        "created_at": post.created_at.isoformat(),
+        # Rendered and escaped on save (guide.markup); plain line breaks for
+        # posts `manage.py render_forum_posts` has not reached yet.
+        "html": post.content_html or linebreaks_filter(post.content, autoescape=True),
+    }
+
+
+def last_event_id(request):
+    value = request.headers.get("Last-Event-ID") or request.GET.get("after") or ""
+    return int(value) if value.isdigit() else None
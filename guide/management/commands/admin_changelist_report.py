@@ -0,0 +1,116 @@
+import random
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from guide.models import ForumPost, ForumSection, ForumThread, NuptialFlight, Species
+
+
+COUNTRIES = ("US", "DE", "GB", "FR", "AU", "BR")
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the flight and forum tables up to --rows rows each, then time the admin changelists "
+        "(plain, filtered, date-drilled, deep pages) and add forms. Runs in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--repeat", type=int, default=5, help="Requests per page; the median is reported.")
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        species = list(Species.objects.values_list("pk", flat=True))
+        if not species:
+            raise CommandError("No species in the database to report flights for.")
+
+        with override_settings(ALLOWED_HOSTS=["*"]), transaction.atomic():
+            started = time.perf_counter()
+            admin_user, first_year = self.populate(species, options)
+            self.stdout.write(f"Inserted {options['rows']:,} flights and posts in {time.perf_counter() - started:.0f}s")
+            client = Client()
+            client.force_login(admin_user)
+
+            self.stdout.write(f"{'page':24} {'median ms':>10} {'queries':>8}")
+            for label, url in self.pages(species, first_year, options["rows"]):
+                timings = []
+                for _ in range(options["repeat"]):
+                    queries = QueryCounter()
+                    with connection.execute_wrapper(queries):
+                        started = time.perf_counter()
+                        response = client.get(url)
+                        timings.append((time.perf_counter() - started) * 1000)
+                    if response.status_code != 200:
+                        raise CommandError(f"{url} answered {response.status_code}")
+                self.stdout.write(f"{label:24} {statistics.median(timings):>10.1f} {queries.count:>8}")
+            transaction.set_rollback(True)
+
+    def populate(self, species, options):
+        rng = random.Random(options["seed"])
+        rows = options["rows"]
+        admin_user = User.objects.create_superuser("admin-report", "admin-report@example.com", None)
+        members = User.objects.bulk_create([User(username=f"admin-report-{i}") for i in range(50)])
+        first_day = date.today() - timedelta(days=5 * 365)
+
+        NuptialFlight.objects.bulk_create(
+            (
+                NuptialFlight(
+                    species_id=rng.choice(species),
+                    location_name="Report site",
+                    date=first_day + timedelta(days=rng.randrange(5 * 365)),
+                    country_code=rng.choice(COUNTRIES),
+                )
+                for _ in range(rows)
+            ),
+            batch_size=5000,
+        )
+
+        section = ForumSection.objects.create(name="Admin report", slug="admin-report", description="")
+        threads = ForumThread.objects.bulk_create(
+            [
+                ForumThread(section=section, title=f"Thread {i}", author=rng.choice(members))
+                for i in range(max(rows // 20, 1))
+            ],
+            batch_size=5000,
+        )
+        ForumPost.objects.bulk_create(
+            (ForumPost(thread=rng.choice(threads), author=rng.choice(members), content="Post") for _ in range(rows)),
+            batch_size=5000,
+        )
+        return admin_user, first_day.year
+
+    def pages(self, species, first_year, rows):
+        flights = reverse("admin:guide_nuptialflight_changelist")
+        threads = reverse("admin:guide_forumthread_changelist")
+        posts = reverse("admin:guide_forumpost_changelist")
+        return [
+            ("flights", flights),
+            # Halfway through, at 100 rows a page.
+            ("flights, middle page", f"{flights}?p={rows // 200}"),
+            ("flights, one species", f"{flights}?species={species[0]}"),
+            ("flights, one country", f"{flights}?country=DE"),
+            ("flights, one year", f"{flights}?date__year={first_year + 1}"),
+            ("flights, add form", reverse("admin:guide_nuptialflight_add")),
+            ("threads", threads),
+            ("posts", posts),
+            ("posts, one year", f"{posts}?created_at__year={date.today().year}"),
+            ("posts, add form", reverse("admin:guide_forumpost_add")),
+            ("species autocomplete", reverse("admin:autocomplete") + "?term=a&app_label=guide"
+             "&model_name=nuptialflight&field_name=species"),
+        ]
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Compile the reverse-geocoding dataset into the memory-mapped grid index."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--source", default=None, help="Defaults to settings.GEOCODER_DATASET.")
+
+    def handle(self, *args, **options):
+        try:
+            from guide import geocoding
+        except ImportError:
+            raise CommandError("NumPy is not installed. Add it to requirements.txt to build the geocoder.")
+
+        points, areas = geocoding.build_index(source=options["source"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Indexed {points} reference points for {areas} areas -> {settings.GEOCODER_INDEX_DIR}")
+        )
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from guide import thumbnails
+from guide.models import Species
+
+
+class Command(BaseCommand):
+    help = "Cap species thumbnails and build their resized WebP/JPEG derivatives across a process pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Rebuild every thumbnail, not just new or changed ones.")
+        parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per CPU).")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        updated, errors = thumbnails.backfill(Species.objects.all(), workers=options["workers"], force=options["all"])
+        for error in errors:
+            self.stderr.write(f"Skipped {error}")
+        self.stdout.write(
+            self.style.SUCCESS(f"Built derivatives for {updated} thumbnails in {time.perf_counter() - started:.1f}s.")
+        )
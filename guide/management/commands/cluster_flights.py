@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from guide import dedup
+
+
+class Command(BaseCommand):
+    help = (
+        "Regroup every NuptialFlight into FlightEvents using the current dedup distance and day window, "
+        "or with --unclustered only give reports without an event one, keeping existing events."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--unclustered", action="store_true", help="Only cluster reports that have no event yet.")
+
+    def handle(self, *args, **options):
+        if options["unclustered"]:
+            with transaction.atomic():
+                flights = dedup.cluster_unclustered(batch_size=options["batch_size"])
+            self.stdout.write(self.style.SUCCESS(f"{flights} unclustered reports added to flight events."))
+            return
+        with transaction.atomic():
+            flights, events = dedup.recluster(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"{flights} reports grouped into {events} flight events."))
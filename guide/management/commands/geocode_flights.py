@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from guide.models import NuptialFlight
+
+
+class Command(BaseCommand):
+    help = "Fill country_code/admin1_code on flight reports from their coordinates."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Recompute every report, not just ones without codes.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            from guide import geocoding
+        except ImportError:
+            raise CommandError("NumPy is not installed. Add it to requirements.txt to geocode flights.")
+
+        qs = NuptialFlight.objects.all()
+        if not options["all"]:
+            qs = qs.filter(country_code="", latitude__isnull=False, longitude__isnull=False)
+        with transaction.atomic():
+            updated = geocoding.backfill(qs, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Geocoded {updated} flight reports."))
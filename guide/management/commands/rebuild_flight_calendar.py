@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from guide import seasonality
+
+
+class Command(BaseCommand):
+    help = "Recompute the flight calendar aggregate table from every NuptialFlight."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        rows = seasonality.rebuild(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Flight calendar rebuilt: {rows} rows."))
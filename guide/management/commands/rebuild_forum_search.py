@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from guide import search
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the SQLite full-text tables for forum search from the thread and post tables, "
+        "e.g. after bulk imports that bypassed model signals. Postgres keeps its indexes current itself."
+    )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        counts = search.rebuild()
+        if not counts:
+            self.stdout.write("Nothing to rebuild: the search indexes are maintained by the database.")
+            return
+        summary = ", ".join(f"{n} {model._meta.verbose_name_plural}" for model, n in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Indexed {summary} in {time.perf_counter() - started:.1f}s."))
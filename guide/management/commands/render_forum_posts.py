@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from guide import markup
+from guide.models import ForumPost
+
+
+class Command(BaseCommand):
+    help = (
+        "Render forum posts into their stored HTML: posts never rendered or rendered by an older formatter, "
+        "or every post with --all (e.g. to link species added since)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Re-render posts already at the current format version.")
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        updated = markup.rerender(ForumPost.objects.all(), force=options["all"], batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Rendered {updated} posts in {time.perf_counter() - started:.1f}s.")
+        )
@@ -0,0 +1,95 @@
+import json
+import re
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from guide.querylog import explain
+
+
+READ_ONLY = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+
+
+class Command(BaseCommand):
+    help = "Re-run captured slow queries against the current schema and compare timings and plans."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "paths",
+            nargs="*",
+            help="Report files or directories (defaults to SLOW_QUERY_LOG_DIR).",
+        )
+        parser.add_argument("--repeat", type=int, default=5, help="Runs per query; the best time is reported.")
+        parser.add_argument("--no-plan", action="store_true", help="Skip printing the current EXPLAIN output.")
+
+    def handle(self, *args, **options):
+        files = self.collect_files(options["paths"] or [settings.SLOW_QUERY_LOG_DIR])
+        if not files:
+            raise CommandError("No slow query reports found.")
+
+        # Same statement captured on many requests is only replayed once.
+        queries = {}
+        for path in files:
+            report = json.loads(path.read_text())
+            for query in report.get("slow_queries", []):
+                if query.get("many") or not READ_ONLY.match(query["sql"]):
+                    continue
+                key = (query["alias"], query["sql"], json.dumps(query["params"]))
+                entry = queries.setdefault(key, {"query": query, "recorded": [], "views": set()})
+                entry["recorded"].append(query["duration_ms"])
+                if report.get("view"):
+                    entry["views"].add(report["view"])
+
+        if not queries:
+            self.stdout.write("No replayable SELECT statements in the reports.")
+            return
+
+        repeat = max(1, options["repeat"])
+        for entry in queries.values():
+            query = entry["query"]
+            if query["alias"] not in connections:
+                self.stdout.write(self.style.WARNING(f"Skipping query for unknown database {query['alias']!r}"))
+                continue
+            connection = connections[query["alias"]]
+
+            best_ms = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                with connection.cursor() as cursor:
+                    cursor.execute(query["sql"], query["params"])
+                    cursor.fetchall()
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                best_ms = elapsed_ms if best_ms is None else min(best_ms, elapsed_ms)
+
+            recorded_ms = min(entry["recorded"])
+            style = self.style.SUCCESS if best_ms < recorded_ms else self.style.WARNING
+            self.stdout.write(style(f"{recorded_ms:9.2f} ms -> {best_ms:9.2f} ms  ({len(entry['recorded'])}x captured)"))
+            if entry["views"]:
+                self.stdout.write(f"  views: {', '.join(sorted(entry['views']))}")
+            self.stdout.write(f"  {query['sql'][:200]}")
+
+            if not options["no_plan"]:
+                before = query.get("explain") or []
+                after = explain(connection, query["sql"], query["params"]) or []
+                if before != after:
+                    self.stdout.write("  plan changed:")
+                    for line in before:
+                        self.stdout.write(f"    - {line}")
+                    for line in after:
+                        self.stdout.write(f"    + {line}")
+                else:
+                    for line in after:
+                        self.stdout.write(f"    {line}")
+
+    def collect_files(self, paths):
+        files = []
+        for raw in paths:
+            path = Path(raw)
+            if path.is_dir():
+                files.extend(sorted(path.glob("*.json")))
+            elif path.is_file():
+                files.append(path)
+        return files
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from guide import activity
+
+
+class Command(BaseCommand):
+    help = (
+        "Email each user a digest of their unsent activity items through EMAIL_BACKEND. "
+        "Users with email updates turned off are skipped and their items retired."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--per-user", type=int, default=20, help="Items listed per email (the rest are counted).")
+        parser.add_argument("--dry-run", action="store_true", help="Build the digests without sending or marking anything.")
+
+    def handle(self, *args, **options):
+        sent, covered, skipped = activity.send_digests(per_user=options["per_user"], dry_run=options["dry_run"])
+        verb = "Would send" if options["dry_run"] else "Sent"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{verb} {sent} digests covering {covered} items via {settings.EMAIL_BACKEND}; "
+                f"{skipped} items skipped for opted-out users."
+            )
+        )
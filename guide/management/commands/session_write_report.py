@@ -0,0 +1,109 @@
+import random
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from guide import sessions
+from guide.models import Species
+
+
+WRITES = ("INSERT", "UPDATE", "DELETE")
+
+
+class WriteCounter:
+    def __init__(self):
+        self.total = 0
+        self.session = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        if sql.lstrip().split(None, 1)[0].upper() in WRITES:
+            self.total += 1
+            if "django_session" in sql:
+                self.session += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a browse workload (home, species pages, compare tray, flights) through the test client "
+        "and count database writes per 1,000 requests for each session backend. Runs in a transaction "
+        "that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=1000)
+        parser.add_argument("--visitors", type=int, default=100, help="Distinct browsers (cookie jars).")
+        parser.add_argument("--members", type=float, default=0.2, help="Share of visitors that are logged in.")
+        parser.add_argument(
+            "--backend",
+            action="append",
+            choices=sorted(sessions.BACKENDS),
+            help="Backends to measure (default: all). Django's stock db engine is always included as a baseline.",
+        )
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        species = list(Species.objects.values_list("pk", "slug")[:20])
+        if not species:
+            raise CommandError("No species in the database to browse.")
+
+        runs = [("stock db engine", None)] + [
+            (f"guide.sessions ({backend})", backend) for backend in options["backend"] or sessions.BACKENDS
+        ]
+        self.stdout.write(f"{'session setup':34} {'writes/1k':>10} {'session writes/1k':>18}")
+        for label, backend in runs:
+            counter = self.measure(backend, species, options)
+            scale = 1000 / options["requests"]
+            self.stdout.write(f"{label:34} {counter.total * scale:>10.0f} {counter.session * scale:>18.0f}")
+
+    def measure(self, backend, species, options):
+        # Same visitors and clicks for every backend.
+        rng = random.Random(options["seed"])
+        if backend is None:
+            engine = override_settings(SESSION_ENGINE="django.contrib.sessions.backends.db")
+        else:
+            engine = override_settings(SESSION_ENGINE="guide.sessions")
+        original_store = sessions.SessionStore
+
+        counter = WriteCounter()
+        try:
+            with engine, override_settings(ALLOWED_HOSTS=["*"]), transaction.atomic():
+                if backend is not None:
+                    sessions.SessionStore = sessions.store_class(backend)
+                visitors = []
+                for i in range(options["visitors"]):
+                    client = Client()
+                    if i < options["visitors"] * options["members"]:
+                        member, _ = User.objects.get_or_create(username=f"session-report-{i}")
+                        client.force_login(member)
+                    visitors.append(client)
+
+                # Warm-up: first-hit work (demo content, caches) is not counted.
+                for page in self.pages(*species[0]):
+                    Client().get(page)
+
+                with connection.execute_wrapper(counter):
+                    for _ in range(options["requests"]):
+                        client = rng.choice(visitors)
+                        client.get(self.next_page(rng, species))
+                transaction.set_rollback(True)
+        finally:
+            sessions.SessionStore = original_store
+        return counter
+
+    def pages(self, pk, slug):
+        return [
+            reverse("guide:home"),
+            reverse("guide:species_list"),
+            reverse("guide:species_detail", kwargs={"slug": slug}),
+            reverse("guide:add_to_compare", kwargs={"pk": pk}),
+            reverse("guide:species_compare"),
+            reverse("guide:clear_compare"),
+            reverse("guide:flights"),
+        ]
+
+    def next_page(self, rng, species):
+        return rng.choices(self.pages(*rng.choice(species)), weights=[15, 20, 35, 8, 7, 5, 10])[0]
@@ -0,0 +1,121 @@
+import itertools
+import random
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from guide.models import ForumPost, ForumSection, ForumThread
+
+
+VOCABULARY = 5000
+TEMPLATE = "Species: {} Queens: 1 Workers: about {} Brood: eggs, larvae and pupae Setup: test tube in a dark box Feeding:"
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the forum with --posts synthetic posts, index them for duplicate detection, then screen labelled "
+        "probe posts (copies with light edits vs. original writing, replies that quote, template journals) and "
+        "report precision, recall and checks per second. Runs in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--posts", type=int, default=100_000)
+        parser.add_argument("--probes", type=int, default=500, help="Probe posts of each kind.")
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        try:
+            from guide import spam
+        except ImportError:
+            raise CommandError("NumPy is not installed. Add it to requirements.txt to screen forum posts.")
+
+        self.rng = random.Random(options["seed"])
+        # Zipf-like word frequencies, so common words recur across posts as in real text.
+        self.words = [f"w{i}" for i in range(VOCABULARY)]
+        self.weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(VOCABULARY)))
+
+        with transaction.atomic():
+            author, texts = self.populate(options["posts"])
+            started = time.perf_counter()
+            indexed, _ = spam.backfill()
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"Indexed {indexed:,} of {len(texts):,} posts in {elapsed:.1f}s ({indexed / elapsed:,.0f} posts/s)"
+            )
+
+            self.stdout.write(f"{'probe':34} {'spam':>5} {'held':>7} {'median ms':>10} {'p99 ms':>8}")
+            tally = {True: [0, 0], False: [0, 0]}
+            timings = []
+            for label, is_spam, make in self.probe_kinds():
+                held, times = 0, []
+                for _ in range(options["probes"]):
+                    post = ForumPost(author=author, content=make(self.rng.choice(texts)))
+                    started = time.perf_counter()
+                    spam.screen(post)
+                    times.append((time.perf_counter() - started) * 1000)
+                    held += post.is_held
+                tally[is_spam][0] += held
+                tally[is_spam][1] += options["probes"]
+                timings += times
+                p99 = statistics.quantiles(times, n=100)[98]
+                self.stdout.write(
+                    f"{label:34} {'yes' if is_spam else 'no':>5} {held / options['probes']:>7.1%} "
+                    f"{statistics.median(times):>10.2f} {p99:>8.2f}"
+                )
+            transaction.set_rollback(True)
+
+        caught, spam_total = tally[True]
+        false_holds = tally[False][0]
+        precision = caught / (caught + false_holds) if caught + false_holds else 1.0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Similarity {settings.SPAM_SIMILARITY}: precision {precision:.1%}, recall {caught / spam_total:.1%}, "
+                f"{1000 / statistics.mean(timings):,.0f} checks/s"
+            )
+        )
+
+    def text(self, n):
+        return " ".join(self.rng.choices(self.words, cum_weights=self.weights, k=n))
+
+    def populate(self, count):
+        author = User.objects.create_user("spam-report")
+        section = ForumSection.objects.create(name="Spam report", slug="spam-report", description="")
+        threads = ForumThread.objects.bulk_create(
+            [ForumThread(section=section, title=f"Thread {i}", author=author) for i in range(max(count // 20, 1))],
+            batch_size=5000,
+        )
+        texts = []
+        for i in range(0, count, 5000):
+            batch = [
+                ForumPost(thread=self.rng.choice(threads), author=author, content=self.text(self.rng.randint(20, 150)))
+                for _ in range(min(5000, count - i))
+            ]
+            ForumPost.objects.bulk_create(batch)
+            texts += [post.content for post in batch]
+        return author, texts
+
+    def edit(self, text, share):
+        words = text.split()
+        for i in self.rng.sample(range(len(words)), int(len(words) * share)):
+            words[i] = self.rng.choice(self.words)
+        return " ".join(words)
+
+    def probe_kinds(self):
+        return [
+            ("exact copy", True, lambda source: source),
+            ("copy, 5% of words changed", True, lambda source: self.edit(source, 0.05)),
+            ("copy, 10% of words changed", True, lambda source: self.edit(source, 0.10)),
+            ("copy with a new link", True, lambda source: f"{source} https://example.com/{self.rng.randrange(10**6)}"),
+            ("copy, 30% of words changed", False, lambda source: self.edit(source, 0.30)),
+            ("original post", False, lambda source: self.text(self.rng.randint(20, 150))),
+            ("reply quoting a post", False, lambda source: f"> {source}\n\n{self.text(self.rng.randint(10, 40))}"),
+            (
+                "journal from a shared template",
+                False,
+                lambda source: TEMPLATE.format(self.text(2), self.rng.randint(5, 500)) + " " + self.text(25),
+            ),
+        ]
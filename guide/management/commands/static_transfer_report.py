@@ -0,0 +1,71 @@
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+
+
+STATIC_REF = re.compile(r"""["'](%s[^"'?#]+)""" % re.escape(settings.STATIC_URL))
+HASHED = re.compile(r"\.[0-9a-f]{12}\.[A-Za-z0-9]+$")
+
+
+class Command(BaseCommand):
+    help = (
+        "Estimate static bytes transferred for a cold and a warm load of a page, "
+        "using the collectstatic output (run collectstatic first)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default="/", help="Page to load (default: home page).")
+        parser.add_argument(
+            "--encoding",
+            choices=["br", "gzip", "identity"],
+            default="br",
+            help="Best encoding the simulated browser accepts.",
+        )
+
+    def handle(self, *args, **options):
+        root = Path(settings.STATIC_ROOT)
+        if not (root / "staticfiles.json").exists():
+            raise CommandError(f"No manifest in {root}; run collectstatic first.")
+
+        # Render as production would, so {% static %} emits hashed names.
+        with override_settings(DEBUG=False, ALLOWED_HOSTS=["*"]):
+            response = Client().get(options["path"])
+        if response.status_code != 200:
+            raise CommandError(f"{options['path']} returned {response.status_code}")
+
+        urls = sorted(set(STATIC_REF.findall(response.content.decode())))
+        suffixes = {"br": [".br", ".gz", ""], "gzip": [".gz", ""], "identity": [""]}[options["encoding"]]
+
+        rows = []
+        for url in urls:
+            name = url[len(settings.STATIC_URL):]
+            original = root / name
+            if not original.exists():
+                self.stdout.write(self.style.WARNING(f"missing: {url}"))
+                continue
+            # Size of the asset before the pipeline: the unhashed original.
+            unhashed = root / HASHED.sub(lambda m: "." + m.group(0).rsplit(".", 1)[1], name)
+            raw = (unhashed if unhashed.exists() else original).stat().st_size
+            sent = next(
+                (root / (name + s)).stat().st_size for s in suffixes if (root / (name + s)).exists()
+            )
+            rows.append((url, raw, sent, bool(HASHED.search(name))))
+
+        self.stdout.write(f"{'asset':60} {'raw':>10} {'sent':>10}  cache")
+        for url, raw, sent, immutable in rows:
+            self.stdout.write(f"{url[-60:]:60} {raw:>10} {sent:>10}  {'immutable' if immutable else 'revalidate'}")
+
+        raw_total = sum(r[1] for r in rows)
+        cold_total = sum(r[2] for r in rows)
+        revalidate = [r for r in rows if not r[3]]
+        self.stdout.write("")
+        self.stdout.write(f"Before pipeline, cold: {len(rows)} requests, {raw_total} bytes")
+        self.stdout.write(f"Before pipeline, warm: {len(rows)} conditional requests (no Cache-Control)")
+        self.stdout.write(f"With pipeline,   cold: {len(rows)} requests, {cold_total} bytes")
+        self.stdout.write(
+            f"With pipeline,   warm: {len(revalidate)} conditional requests, "
+            f"{len(rows) - len(revalidate)} served from cache, 0 bytes"
+        )
@@ -0,0 +1,37 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the SQLite primary into the DJANGO_SQLITE_REPLICA file, standing in for replication. "
+        "With --interval it keeps copying, so the replica lags the primary by up to that many seconds."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, default=None, help="Seconds between copies; omit to copy once.")
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES["default"]
+        replica = settings.DATABASES.get("replica")
+        if primary["ENGINE"] != "django.db.backends.sqlite3" or replica is None:
+            raise CommandError("Set DJANGO_SQLITE_REPLICA (and leave DB_NAME unset) to use a local replica.")
+        target = replica["NAME"].removeprefix("file:").split("?", 1)[0]
+
+        while True:
+            # The backup API copies a consistent snapshot even while the
+            # primary is being written to.
+            source = sqlite3.connect(primary["NAME"])
+            destination = sqlite3.connect(target)
+            try:
+                source.backup(destination)
+            finally:
+                destination.close()
+                source.close()
+            self.stdout.write(f"Copied {primary['NAME']} -> {target}")
+            if options["interval"] is None:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Fit per-species flight season windows by region and latitude band and save them for the prediction API."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", default=None, help="Defaults to settings.FLIGHT_MODEL_PATH.")
+
+    def handle(self, *args, **options):
+        try:
+            from guide import prediction
+        except ImportError:
+            raise CommandError("NumPy is not installed. Add it to requirements.txt to train the season model.")
+
+        model = prediction.train()
+        output = options["output"] or settings.FLIGHT_MODEL_PATH
+        prediction.save(model, output)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Trained on {int(model['flight_count'][0])} flights: "
+                f"{len(model['species_ids'])} species, {len(model['pair_cell'])} species/region/band windows -> {output}"
+            )
+        )
@@ -0,0 +1,165 @@
+import re
+
+from django.urls import reverse
+from django.utils.html import escape
+
+from .models import ForumPost, Species
+from .moderation import matching_species, name_key
+
+
+# Forum posts are written in a small Markdown subset and rendered once, on
+# save, into ForumPost.content_html:
+#   paragraphs and line breaks, "> " quotes (nested), "- " / "1. " lists,
+#   ``` fenced code, `code`, **bold**, *italic* / _italic_,
+#   [label](https://...) and bare http(s) links,
+#   and "Genus species" names of catalogued species linked to their page.
+# Every run of user text is escaped before any tag is added, and only the
+# tags above are ever emitted, so the stored HTML is safe to output as is.
+#
+# Bump FORMAT_VERSION whenever the output changes; `manage.py
+# render_forum_posts` re-renders every post stored with an older version.
+FORMAT_VERSION = 1
+
+MAX_QUOTE_DEPTH = 5
+
+FENCE = re.compile(r"^ {0,3}```")
+QUOTE = re.compile(r"^ {0,3}> ?(.*)$")
+LIST_ITEM = re.compile(r"^ {0,3}(?:([-*+])|\d{1,9}[.)]) +(.*)$")
+INLINE = re.compile(
+    r"`(?P<code>[^`\n]+)`"
+    r"|\[(?P<label>[^\]\n]+)\]\((?P<href>https?://[^\s()<>]+)\)"
+    r"|(?P<url>https?://[^\s()<>]*[^\s()<>.,;:!?'\"])"
+)
+STRONG = re.compile(r"\*\*(?=\S)([^<]+?)(?<=\S)\*\*")
+EM = re.compile(r"(?<![\w*])([*_])(?=\S)([^<]+?)(?<=\S)\1(?![\w*])")
+BINOMIAL = re.compile(r"\b([A-Z][a-z]+) ([a-z]{2,})\b")
+
+
+def mentions(text):
+    # Name keys of every "Genus species" pair in the text, catalogued or not.
+    return {name_key(genus, species) for genus, species in BINOMIAL.findall(text)}
+
+
+def species_slugs(keys=None):
+    # {(genus, species) name key: slug} for the given keys, or for every
+    # species when keys is None (bulk re-rendering).
+    if keys is None:
+        rows = Species.objects.exclude(species="").values_list("genus", "species", "slug")
+        return {name_key(genus, species): slug for genus, species, slug in rows}
+    return {key: species.slug for key, species in matching_species(keys).items()}
+
+
+class Renderer:
+    def __init__(self, species):
+        self.species = species
+        # Each species is linked at its first mention only.
+        self.linked = set()
+
+    def blocks(self, lines, depth=0):
+        out, i = [], 0
+        while i < len(lines):
+            line = lines[i]
+            if not line.strip():
+                i += 1
+            elif FENCE.match(line):
+                end = i + 1
+                while end < len(lines) and not FENCE.match(lines[end]):
+                    end += 1
+                out.append(f"<pre><code>{escape(chr(10).join(lines[i + 1:end]))}</code></pre>")
+                i = end + 1
+            elif QUOTE.match(line) and depth < MAX_QUOTE_DEPTH:
+                end = i
+                while end < len(lines) and QUOTE.match(lines[end]):
+                    end += 1
+                inner = [QUOTE.match(quoted).group(1) for quoted in lines[i:end]]
+                out.append(f"<blockquote>{''.join(self.blocks(inner, depth + 1))}</blockquote>")
+                i = end
+            elif LIST_ITEM.match(line):
+                ordered = LIST_ITEM.match(line).group(1) is None
+                items = []
+                while i < len(lines):
+                    item = LIST_ITEM.match(lines[i])
+                    if item is None or (item.group(1) is None) != ordered:
+                        break
+                    items.append(f"<li>{self.inline(item.group(2))}</li>")
+                    i += 1
+                tag = "ol" if ordered else "ul"
+                out.append(f"<{tag}>{''.join(items)}</{tag}>")
+            else:
+                end = i + 1
+                while end < len(lines) and lines[end].strip() and not self.starts_block(lines[end], depth):
+                    end += 1
+                out.append(f"<p>{'<br>'.join(self.inline(text) for text in lines[i:end])}</p>")
+                i = end
+        return out
+
+    def starts_block(self, line, depth):
+        return bool(FENCE.match(line) or LIST_ITEM.match(line) or (QUOTE.match(line) and depth < MAX_QUOTE_DEPTH))
+
+    def inline(self, line):
+        out, pos = [], 0
+        for match in INLINE.finditer(line):
+            out.append(self.text(line[pos:match.start()]))
+            if match["code"] is not None:
+                out.append(f"<code>{escape(match['code'])}</code>")
+            elif match["href"] is not None:
+                out.append(self.link(match["href"], self.text(match["label"], species=False)))
+            else:
+                out.append(self.link(match["url"], escape(match["url"])))
+            pos = match.end()
+        out.append(self.text(line[pos:]))
+        return "".join(out)
+
+    def text(self, value, species=True):
+        value = escape(value)
+        value = STRONG.sub(r"<strong>\1</strong>", value)
+        value = EM.sub(r"<em>\2</em>", value)
+        if species and self.species:
+            value = BINOMIAL.sub(self.species_link, value)
+        return value
+
+    def link(self, href, label):
+        return f'<a href="{escape(href)}" rel="nofollow ugc noopener">{label}</a>'
+
+    def species_link(self, match):
+        key = name_key(*match.groups())
+        slug = self.species.get(key)
+        if slug is None or key in self.linked:
+            return match.group(0)
+        self.linked.add(key)
+        url = reverse("guide:species_detail", kwargs={"slug": slug})
+        return f'<a href="{url}" class="species-link">{match.group(0)}</a>'
+
+
+def render(text, species=None):
+    # HTML for one post. `species` maps name keys to slugs; by default the
+    # species the text mentions are looked up through the name index.
+    text = text.replace("\r\n", "\n").replace("\r", "\n").replace("\x00", "")
+    if species is None:
+        species = species_slugs(mentions(text))
+    return "".join(Renderer(species).blocks(text.split("\n")))
+
+
+def render_post(post, species=None):
+    post.content_html = render(post.content, species)
+    post.content_html_version = FORMAT_VERSION
+
+
+def rerender(queryset, force=False, batch_size=500):
+    # Re-render stored HTML with one bulk_update per batch, leaving
+    # edited_at alone. Posts already at FORMAT_VERSION are skipped unless
+    # `force` (e.g. to link species added since). Returns the number written.
+    if not force:
+        queryset = queryset.filter(content_html_version__lt=FORMAT_VERSION)
+    species = species_slugs()
+    updated, batch = 0, []
+    for pk, content in queryset.values_list("pk", "content").iterator(chunk_size=batch_size):
+        batch.append(ForumPost(pk=pk, content_html=render(content, species), content_html_version=FORMAT_VERSION))
+        if len(batch) >= batch_size:
+            ForumPost.objects.bulk_update(batch, ["content_html", "content_html_version"])
+            updated += len(batch)
+            batch = []
+    if batch:
+        ForumPost.objects.bulk_update(batch, ["content_html", "content_html_version"])
+        updated += len(batch)
+    return updated
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:21
+
+import django.db.models.deletion
+from collections import Counter
+
+from django.db import migrations, models
+
+
+def fill_calendar(apps, schema_editor):
+    from guide.seasonality import calendar_keys
+
+    NuptialFlight = apps.get_model("guide", "NuptialFlight")
+    FlightCalendarCount = apps.get_model("guide", "FlightCalendarCount")
+    counts = Counter()
+    for row in NuptialFlight.objects.values_list("species_id", "date", "latitude", "longitude").iterator():
+        counts.update(calendar_keys(*row))
+    FlightCalendarCount.objects.bulk_create(
+        [
+            FlightCalendarCount(species_id=s, region=r, period=p, bucket=b, count=n)
+            for (s, r, p, b), n in counts.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guide', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FlightCalendarCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('region', models.CharField(choices=[('europe', 'Europe'), ('north_america', 'North America'), ('south_america', 'South America'), ('africa', 'Africa'), ('asia', 'Asia'), ('oceania', 'Oceania'), ('unknown', 'Unknown')], max_length=20)),
+                ('period', models.CharField(choices=[('week', 'ISO week'), ('month', 'Month')], max_length=5)),
+                ('bucket', models.PositiveSmallIntegerField(help_text='ISO week 1-53 or month 1-12')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('species', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='flight_calendar', to='guide.species')),
+            ],
+            options={
+                'unique_together': {('species', 'region', 'period', 'bucket')},
+            },
+        ),
+        migrations.RunPython(fill_calendar, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guide', '0002_flight_calendar_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='nuptialflight',
+            name='grid_cell',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='FlightEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+                ('report_count', models.PositiveIntegerField(default=1)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('species', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='flight_events', to='guide.species')),
+            ],
+            options={
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.AddField(
+            model_name='nuptialflight',
+            name='event',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reports', to='guide.flightevent'),
+        ),
+        migrations.AddIndex(
+            model_name='nuptialflight',
+            index=models.Index(fields=['species', 'grid_cell', 'date'], name='flight_dedup_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guide', '0003_flight_events'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='nuptialflight',
+            name='admin1_code',
+            field=models.CharField(blank=True, editable=False, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='nuptialflight',
+            name='country_code',
+            field=models.CharField(blank=True, editable=False, max_length=2),
+        ),
+        migrations.AddIndex(
+            model_name='nuptialflight',
+            index=models.Index(fields=['country_code', 'date'], name='flight_country_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='nuptialflight',
+            index=models.Index(fields=['admin1_code', 'date'], name='flight_admin1_idx'),
+        ),
+    ]
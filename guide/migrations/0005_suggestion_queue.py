@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:30
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guide', '0004_flight_area_codes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='species',
+            index=models.Index(django.db.models.functions.text.Lower('genus'), django.db.models.functions.text.Lower('species'), name='species_name_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='speciessuggestion',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='suggestion_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='speciessuggestion',
+            index=models.Index(fields=['reviewer', 'reviewed_at'], name='suggestion_reviewer_idx'),
+        ),
+    ]
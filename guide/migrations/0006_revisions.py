@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guide', '0005_suggestion_queue'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Revision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('target', models.CharField(choices=[('species', 'Species'), ('care', 'Species care')], max_length=10)),
+                ('object_id', models.PositiveIntegerField()),
+                ('number', models.PositiveIntegerField()),
+                ('is_snapshot', models.BooleanField(default=False)),
+                ('data', models.JSONField()),
+                ('reason', models.CharField(blank=True, max_length=200)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('author', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='revisions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['target', 'object_id', '-number'],
+                'unique_together': {('target', 'object_id', 'number')},
+            },
+        ),
+    ]
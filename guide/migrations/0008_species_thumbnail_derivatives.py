@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guide', '0007_activity_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='species',
+            name='thumbnail_derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guide', '0008_species_thumbnail_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='species',
+            index=models.Index(fields=['difficulty', 'region', 'founding_mode', 'diapause'], name='species_facets_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:06
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guide', '0009_species_facets_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='forumpost',
+            index=models.Index(fields=['-created_at', '-id'], name='post_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='forumthread',
+            index=models.Index(fields=['-updated_at', '-id'], name='thread_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='forumthread',
+            index=models.Index(fields=['section', '-updated_at', '-id'], name='thread_section_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='nuptialflight',
+            index=models.Index(fields=['-date', '-created_at', '-id'], name='flight_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='nuptialflight',
+            index=models.Index(fields=['species', '-date', '-created_at', '-id'], name='flight_species_date_idx'),
+        ),
+    ]
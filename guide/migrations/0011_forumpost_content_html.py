@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guide', '0010_admin_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='forumpost',
+            name='content_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='forumpost',
+            name='content_html_version',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+    ]
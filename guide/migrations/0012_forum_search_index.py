@@ -0,0 +1,52 @@
+from django.db import migrations
+
+
+# See guide.search. SQLite gets FTS5 tables filled from the current rows;
+# Postgres gets GIN expression indexes that match the queries there.
+SQLITE_TABLES = [
+    ("guide_forumpost_fts", "guide_forumpost", "content"),
+    ("guide_forumthread_fts", "guide_forumthread", "title"),
+]
+POSTGRES_INDEXES = [
+    ("forumpost_search_idx", "guide_forumpost", "content"),
+    ("forumthread_search_idx", "guide_forumthread", "title"),
+]
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        for table, source, column in SQLITE_TABLES:
+            schema_editor.execute(
+                f"CREATE VIRTUAL TABLE {table} USING fts5({column}, tokenize='porter unicode61 remove_diacritics 2')"
+            )
+            schema_editor.execute(f"INSERT INTO {table} (rowid, {column}) SELECT id, {column} FROM {source}")
+    elif vendor == "postgresql":
+        for name, source, column in POSTGRES_INDEXES:
+            schema_editor.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {source} USING gin (to_tsvector('english', {column}))"
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        for table, _, _ in SQLITE_TABLES:
+            schema_editor.execute(f"DROP TABLE IF EXISTS {table}")
+    elif vendor == "postgresql":
+        for name, _, _ in POSTGRES_INDEXES:
+            schema_editor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY keeps the forum writable while a large
+    # table is indexed, and cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('guide', '0011_forumpost_content_html'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guide', '0012_forum_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostShingleBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='forumpost',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='guide.forumpost'),
+        ),
+        migrations.AddField(
+            model_name='forumpost',
+            name='is_held',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='forumpost',
+            index=models.Index(condition=models.Q(('is_held', True)), fields=['-created_at'], name='post_held_idx'),
+        ),
+        migrations.AddField(
+            model_name='postshingleband',
+            name='post',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shingle_bands', to='guide.forumpost'),
+        ),
+        migrations.AddIndex(
+            model_name='postshingleband',
+            index=models.Index(fields=['key', 'created_at'], name='shingle_band_key_idx'),
+        ),
+    ]
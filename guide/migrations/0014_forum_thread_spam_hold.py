@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guide', '0013_forum_post_spam_hold'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='forumthread',
+            name='is_held',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Lower
 from django.contrib.auth.models import User
 from django.core.exceptions import ObjectDoesNotExist
 
@@ -48,20 +49,33 @@ class Species(models.Model):
     diapause = models.CharField(max_length=20, choices=DIAPAUSE_CHOICES)
 
     thumbnail = models.ImageField(upload_to="species_thumbs/", blank=True, null=True)
+    # Resized WebP/JPEG copies of the thumbnail, kept by guide.thumbnails.
+    thumbnail_derivatives = models.JSONField(default=dict, blank=True, editable=False)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["genus", "species"]
+        indexes = [
+            # Case-insensitive name lookups, e.g. duplicate checks on suggestions.
+            models.Index(Lower("genus"), Lower("species"), name="species_name_lower_idx"),
+            # Covers the GROUP BY behind the facet counts (guide.facets).
+            models.Index(fields=["difficulty", "region", "founding_mode", "diapause"], name="species_facets_idx"),
+        ]
 
     def __str__(self):
         return f"{self.genus} {self.species}".strip()
 
+    @staticmethod
+    def format_display_name(genus, species, common_name):
+        # Shared with code that reads raw values_list() rows.
+        if common_name:
+            return f"{common_name} ({genus} {species})".strip()
+        return f"{genus} {species}".strip()
+
     def display_name(self):
-        if self.common_name:
-            return f"{self.common_name} ({self.genus} {self.species})".strip()
-        return str(self)
+        return self.format_display_name(self.genus, self.species, self.common_name)
 
     def care_safe(self):
         try:
@@ -89,6 +103,40 @@ class SpeciesCare(models.Model):
         return f"Care for {self.species}"
 
 
+class Revision(models.Model):
+    # Append-only history for Species and SpeciesCare, keyed by species id.
+    # Most rows hold only the fields that changed, as line-level deltas
+    # against the previous revision; every SNAPSHOT_EVERY-th row holds the
+    # full record, so rebuilding any revision reads a bounded range.
+    # See guide.revisions.
+    TARGET_CHOICES = [
+        ("species", "Species"),
+        ("care", "Species care"),
+    ]
+
+    target = models.CharField(max_length=10, choices=TARGET_CHOICES)
+    object_id = models.PositiveIntegerField()
+    number = models.PositiveIntegerField()
+    is_snapshot = models.BooleanField(default=False)
+    data = models.JSONField()
+    author = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="revisions",
+    )
+    reason = models.CharField(max_length=200, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["target", "object_id", "-number"]
+        unique_together = ("target", "object_id", "number")
+
+    def __str__(self):
+        return f"{self.get_target_display()} #{self.object_id} r{self.number}"
+
+
 class Vendor(models.Model):
     CATEGORY_CHOICES = [
         ("formicarium", "Formicariums"),
@@ -109,6 +157,23 @@ class Vendor(models.Model):
         return self.name
 
 
+class FlightEvent(models.Model):
+    # One swarm, however many keepers reported it. Reports of the same
+    # species close in space and time share an event (see guide.dedup).
+    species = models.ForeignKey(Species, on_delete=models.CASCADE, related_name="flight_events")
+    date = models.DateField()
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    report_count = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-date"]
+
+    def __str__(self):
+        return f"{self.species} swarm on {self.date} ({self.report_count} reports)"
+
+
 class NuptialFlight(models.Model):
     species = models.ForeignKey(Species, on_delete=models.CASCADE, related_name="flights")
     user = models.ForeignKey(
@@ -125,13 +190,85 @@ class NuptialFlight(models.Model):
     region = models.CharField(max_length=100, blank=True)
     notes = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    event = models.ForeignKey(
+        FlightEvent,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="reports",
+    )
+    # Dedup grid cell for latitude/longitude, maintained by guide.dedup.
+    grid_cell = models.BigIntegerField(null=True, blank=True, editable=False)
+    # Normalised codes from the coordinates, maintained by guide.geocoding:
+    # ISO 3166-1 country ("US") and ISO 3166-2 subdivision ("US-WA").
+    country_code = models.CharField(max_length=2, blank=True, editable=False)
+    admin1_code = models.CharField(max_length=10, blank=True, editable=False)
 
     class Meta:
         ordering = ["-date", "-created_at"]
+        indexes = [
+            models.Index(fields=["species", "grid_cell", "date"], name="flight_dedup_idx"),
+            models.Index(fields=["country_code", "date"], name="flight_country_idx"),
+            models.Index(fields=["admin1_code", "date"], name="flight_admin1_idx"),
+            # Newest-first listings, all or for one species, and the admin
+            # date hierarchy. The trailing id matches the admin's tiebreak.
+            models.Index(fields=["-date", "-created_at", "-id"], name="flight_date_idx"),
+            models.Index(fields=["species", "-date", "-created_at", "-id"], name="flight_species_date_idx"),
+        ]
 
     def __str__(self):
         return f"{self.species} at {self.location_name} on {self.date}"
 
+    def as_json(self):
+        # Shape used by /api/flights/ and the live flight stream; load
+        # species and user with select_related() when serialising many.
+        return {
+            "id": self.id,
+            "event_id": self.event_id,
+            "species_id": self.species_id,
+            "species_name": self.species.display_name(),
+            "species_slug": self.species.slug,
+            "date": self.date.isoformat(),
+            "location_name": self.location_name,
+            "region": self.region,
+            "country_code": self.country_code,
+            "admin1_code": self.admin1_code,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "reporter": self.user.username if self.user else None,
+        }
+
+
+class FlightCalendarCount(models.Model):
+    # Materialised flight counts per species, coarse region and calendar
+    # bucket. Kept in step with NuptialFlight by guide.signals; rebuild with
+    # `manage.py rebuild_flight_calendar`.
+    REGION_CHOICES = [
+        ("europe", "Europe"),
+        ("north_america", "North America"),
+        ("south_america", "South America"),
+        ("africa", "Africa"),
+        ("asia", "Asia"),
+        ("oceania", "Oceania"),
+        ("unknown", "Unknown"),
+    ]
+    PERIOD_CHOICES = [
+        ("week", "ISO week"),
+        ("month", "Month"),
+    ]
+
+    species = models.ForeignKey(Species, on_delete=models.CASCADE, related_name="flight_calendar")
+    region = models.CharField(max_length=20, choices=REGION_CHOICES)
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    bucket = models.PositiveSmallIntegerField(help_text="ISO week 1-53 or month 1-12")
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("species", "region", "period", "bucket")
+
+    def __str__(self):
+        return f"{self.species} in {self.region}, {self.period} {self.bucket}: {self.count}"
+
 
 class ForumSection(models.Model):
     name = models.CharField(max_length=100)
@@ -160,31 +297,73 @@ class ForumThread(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_locked = models.BooleanField(default=False)
+    # Set when the opening post is held by guide.spam; the thread is shown
+    # only to its author until that post is released.
+    is_held = models.BooleanField(default=False)
 
     class Meta:
         ordering = ["-updated_at"]
+        indexes = [
+            # Newest-first lists, all or per section (section pages and the
+            # admin section filter).
+            models.Index(fields=["-updated_at", "-id"], name="thread_updated_idx"),
+            models.Index(fields=["section", "-updated_at", "-id"], name="thread_section_idx"),
+        ]
 
     def __str__(self):
         return self.title
 
     def last_post(self):
-        return self.posts.order_by("-created_at").first()
+        return self.posts.filter(is_held=False).order_by("-created_at").first()
 
 
 class ForumPost(models.Model):
     thread = models.ForeignKey(ForumThread, on_delete=models.CASCADE, related_name="posts")
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="posts")
     content = models.TextField()
+    # Rendered from content on save by guide.markup; re-render after
+    # formatter changes with `manage.py render_forum_posts`.
+    content_html = models.TextField(blank=True, editable=False)
+    content_html_version = models.PositiveSmallIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     edited_at = models.DateTimeField(auto_now=True)
+    # Set by guide.spam when a new post nearly repeats a recent one; held
+    # posts are shown only to their author until released in the admin.
+    is_held = models.BooleanField(default=False)
+    duplicate_of = models.ForeignKey(
+        "self",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
 
     class Meta:
         ordering = ["created_at"]
+        indexes = [
+            # The admin's newest-first list and date hierarchy.
+            models.Index(fields=["-created_at", "-id"], name="post_created_idx"),
+            # The moderators' queue of held posts.
+            models.Index(fields=["-created_at"], condition=models.Q(is_held=True), name="post_held_idx"),
+        ]
 
     def __str__(self):
         return f"Post by {self.author} in {self.thread}"
 
 
+class PostShingleBand(models.Model):
+    # One LSH band of a recent post's MinHash signature (guide.spam). Bands
+    # older than SPAM_WINDOW_DAYS are pruned by `manage.py index_post_shingles`.
+    post = models.ForeignKey(ForumPost, on_delete=models.CASCADE, related_name="shingle_bands")
+    key = models.BigIntegerField()
+    created_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["key", "created_at"], name="shingle_band_key_idx"),
+        ]
+
+
 class SpeciesBookmark(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="bookmarks")
     species = models.ForeignKey(Species, on_delete=models.CASCADE, related_name="bookmarks")
@@ -237,6 +416,68 @@ class SpeciesSuggestion(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "-created_at", "-id"], name="suggestion_queue_idx"),
+            models.Index(fields=["reviewer", "reviewed_at"], name="suggestion_reviewer_idx"),
+        ]
 
     def __str__(self):
         return f"Suggestion for {self.proposed_genus} {self.proposed_species}".strip()
+
+
+class Activity(models.Model):
+    # Something followers should hear about. Written once and fanned out to
+    # InboxItem rows by guide.activity.
+    VERB_CHOICES = [
+        ("flight", "New flight report"),
+        ("thread", "New forum thread"),
+        ("reply", "New reply"),
+        ("care", "Care guide edited"),
+    ]
+
+    verb = models.CharField(max_length=10, choices=VERB_CHOICES)
+    species = models.ForeignKey(
+        Species,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="activities",
+    )
+    actor = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="activities",
+    )
+    summary = models.CharField(max_length=255)
+    url = models.CharField(max_length=200)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return self.summary
+
+
+class InboxItem(models.Model):
+    # One row per follower per activity. digested_at is set once the item
+    # has gone out in an email digest (or was skipped because the user
+    # opted out), so the digest only scans pending rows.
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="inbox")
+    activity = models.ForeignKey(Activity, on_delete=models.CASCADE, related_name="inbox_items")
+    created_at = models.DateTimeField()
+    read_at = models.DateTimeField(null=True, blank=True)
+    digested_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-id"]
+        unique_together = ("user", "activity")
+        indexes = [
+            models.Index(fields=["user", "-id"], name="inbox_user_idx"),
+            models.Index(fields=["digested_at", "user"], name="inbox_digest_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.activity} for {self.user}"
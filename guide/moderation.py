@@ -0,0 +1,203 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q
+from django.db.models.functions import Lower
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .models import Species, SpeciesSuggestion
+from . import facets, revisions
+
+
+QUEUE_STATUSES = [value for value, _ in SpeciesSuggestion.STATUS_CHOICES]
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Defaults for species created straight from a suggestion; staff fill in the
+# real values afterwards in the admin.
+NEW_SPECIES_DEFAULTS = {
+    "difficulty": "medium",
+    "region": "temperate",
+    "founding_mode": "claustral",
+    "diapause": "required",
+}
+
+
+def name_key(genus, species):
+    return (genus or "").strip().lower(), (species or "").strip().lower()
+
+
+# Name keys per OR'd lookup. SQLite refuses expression trees deeper than
+# 1000, which a long post of capitalised word pairs would otherwise reach.
+MATCH_CHUNK = 100
+
+
+def matching_species(keys):
+    # Existing Species for a set of (genus, species) name keys, matched
+    # case-insensitively through the LOWER(genus), LOWER(species) index.
+    # Keys whose genus is not catalogued are dropped first, so arbitrary
+    # text costs a few genus lookups rather than one huge OR.
+    keys = set(keys)
+    if not keys:
+        return {}
+    named = Species.objects.annotate(genus_key=Lower("genus"), species_key=Lower("species"))
+    genera = sorted({genus for genus, _ in keys})
+    known = set()
+    for i in range(0, len(genera), MATCH_CHUNK):
+        known.update(named.filter(genus_key__in=genera[i:i + MATCH_CHUNK]).values_list("genus_key", flat=True))
+    keys = sorted(key for key in keys if key[0] in known)
+    found = {}
+    for i in range(0, len(keys), MATCH_CHUNK):
+        match = Q()
+        for genus, species in keys[i:i + MATCH_CHUNK]:
+            match |= Q(genus_key=genus, species_key=species)
+        for species in named.filter(match).order_by("pk"):
+            found.setdefault((species.genus_key, species.species_key), species)
+    return found
+
+
+def annotate_duplicates(suggestions):
+    # Attach `.duplicate_of` to each suggestion that names an existing species.
+    found = matching_species(
+        name_key(s.proposed_genus, s.proposed_species) for s in suggestions if not s.species_id
+    )
+    for suggestion in suggestions:
+        suggestion.duplicate_of = (
+            None if suggestion.species_id
+            else found.get(name_key(suggestion.proposed_genus, suggestion.proposed_species))
+        )
+    return suggestions
+
+
+def encode_cursor(suggestion):
+    return f"{suggestion.created_at.isoformat()}_{suggestion.pk}"
+
+
+def decode_cursor(cursor):
+    try:
+        created_at, pk = cursor.rsplit("_", 1)
+        return datetime.fromisoformat(created_at), int(pk)
+    except (AttributeError, ValueError):
+        return None
+
+
+def queue_page(status="pending", after=None, page_size=PAGE_SIZE):
+    # One page of the queue, newest first, continuing after the cursor of the
+    # previous page's last row. Reads walk the (status, created_at, id) index
+    # instead of counting and skipping OFFSET rows.
+    qs = SpeciesSuggestion.objects.select_related("species", "user", "reviewer").order_by("-created_at", "-pk")
+    if status in QUEUE_STATUSES:
+        qs = qs.filter(status=status)
+    position = decode_cursor(after)
+    if position is not None:
+        created_at, pk = position
+        qs = qs.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+
+    rows = list(qs[: page_size + 1])
+    page, more = rows[:page_size], len(rows) > page_size
+    annotate_duplicates(page)
+    return page, (encode_cursor(page[-1]) if more else None)
+
+
+def unique_slugs(names):
+    # One slug per (genus, species) name, avoiding slugs already taken and
+    # each other, with a single query for the existing ones.
+    bases = {key: slugify(f"{genus} {species}") or "species" for key, (genus, species) in names.items()}
+    match = Q()
+    for base in set(bases.values()):
+        match |= Q(slug=base) | Q(slug__startswith=f"{base}-")
+    taken = set(Species.objects.filter(match).values_list("slug", flat=True)) if bases else set()
+
+    slugs = {}
+    for key, base in bases.items():
+        slug, n = base, 2
+        while slug in taken:
+            slug, n = f"{base}-{n}", n + 1
+        taken.add(slug)
+        slugs[key] = slug
+    return slugs
+
+
+def review(ids, action, reviewer):
+    # Approve or reject many pending suggestions at once. Everything happens
+    # in one transaction: approving links each suggestion to the matching
+    # species, creating missing species in one bulk insert. Returns the
+    # number of suggestions changed; ones already reviewed are skipped.
+    if action not in ("approve", "reject"):
+        raise ValueError(f"unknown action {action!r}")
+
+    with transaction.atomic():
+        pending = list(
+            SpeciesSuggestion.objects.select_for_update()
+            .filter(pk__in=ids, status="pending")
+            .only("pk", "species_id", "proposed_genus", "proposed_species", "proposed_common_name")
+        )
+        if not pending:
+            return 0
+
+        if action == "approve":
+            unlinked = [s for s in pending if not s.species_id]
+            names = {}
+            for suggestion in unlinked:
+                key = name_key(suggestion.proposed_genus, suggestion.proposed_species)
+                names.setdefault(key, suggestion)
+
+            species_for = matching_species(names)
+            missing = {key: s for key, s in names.items() if key not in species_for}
+            slugs = unique_slugs(
+                {key: (s.proposed_genus.strip(), s.proposed_species.strip()) for key, s in missing.items()}
+            )
+            created = Species.objects.bulk_create(
+                [
+                    Species(
+                        slug=slugs[key],
+                        genus=s.proposed_genus.strip(),
+                        species=s.proposed_species.strip(),
+                        common_name=s.proposed_common_name.strip(),
+                        **NEW_SPECIES_DEFAULTS,
+                    )
+                    for key, s in missing.items()
+                ]
+            )
+            species_for.update(zip(missing, created))
+            if created:
+                facets.invalidate()
+            revisions.record_created(created, author=reviewer, reason="Created from a species suggestion")
+
+            by_species = defaultdict(list)
+            for suggestion in unlinked:
+                key = name_key(suggestion.proposed_genus, suggestion.proposed_species)
+                by_species[species_for[key].pk].append(suggestion.pk)
+            for species_id, suggestion_ids in by_species.items():
+                SpeciesSuggestion.objects.filter(pk__in=suggestion_ids).update(species_id=species_id)
+
+        return SpeciesSuggestion.objects.filter(pk__in=[s.pk for s in pending]).update(
+            status="approved" if action == "approve" else "rejected",
+            reviewer=reviewer,
+            reviewed_at=timezone.now(),
+        )
+
+
+def reviewer_stats(days=7):
+    # Reviews per staff member over the window, with a per-minute rate over
+    # the span they were actually reviewing.
+    since = timezone.now() - timedelta(days=days)
+    rows = (
+        SpeciesSuggestion.objects.filter(reviewer__isnull=False, reviewed_at__gte=since)
+        .values("reviewer__username")
+        .annotate(
+            reviewed=Count("pk"),
+            approved=Count("pk", filter=Q(status="approved")),
+            rejected=Count("pk", filter=Q(status="rejected")),
+            first=Min("reviewed_at"),
+            last=Max("reviewed_at"),
+        )
+        .order_by("-reviewed")
+    )
+    stats = []
+    for row in rows:
+        minutes = max((row["last"] - row["first"]).total_seconds() / 60, 1)
+        stats.append(dict(row, per_minute=round(row["reviewed"] / minutes, 1)))
+    return stats
@@ -0,0 +1,193 @@
+import os
+import tempfile
+import threading
+from datetime import date
+
+import numpy as np
+from django.conf import settings
+
+from .models import NuptialFlight, Species
+from .seasonality import REGION_BOXES, region_for
+
+
+# Bumped when the saved arrays change shape; older files are ignored until
+# the model is retrained.
+MODEL_VERSION = 2
+BAND_DEGREES = 10
+N_BANDS = 180 // BAND_DEGREES
+# Reports are grouped by continent (seasonality.REGION_BOXES) and latitude
+# band, so a keeper is only offered species seen on their own continent.
+REGIONS = [key for key, *_ in REGION_BOXES] + ["unknown"]
+N_CELLS = len(REGIONS) * N_BANDS
+DAYS = 366
+KERNEL_SIGMA_DAYS = 7.0
+NEIGHBOUR_BAND_WEIGHT = 0.5
+
+
+def latitude_band(latitude):
+    return int(min(max((latitude + 90) // BAND_DEGREES, 0), N_BANDS - 1))
+
+
+def region_index(latitude, longitude):
+    return REGIONS.index(region_for(latitude, longitude))
+
+
+def day_of_year(day):
+    return day.timetuple().tm_yday - 1
+
+
+def circular_kernel_fft():
+    # Gaussian over day-of-year that wraps from December into January.
+    offsets = np.arange(DAYS)
+    offsets = np.minimum(offsets, DAYS - offsets)
+    kernel = np.exp(-0.5 * (offsets / KERNEL_SIGMA_DAYS) ** 2)
+    return np.fft.rfft(kernel / kernel.sum())
+
+
+def train():
+    # Fit smoothed day-of-year flight counts for every (species, region,
+    # latitude band) cell that has sightings. Returns the arrays that make
+    # up a model.
+    rows = NuptialFlight.objects.filter(latitude__isnull=False, longitude__isnull=False).values_list(
+        "species_id", "date", "latitude", "longitude"
+    )
+    species_ids, days, lats, regions = [], [], [], []
+    for species_id, day, latitude, longitude in rows.iterator(chunk_size=5000):
+        species_ids.append(species_id)
+        days.append(day_of_year(day))
+        lats.append(latitude)
+        regions.append(region_index(latitude, longitude))
+
+    species_ids = np.asarray(species_ids, dtype=np.int64)
+    days = np.asarray(days, dtype=np.int16)
+    lats = np.asarray(lats, dtype=np.float64)
+    bands = np.clip((lats + 90) // BAND_DEGREES, 0, N_BANDS - 1).astype(np.int64)
+    cells = np.asarray(regions, dtype=np.int64) * N_BANDS + bands
+
+    known_species, species_index = np.unique(species_ids, return_inverse=True)
+
+    # Sort pairs by cell so every band of a region (and its neighbours in
+    # that region) is one contiguous slice.
+    pair_keys = cells * len(known_species) + species_index
+    pairs, pair_index = np.unique(pair_keys, return_inverse=True)
+    pair_cell = (pairs // max(len(known_species), 1)).astype(np.int16)
+    pair_species = (pairs % max(len(known_species), 1)).astype(np.int32)
+
+    histogram = np.zeros((len(pairs), DAYS), dtype=np.float64)
+    np.add.at(histogram, (pair_index, days), 1.0)
+    smoothed = np.fft.irfft(np.fft.rfft(histogram, axis=1) * circular_kernel_fft(), n=DAYS, axis=1)
+    smoothed = np.clip(smoothed, 0, None).astype(np.float32)
+
+    cell_offsets = np.searchsorted(pair_cell, np.arange(N_CELLS + 1)).astype(np.int32)
+
+    names = dict(
+        (row[0], (row[1], Species.format_display_name(*row[2:])))
+        for row in Species.objects.filter(id__in=known_species.tolist()).values_list(
+            "id", "slug", "genus", "species", "common_name"
+        )
+    )
+    return {
+        "version": np.array([MODEL_VERSION]),
+        "species_ids": known_species,
+        "species_slugs": np.array([names[s][0] for s in known_species.tolist()], dtype=str),
+        "species_names": np.array([names[s][1] for s in known_species.tolist()], dtype=str),
+        "pair_species": pair_species,
+        "pair_cell": pair_cell,
+        "cell_offsets": cell_offsets,
+        "density": smoothed,
+        "trained_on": np.array([date.today().isoformat()]),
+        "flight_count": np.array([len(days)]),
+    }
+
+
+def save(model, path=None):
+    # Write beside the live file and swap it in, so get_model() in a running
+    # process never loads a half-written file.
+    path = str(path or settings.FLIGHT_MODEL_PATH)
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    handle, temporary = tempfile.mkstemp(dir=directory, suffix=".npz.tmp")
+    try:
+        with os.fdopen(handle, "wb") as out:
+            np.savez_compressed(out, **model)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+class SeasonModel:
+    # In-memory model; every query touches only the rows for three latitude
+    # bands of one region.
+
+    def __init__(self, arrays):
+        self.species_ids = arrays["species_ids"]
+        self.species_slugs = arrays["species_slugs"]
+        self.species_names = arrays["species_names"]
+        self.pair_species = arrays["pair_species"]
+        self.pair_cell = arrays["pair_cell"]
+        self.cell_offsets = arrays["cell_offsets"]
+        self.density = arrays["density"]
+        self.trained_on = str(arrays["trained_on"][0])
+
+    def likely_flying(self, latitude, longitude, day, days=7, limit=10):
+        band = latitude_band(latitude)
+        first = region_index(latitude, longitude) * N_BANDS
+        start = self.cell_offsets[first + max(band - 1, 0)]
+        stop = self.cell_offsets[first + min(band + 1, N_BANDS - 1) + 1]
+        if start == stop:
+            return []
+
+        rows = self.density[start:stop]
+        weights = np.where(self.pair_cell[start:stop] == first + band, 1.0, NEIGHBOUR_BAND_WEIGHT)
+        window = (day_of_year(day) + np.arange(days)) % DAYS
+
+        expected = rows[:, window].sum(axis=1) * weights
+        season_total = rows.sum(axis=1) * weights
+        species = self.pair_species[start:stop]
+        n = len(self.species_ids)
+        expected = np.bincount(species, weights=expected, minlength=n)
+        season_total = np.bincount(species, weights=season_total, minlength=n)
+
+        candidates = np.flatnonzero(expected > 1e-3)
+        if len(candidates) > limit:
+            top = np.argpartition(-expected[candidates], limit)[:limit]
+            candidates = candidates[top]
+        candidates = candidates[np.argsort(-expected[candidates])]
+
+        return [
+            {
+                "species_id": int(self.species_ids[i]),
+                "slug": str(self.species_slugs[i]),
+                "name": str(self.species_names[i]),
+                # Smoothed number of reports in this window across past years.
+                "expected_reports": round(float(expected[i]), 3),
+                # Share of the species' local season that falls in the window.
+                "season_share": round(float(expected[i] / season_total[i]), 3) if season_total[i] else 0.0,
+            }
+            for i in candidates
+        ]
+
+
+_model = None
+_model_mtime = None
+_lock = threading.Lock()
+
+
+def get_model():
+    # Load once per process; pick up a retrained file without a restart.
+    global _model, _model_mtime
+    path = str(settings.FLIGHT_MODEL_PATH)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    if _model is None or mtime != _model_mtime:
+        with _lock:
+            if _model is None or mtime != _model_mtime:
+                with np.load(path) as arrays:
+                    if "version" not in arrays.files or int(arrays["version"][0]) != MODEL_VERSION:
+                        return None
+                    _model = SeasonModel({key: arrays[key] for key in arrays.files})
+                _model_mtime = mtime
+    return _model
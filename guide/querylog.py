@@ -0,0 +1,166 @@
+import json
+import re
+import sys
+import time
+import traceback
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+
+# Statements we are willing to EXPLAIN; EXPLAIN without ANALYZE never runs them.
+EXPLAINABLE = re.compile(r"^\s*(SELECT|WITH|UPDATE|DELETE)\b", re.IGNORECASE)
+
+
+def explain_prefix(vendor):
+    if vendor == "sqlite":
+        return "EXPLAIN QUERY PLAN "
+    if vendor == "postgresql":
+        return "EXPLAIN "
+    return None
+
+
+def explain(connection, sql, params):
+    # Return the plan for a statement as a list of text lines, or None.
+    prefix = explain_prefix(connection.vendor)
+    if not prefix or not EXPLAINABLE.match(sql):
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            rows = cursor.fetchall()
+    except Exception as exc:
+        return [f"EXPLAIN failed: {exc}"]
+    if connection.vendor == "sqlite":
+        # (id, parent, notused, detail)
+        return [str(row[-1]) for row in rows]
+    return [str(row[0]) for row in rows]
+
+
+def template_location(frames):
+    # Innermost template node being rendered when the query fired.
+    for frame in reversed(frames):
+        if frame.f_code.co_name != "render_annotated":
+            continue
+        node = frame.f_locals.get("self")
+        token = getattr(node, "token", None)
+        origin = getattr(node, "origin", None)
+        if token is not None and origin is not None:
+            return f"{origin.template_name or origin.name}:{token.lineno}"
+    return None
+
+
+def project_stack(frames):
+    # Only frames from our own code; Django and site-packages are noise here.
+    base = str(settings.BASE_DIR)
+    stack = []
+    for frame in frames:
+        filename = frame.f_code.co_filename
+        if not filename.startswith(base) or "site-packages" in filename:
+            continue
+        if filename == __file__:
+            continue
+        stack.append(f"{Path(filename).relative_to(base)}:{frame.f_lineno} in {frame.f_code.co_name}")
+    return stack
+
+
+class QueryRecorder:
+    # execute_wrapper that keeps every statement slower than the threshold.
+
+    def __init__(self, alias, threshold_ms):
+        self.alias = alias
+        self.threshold_ms = threshold_ms
+        self.captured = []
+        self.total = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.total += 1
+            if elapsed_ms >= self.threshold_ms:
+                frames = []
+                frame = sys._getframe(1)
+                while frame is not None:
+                    frames.append(frame)
+                    frame = frame.f_back
+                frames.reverse()
+                self.captured.append(
+                    {
+                        "alias": self.alias,
+                        "sql": sql,
+                        "params": None if many else list(params or []),
+                        "many": many,
+                        "duration_ms": round(elapsed_ms, 3),
+                        "template": template_location(frames),
+                        "stack": project_stack(frames),
+                    }
+                )
+
+
+def json_param(value):
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def write_report(request, view_name, recorders):
+    slow = [q for recorder in recorders for q in recorder.captured]
+    if not slow:
+        return None
+
+    for query in slow:
+        if not query["many"]:
+            query["explain"] = explain(connections[query["alias"]], query["sql"], query["params"])
+            query["params"] = [json_param(p) for p in query["params"]]
+
+    now = timezone.now()
+    report = {
+        "created_at": now.isoformat(),
+        "method": request.method,
+        "path": request.path,
+        "view": view_name,
+        "threshold_ms": settings.SLOW_QUERY_THRESHOLD_MS,
+        "query_count": sum(recorder.total for recorder in recorders),
+        "slow_queries": slow,
+    }
+
+    log_dir = Path(settings.SLOW_QUERY_LOG_DIR)
+    log_dir.mkdir(parents=True, exist_ok=True)
+    slug = re.sub(r"[^a-zA-Z0-9]+", "-", request.path).strip("-") or "root"
+    path = log_dir / f"{now:%Y%m%d-%H%M%S-%f}-{request.method.lower()}-{slug[:60]}.json"
+    path.write_text(json.dumps(report, indent=2))
+    return path
+
+
+class SlowQueryLogMiddleware:
+    # Development only: record slow SQL per request with its call site and plan.
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorders = []
+        with ExitStack() as stack:
+            for alias in connections:
+                recorder = QueryRecorder(alias, settings.SLOW_QUERY_THRESHOLD_MS)
+                stack.enter_context(connections[alias].execute_wrapper(recorder))
+                recorders.append(recorder)
+            response = self.get_response(request)
+
+        try:
+            path = write_report(request, getattr(request, "_slow_query_view", None), recorders)
+        except Exception:
+            traceback.print_exc()
+            path = None
+        if path is not None:
+            response["X-Slow-Query-Report"] = path.name
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._slow_query_view = f"{view_func.__module__}.{getattr(view_func, '__qualname__', view_func)}"
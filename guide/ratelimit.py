@@ -0,0 +1,171 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.module_loading import import_string
+
+from . import caching
+
+
+class MemoryBackend:
+    # Per-process buckets. Fine for tests and single-worker dev servers.
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            state = self.buckets.get(key)
+            if state is not None:
+                self.buckets.move_to_end(key)
+            return state
+
+    def set(self, key, state, ttl):
+        with self.lock:
+            self.buckets[key] = state
+            self.buckets.move_to_end(key)
+            while len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.buckets.clear()
+
+
+class CacheBackend:
+    # Buckets in the Django cache: shared by every worker only when the cache
+    # is (DJANGO_REDIS_URL); with the default LocMemCache each worker keeps
+    # its own buckets, so a client gets one budget per worker (see
+    # check_shared_cache). Two requests racing on the same key may both see
+    # the same token count, which can let a burst through by one or two
+    # requests; that is acceptable for flood protection and keeps the check
+    # to one get and one set per bucket.
+
+    def __init__(self, alias="default"):
+        self.alias = alias
+
+    def get(self, key):
+        return caches[self.alias].get(key)
+
+    def set(self, key, state, ttl):
+        caches[self.alias].set(key, state, ttl)
+
+    def clear(self):
+        caches[self.alias].clear()
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = import_string(settings.RATELIMIT_BACKEND)()
+    return _backend
+
+
+def reset_backend():
+    global _backend
+    _backend = None
+
+
+@checks.register()
+def check_shared_cache(app_configs, **kwargs):
+    if (
+        settings.DEBUG
+        or not settings.RATELIMIT_ENABLED
+        or import_string(settings.RATELIMIT_BACKEND) is not CacheBackend
+        or caching.is_shared()
+    ):
+        return []
+    return [
+        checks.Warning(
+            "Rate limits are kept in a per-process cache, so each worker counts its own budget.",
+            hint="Set DJANGO_REDIS_URL to share the buckets between workers.",
+            id="guide.W001",
+        )
+    ]
+
+
+def take_tokens(keys, capacity, period, now=None):
+    # Token buckets: `capacity` requests at once, refilled evenly over
+    # `period` seconds. A token is spent from every bucket only when all of
+    # them have one, so a request refused by one bucket costs the others
+    # nothing. Returns (allowed, seconds until the next token).
+    backend = get_backend()
+    now = time.time() if now is None else now
+    rate = capacity / period
+
+    levels = []
+    for key in keys:
+        state = backend.get(key)
+        if state is None:
+            levels.append(float(capacity))
+        else:
+            tokens, updated = state
+            levels.append(min(float(capacity), tokens + (now - updated) * rate))
+
+    allowed = all(tokens >= 1 for tokens in levels)
+    for key, tokens in zip(keys, levels):
+        backend.set(key, (tokens - 1 if allowed else tokens, now), int(period) + 1)
+    if allowed:
+        return True, 0
+    return False, (1 - min(levels)) / rate
+
+
+def take_token(key, capacity, period, now=None):
+    return take_tokens([key], capacity, period, now)
+
+
+def client_ip(request):
+    # nginx passes the real address in X-Real-IP; gunicorn only sees 127.0.0.1.
+    # The header is only believed from the proxy itself: anyone else could
+    # send a new value with every request and get a fresh bucket each time.
+    remote_addr = request.META.get("REMOTE_ADDR", "unknown")
+    header = settings.RATELIMIT_IP_HEADER
+    value = request.META.get(header) if header else None
+    if value and remote_addr in settings.RATELIMIT_TRUSTED_PROXIES:
+        return value.split(",")[0].strip()
+    return remote_addr
+
+
+def too_many_requests(retry_after):
+    seconds = max(1, int(retry_after + 0.999))
+    response = HttpResponse(
+        "Too many requests. Give the colony a moment and try again.",
+        status=429,
+        content_type="text/plain",
+    )
+    response["Retry-After"] = str(seconds)
+    return response
+
+
+def ratelimit(name, methods=("POST",)):
+    # Throttle a view by user and by client IP using the budget in
+    # settings.RATELIMIT_BUDGETS[name]. Only the listed methods spend tokens.
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapped(request, *args, **kwargs):
+            if not settings.RATELIMIT_ENABLED or request.method not in methods:
+                return view_func(request, *args, **kwargs)
+
+            capacity, period = settings.RATELIMIT_BUDGETS[name]
+            keys = [f"rl:{name}:ip:{client_ip(request)}"]
+            if request.user.is_authenticated:
+                keys.append(f"rl:{name}:user:{request.user.pk}")
+
+            allowed, retry_after = take_tokens(keys, capacity, period)
+            if not allowed:
+                return too_many_requests(retry_after)
+            return view_func(request, *args, **kwargs)
+
+        return wrapped
+
+    return decorator
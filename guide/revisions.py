@@ -0,0 +1,215 @@
+import difflib
+import json
+
+from django.db import IntegrityError, models, transaction
+
+from .models import Revision, Species, SpeciesCare
+
+
+# Every SNAPSHOT_EVERY-th revision (1, 26, 51, ...) stores the whole record,
+# so rebuilding any revision reads at most this many rows.
+SNAPSHOT_EVERY = 25
+
+TARGETS = {"species": Species, "care": SpeciesCare}
+UNTRACKED = {"id", "species", "created_at", "updated_at", "thumbnail_derivatives"}
+
+
+def tracked_fields(model):
+    return [f for f in model._meta.concrete_fields if f.name not in UNTRACKED]
+
+
+def target_of(instance):
+    # History is keyed by species id for both models, so a care record that
+    # is deleted and re-added keeps one timeline.
+    if isinstance(instance, Species):
+        return "species", instance.pk
+    return "care", instance.species_id
+
+
+def serialise(instance):
+    state = {}
+    for field in tracked_fields(type(instance)):
+        value = field.value_from_object(instance)
+        if isinstance(field, models.FileField):
+            value = value.name or ""
+        state[field.attname] = value
+    return state
+
+
+def encode_text(old, new):
+    # Line-level edit script: [start, end, replacement] for each changed run.
+    a, b = old.splitlines(keepends=True), new.splitlines(keepends=True)
+    matcher = difflib.SequenceMatcher(None, a, b, autojunk=False)
+    return [
+        [i1, i2, "".join(b[j1:j2])]
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag != "equal"
+    ]
+
+
+def apply_text(old, ops):
+    lines, out, pos = old.splitlines(keepends=True), [], 0
+    for start, end, text in ops:
+        out.extend(lines[pos:start])
+        out.append(text)
+        pos = end
+    out.extend(lines[pos:])
+    return "".join(out)
+
+
+def encode_delta(old, new):
+    # Only changed fields; long text becomes a patch when that is smaller.
+    delta = {}
+    for name, value in new.items():
+        if old.get(name) == value:
+            continue
+        if isinstance(value, str) and isinstance(old.get(name), str):
+            ops = encode_text(old[name], value)
+            if len(json.dumps(ops)) < len(json.dumps(value)):
+                delta.setdefault("patch", {})[name] = ops
+                continue
+        delta.setdefault("set", {})[name] = value
+    return delta
+
+
+def apply_delta(state, delta):
+    state = dict(state)
+    state.update(delta.get("set", {}))
+    for name, ops in delta.get("patch", {}).items():
+        state[name] = apply_text(state.get(name, ""), ops)
+    return state
+
+
+def snapshot_number(number):
+    return (number - 1) // SNAPSHOT_EVERY * SNAPSHOT_EVERY + 1
+
+
+def latest_number(target, object_id):
+    return (
+        Revision.objects.filter(target=target, object_id=object_id)
+        .order_by("-number")
+        .values_list("number", flat=True)
+        .first()
+    )
+
+
+def state_at(target, object_id, number):
+    # Rebuild one revision from its snapshot and the deltas after it: a
+    # single range read on the (target, object_id, number) index.
+    rows = Revision.objects.filter(
+        target=target,
+        object_id=object_id,
+        number__gte=snapshot_number(number),
+        number__lte=number,
+    ).order_by("number").values_list("number", "is_snapshot", "data")
+
+    state = None
+    for n, is_snapshot, data in rows:
+        state = dict(data) if is_snapshot else apply_delta(state, data)
+    if state is None or n != number:
+        raise Revision.DoesNotExist(f"{target} #{object_id} has no revision {number}")
+    return state
+
+
+def record(instance, author=None, reason=""):
+    # Append a revision for the instance's current values. Returns None when
+    # nothing tracked has changed since the latest revision.
+    target, object_id = target_of(instance)
+    state = serialise(instance)
+    for attempt in range(3):
+        try:
+            with transaction.atomic():
+                latest = latest_number(target, object_id)
+                previous = state_at(target, object_id, latest) if latest else None
+                if previous == state:
+                    return None
+                number = (latest or 0) + 1
+                is_snapshot = snapshot_number(number) == number
+                return Revision.objects.create(
+                    target=target,
+                    object_id=object_id,
+                    number=number,
+                    is_snapshot=is_snapshot,
+                    data=state if is_snapshot else encode_delta(previous, state),
+                    author=author,
+                    reason=reason[:200],
+                )
+        except IntegrityError:
+            # Another writer took this number; rebuild against theirs.
+            if attempt == 2:
+                raise
+
+
+def record_created(instances, author=None, reason=""):
+    # First revision for freshly bulk-created rows, in one insert.
+    return Revision.objects.bulk_create(
+        [
+            Revision(
+                target=target_of(instance)[0],
+                object_id=target_of(instance)[1],
+                number=1,
+                is_snapshot=True,
+                data=serialise(instance),
+                author=author,
+                reason=reason[:200],
+            )
+            for instance in instances
+        ]
+    )
+
+
+def ensure_baseline(instance):
+    # Rows that predate revision tracking get their stored values recorded
+    # before the first tracked edit overwrites them.
+    if instance.pk is None:
+        return
+    target, object_id = target_of(instance)
+    if Revision.objects.filter(target=target, object_id=object_id).exists():
+        return
+    stored = type(instance).objects.filter(pk=instance.pk).first()
+    if stored is not None:
+        record(stored, reason="Before revision tracking")
+
+
+def history(target, object_id):
+    return (
+        Revision.objects.filter(target=target, object_id=object_id)
+        .select_related("author")
+        .defer("data")
+        .order_by("-number")
+    )
+
+
+def diff(target, object_id, a, b):
+    # Field-by-field differences between two revisions, with unified diff
+    # lines for text.
+    old, new = state_at(target, object_id, a), state_at(target, object_id, b)
+    changes = {}
+    for name in new:
+        if old.get(name) == new[name]:
+            continue
+        change = {"from": old.get(name), "to": new[name]}
+        if isinstance(new[name], str) and isinstance(old.get(name), str):
+            change["lines"] = list(
+                difflib.unified_diff(
+                    old[name].splitlines(), new[name].splitlines(), f"r{a}", f"r{b}", n=1, lineterm=""
+                )
+            )[2:]
+        changes[name] = change
+    return changes
+
+
+def restore(target, object_id, number, author=None):
+    # Write an old revision back. History stays append-only: the restore is
+    # saved as a new revision on top.
+    state = state_at(target, object_id, number)
+    if target == "species":
+        instance = Species.objects.get(pk=object_id)
+    else:
+        instance = SpeciesCare.objects.filter(species_id=object_id).first() or SpeciesCare(species_id=object_id)
+    for name, value in state.items():
+        setattr(instance, name, value)
+    instance._revision_author = author
+    instance._revision_reason = f"Restored revision {number}"
+    instance.save()
+    return instance
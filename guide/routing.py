@@ -0,0 +1,103 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+
+
+# Reads go to a replica only inside a GET/HEAD request (see
+# ReplicaPinMiddleware) from a browser that has not written recently.
+# Everything else (POST handling, management commands, the shell) reads
+# from the primary, so read-then-write code never works from stale rows.
+_replica_reads = ContextVar("replica_reads", default=False)
+
+PIN_COOKIE = "db_pin"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+WRITE_STATEMENTS = {"INSERT", "UPDATE", "DELETE", "REPLACE"}
+
+
+def replicas():
+    return settings.DATABASE_REPLICAS
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def is_write(sql):
+    words = sql.lstrip()[:8].split(None, 1)
+    return bool(words) and words[0].upper() in WRITE_STATEMENTS
+
+
+def primary_reads(view):
+    # For GET views that write based on what they read (the activity feed
+    # marks the items it shows as read): read those rows from the primary.
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        with replica_reads(False):
+            return view(request, *args, **kwargs)
+
+    return wrapped
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not _replica_reads.get() or not replicas():
+            return "default"
+        # Reads inside a transaction on the primary must see its writes.
+        if connections["default"].in_atomic_block:
+            return "default"
+        return random.choice(replicas())
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        pool = {"default", *replicas()}
+        return obj1._state.db in pool and obj2._state.db in pool
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from replication (or sync_sqlite_replica).
+        return db == "default"
+
+
+class ReplicaPinMiddleware:
+    # Lets safe requests read from replicas, except for REPLICA_PIN_SECONDS
+    # after the same browser sent a POST or a request that wrote to the
+    # primary (a GET marking inbox items read, say): that window covers the
+    # redirect to the new flight or forum post, or the next page load, which
+    # the replica may not have received yet. The pin is a plain cookie, so
+    # it works across workers and whatever the session backend.
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        use_replica = request.method in SAFE_METHODS and PIN_COOKIE not in request.COOKIES
+        wrote = []
+
+        def watch(execute, sql, params, many, context):
+            if not wrote and is_write(sql):
+                wrote.append(sql)
+            return execute(sql, params, many, context)
+
+        with replica_reads(use_replica), connections["default"].execute_wrapper(watch):
+            response = self.get_response(request)
+        if (request.method not in SAFE_METHODS or wrote) and replicas():
+            response.set_cookie(
+                PIN_COOKIE,
+                "1",
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite="Lax",
+                secure=request.is_secure(),
+            )
+        return response
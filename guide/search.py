@@ -0,0 +1,204 @@
+import re
+
+from django.db import connections, router
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import ForumPost, ForumThread
+
+
+# Full-text search over thread titles and post bodies.
+#
+# SQLite: FTS5 tables (porter stemming) holding a copy of each title and
+# post, kept in step by guide.signals; rebuild them with
+# `manage.py rebuild_forum_search` after bulk imports. Triggers would also
+# catch bulk writes, but Django drops them whenever a migration rebuilds
+# the underlying SQLite table.
+# Postgres: GIN indexes on to_tsvector('english', ...) of the columns
+# themselves (migration 0012), which Postgres keeps current.
+FTS_TABLES = {ForumPost: ("guide_forumpost_fts", "content"), ForumThread: ("guide_forumthread_fts", "title")}
+CONFIG = "english"
+
+MAX_TERMS = 8
+RANK_WINDOW = 2000
+# Snippet markers: control characters that escape() leaves alone and that
+# highlight() turns into <mark> once the text around them is escaped.
+START, STOP = "\x02", "\x03"
+
+TERM = re.compile(r'"([^"]*)"|(\S+)')
+WORD = re.compile(r"\w+")
+
+
+def terms(q):
+    # Quoted phrases and single words, reduced to word characters, so user
+    # input never reaches the query parsers as syntax. Every term must match.
+    found = []
+    for phrase, word in TERM.findall(q):
+        words = WORD.findall(phrase or word)
+        if words:
+            found.append(words)
+    return found[:MAX_TERMS]
+
+
+def query_string(found):
+    # '"lasius niger" queen' reads the same to FTS5 MATCH and to Postgres'
+    # websearch_to_tsquery(): a phrase AND a word.
+    return " ".join('"{}"'.format(" ".join(words)) for words in found)
+
+
+def highlight(snippet):
+    out, marked = [], False
+    for part in re.split(f"([{START}{STOP}])", snippet):
+        if part == START:
+            if not marked:
+                out.append("<mark>")
+            marked = True
+        elif part == STOP:
+            if marked:
+                out.append("</mark>")
+            marked = False
+        else:
+            out.append(escape(part))
+    if marked:
+        out.append("</mark>")
+    return mark_safe("".join(out))
+
+
+def _filters(section_id, species_id):
+    sql, params = "", []
+    if section_id is not None:
+        sql += " AND t.section_id = %s"
+        params.append(section_id)
+    if species_id is not None:
+        sql += " AND t.species_id = %s"
+        params.append(species_id)
+    return sql, params
+
+
+def search(model, q, section_id=None, species_id=None, order="relevance", limit=20, offset=0):
+    # Matching posts (or threads) as [(pk, snippet html)], best match first,
+    # or newest first with order="recent". Section and species filters
+    # apply to the thread.
+    #
+    # Scoring every match of a common word costs seconds at a million posts,
+    # so "best match" ranks the newest RANK_WINDOW matches only (all of them
+    # for rarer words) and its pages end there; "recent" pages go back to
+    # the first post.
+    found = terms(q)
+    relevance = order == "relevance"
+    if not found or (relevance and offset >= RANK_WINDOW):
+        return []
+    connection = connections[router.db_for_read(model)]
+    table, column = FTS_TABLES[model]
+    source = model._meta.db_table
+    thread_id = "p.thread_id" if model is ForumPost else "p.id"
+    filters, filter_params = _filters(section_id, species_id)
+    # Held posts and threads stay indexed, so releasing one needs no reindex.
+    filters += " AND NOT t.is_held"
+    if model is ForumPost:
+        filters += " AND NOT p.is_held"
+
+    if connection.vendor == "postgresql":
+        # Candidates newest first, then rank and page them; ts_headline()
+        # only runs on the rows kept.
+        score = f"ts_rank(to_tsvector('{CONFIG}', c.body), q.query)" if relevance else "0"
+        sql = f"""
+            WITH q AS (SELECT websearch_to_tsquery('{CONFIG}', %s) AS query),
+            candidates AS (
+                SELECT p.id, p.{column} AS body
+                FROM {source} p
+                JOIN guide_forumthread t ON t.id = {thread_id}, q
+                WHERE to_tsvector('{CONFIG}', p.{column}) @@ q.query{filters}
+                ORDER BY p.id DESC
+                LIMIT %s
+            ),
+            page AS (
+                SELECT c.id, c.body, {score} AS score
+                FROM candidates c, q
+                ORDER BY score DESC, c.id DESC
+                LIMIT %s OFFSET %s
+            )
+            SELECT page.id, ts_headline('{CONFIG}', page.body, q.query, %s)
+            FROM page, q
+            ORDER BY page.score DESC, page.id DESC
+        """
+        window = RANK_WINDOW if relevance else offset + limit
+        options = f"StartSel={START}, StopSel={STOP}, MaxFragments=2, MinWords=8, MaxWords=24"
+        params = [query_string(found), *filter_params, window, limit, offset, options]
+    elif relevance:
+        # The FTS rowid is the post (or thread) id: bm25 runs on the rows at
+        # or after the RANK_WINDOW-th newest match.
+        matches = f"""
+            FROM {table}
+            JOIN {source} p ON p.id = {table}.rowid
+            JOIN guide_forumthread t ON t.id = {thread_id}
+            WHERE {table} MATCH %s{filters}
+        """
+        sql = f"""
+            SELECT p.id, snippet({table}, 0, %s, %s, '…', 20)
+            {matches}
+              AND {table}.rowid >= (
+                  SELECT min(id) FROM (SELECT {table}.rowid AS id {matches} ORDER BY {table}.rowid DESC LIMIT %s)
+              )
+            ORDER BY {table}.rank, {table}.rowid DESC
+            LIMIT %s OFFSET %s
+        """
+        match_params = [query_string(found), *filter_params]
+        params = [START, STOP, *match_params, *match_params, RANK_WINDOW, limit, offset]
+    else:
+        # Newest first walks the index backwards instead of sorting matches.
+        sql = f"""
+            SELECT p.id, snippet({table}, 0, %s, %s, '…', 20)
+            FROM {table}
+            JOIN {source} p ON p.id = {table}.rowid
+            JOIN guide_forumthread t ON t.id = {thread_id}
+            WHERE {table} MATCH %s{filters}
+            ORDER BY {table}.rowid DESC
+            LIMIT %s OFFSET %s
+        """
+        params = [START, STOP, query_string(found), *filter_params, limit, offset]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [(pk, highlight(snippet)) for pk, snippet in cursor.fetchall()]
+
+
+def _sqlite(model):
+    connection = connections[router.db_for_write(model)]
+    return connection if connection.vendor == "sqlite" else None
+
+
+def index(instance):
+    # Called on save (guide.signals); Postgres needs nothing.
+    connection = _sqlite(type(instance))
+    if connection is None:
+        return
+    table, column = FTS_TABLES[type(instance)]
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {table} WHERE rowid = %s", [instance.pk])
+        cursor.execute(f"INSERT INTO {table} (rowid, {column}) VALUES (%s, %s)", [instance.pk, getattr(instance, column)])
+
+
+def unindex(instance):
+    connection = _sqlite(type(instance))
+    if connection is None:
+        return
+    table, _ = FTS_TABLES[type(instance)]
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {table} WHERE rowid = %s", [instance.pk])
+
+
+def rebuild():
+    # Refill the SQLite tables from scratch and merge their segments;
+    # returns {model: rows indexed}. A no-op on Postgres.
+    counts = {}
+    for model, (table, column) in FTS_TABLES.items():
+        connection = _sqlite(model)
+        if connection is None:
+            continue
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {table}")
+            cursor.execute(f"INSERT INTO {table} (rowid, {column}) SELECT id, {column} FROM {model._meta.db_table}")
+            counts[model] = cursor.rowcount
+            cursor.execute(f"INSERT INTO {table} ({table}) VALUES ('optimize')")
+    return counts
@@ -0,0 +1,92 @@
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+
+from .models import FlightCalendarCount, NuptialFlight
+
+
+# Coarse continent boxes as (key, lat_min, lat_max, lng_min, lng_max). Checked
+# in order, so the narrower boxes come first. Good enough for "when does this
+# species fly in Europe", not for borders.
+REGION_BOXES = [
+    ("europe", 36.0, 72.0, -25.0, 45.0),
+    ("africa", -36.0, 37.5, -20.0, 52.0),
+    ("north_america", 7.0, 84.0, -170.0, -50.0),
+    ("south_america", -57.0, 13.0, -92.0, -32.0),
+    ("oceania", -50.0, 0.0, 110.0, 180.0),
+    ("asia", -11.0, 82.0, 25.0, 180.0),
+]
+
+
+def region_for(latitude, longitude):
+    if latitude is None or longitude is None:
+        return "unknown"
+    for key, lat_min, lat_max, lng_min, lng_max in REGION_BOXES:
+        if lat_min <= latitude <= lat_max and lng_min <= longitude <= lng_max:
+            return key
+    return "unknown"
+
+
+def calendar_keys(species_id, day, latitude, longitude):
+    # The (species, region, period, bucket) rows one flight contributes to.
+    region = region_for(latitude, longitude)
+    return [
+        (species_id, region, "week", day.isocalendar()[1]),
+        (species_id, region, "month", day.month),
+    ]
+
+
+def flight_keys(flight):
+    return calendar_keys(flight.species_id, flight.date, flight.latitude, flight.longitude)
+
+
+def apply_delta(keys, delta):
+    # Adjust counters with a single UPDATE each; insert the row on first use.
+    for species_id, region, period, bucket in keys:
+        rows = FlightCalendarCount.objects.filter(
+            species_id=species_id, region=region, period=period, bucket=bucket
+        )
+        if delta < 0:
+            rows.filter(count__gte=-delta).update(count=F("count") + delta)
+            continue
+        if rows.update(count=F("count") + delta):
+            continue
+        try:
+            with transaction.atomic():
+                FlightCalendarCount.objects.create(
+                    species_id=species_id, region=region, period=period, bucket=bucket, count=delta
+                )
+        except IntegrityError:
+            # Another writer created it first.
+            rows.update(count=F("count") + delta)
+
+
+def rebuild(batch_size=1000):
+    counts = Counter()
+    flights = NuptialFlight.objects.values_list("species_id", "date", "latitude", "longitude")
+    for row in flights.iterator(chunk_size=5000):
+        counts.update(calendar_keys(*row))
+
+    with transaction.atomic():
+        FlightCalendarCount.objects.all().delete()
+        FlightCalendarCount.objects.bulk_create(
+            [
+                FlightCalendarCount(species_id=s, region=r, period=p, bucket=b, count=n)
+                for (s, r, p, b), n in counts.items()
+            ],
+            batch_size=batch_size,
+        )
+    return len(counts)
+
+
+def species_calendar(species_id, period="week", region=None):
+    # Counts per bucket for one species, summed over regions unless one is given.
+    size = 53 if period == "week" else 12
+    rows = FlightCalendarCount.objects.filter(species_id=species_id, period=period)
+    if region:
+        rows = rows.filter(region=region)
+    totals = [0] * size
+    for bucket, total in rows.values("bucket").annotate(total=Sum("count")).values_list("bucket", "total"):
+        totals[bucket - 1] = total
+    return totals
@@ -0,0 +1,64 @@
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+
+# SESSION_ENGINE = "guide.sessions". The storage underneath is picked by
+# SESSION_BACKEND (see settings); this module adds two things on top of it:
+# a request that sets session keys to the values they already had does not
+# write, and expired database sessions are deleted in batches.
+BACKENDS = {
+    "db": "django.contrib.sessions.backends.db.SessionStore",
+    "cached_db": "django.contrib.sessions.backends.cached_db.SessionStore",
+    "cache": "django.contrib.sessions.backends.cache.SessionStore",
+    "signed_cookies": "django.contrib.sessions.backends.signed_cookies.SessionStore",
+}
+
+CLEAR_EXPIRED_BATCH = 5000
+
+
+class QuietSessionMixin:
+    def load(self):
+        data = super().load()
+        # What is stored now, to compare against at save time. Views mutate
+        # lists in place before reassigning them, so `modified` alone (or an
+        # equality check in __setitem__) cannot tell a real change.
+        self._stored_state = self.serializer().dumps(data)
+        return data
+
+    def save(self, must_create=False):
+        if (
+            not must_create
+            and self.session_key
+            and getattr(self, "_stored_state", None) == self.serializer().dumps(self._get_session())
+        ):
+            return
+        super().save(must_create=must_create)
+        self._stored_state = self.serializer().dumps(self._get_session())
+
+    @classmethod
+    def clear_expired(cls):
+        # One huge DELETE holds its locks for as long as it runs; delete in
+        # batches of keys read from the expire_date index instead.
+        if not hasattr(cls, "get_model_class"):
+            return super().clear_expired()
+        model = cls.get_model_class()
+        now = timezone.now()
+        deleted = 0
+        while True:
+            keys = list(
+                model.objects.filter(expire_date__lt=now)
+                .order_by()
+                .values_list("session_key", flat=True)[:CLEAR_EXPIRED_BATCH]
+            )
+            if not keys:
+                return deleted
+            deleted += model.objects.filter(session_key__in=keys).delete()[0]
+
+
+def store_class(backend):
+    base = import_string(BACKENDS[backend])
+    return type("SessionStore", (QuietSessionMixin, base), {"__module__": __name__})
+
+
+SessionStore = store_class(settings.SESSION_BACKEND)
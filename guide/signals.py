@@ -1,9 +1,194 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, pre_save, post_delete
 from django.contrib.auth.models import User
 from django.dispatch import receiver
-from .models import Profile
+from django.db import transaction
+from .models import Profile, NuptialFlight, Species, SpeciesCare, SpeciesBookmark, ForumThread, ForumPost
+from . import seasonality, dedup, revisions, bookmarks, activity, live, thumbnails, facets, markup, search
+
+try:
+    from . import geocoding
+except ImportError:  # Without NumPy flights are saved without area codes.
+    geocoding = None
+
+try:
+    from . import climate
+except ImportError:  # No climate index to refresh without NumPy.
+    climate = None
+
+try:
+    from . import spam
+except ImportError:  # Without NumPy new posts are not screened for duplicates.
+    spam = None
 
 @receiver(post_save, sender=User)
 def create_profile(sender, instance, created, **kwargs):
     if created:
         Profile.objects.create(user=instance)
+
+
+@receiver(post_save, sender=SpeciesBookmark)
+@receiver(post_delete, sender=SpeciesBookmark)
+def invalidate_bookmark_cache(sender, instance, **kwargs):
+    # Covers the admin and any other writer outside guide.bookmarks.
+    bookmarks.invalidate(instance.user_id)
+
+
+@receiver(pre_save, sender=Species)
+@receiver(pre_save, sender=SpeciesCare)
+def record_revision_baseline(sender, instance, raw=False, **kwargs):
+    if not raw:
+        revisions.ensure_baseline(instance)
+
+
+@receiver(post_save, sender=Species)
+@receiver(post_save, sender=SpeciesCare)
+def record_revision(sender, instance, raw=False, **kwargs):
+    # Callers that know who made the edit (admin, restore) set these first.
+    if raw:
+        return
+    author = getattr(instance, "_revision_author", None)
+    revision = revisions.record(instance, author=author, reason=getattr(instance, "_revision_reason", ""))
+    if revision is not None and sender is SpeciesCare:
+        activity.care_edited(instance, actor=author)
+
+
+@receiver(post_save, sender=Species)
+@receiver(post_delete, sender=Species)
+def invalidate_species_facets(sender, **kwargs):
+    facets.invalidate()
+
+
+@receiver(post_save, sender=Species)
+@receiver(post_delete, sender=Species)
+@receiver(post_save, sender=SpeciesCare)
+@receiver(post_delete, sender=SpeciesCare)
+def invalidate_climate_index(sender, **kwargs):
+    if climate is not None:
+        climate.invalidate()
+
+
+@receiver(post_save, sender=Species)
+def refresh_thumbnail_derivatives(sender, instance, raw=False, **kwargs):
+    # After commit, so a failed save never leaves orphaned files behind.
+    if not raw and not thumbnails.is_current(instance) and (instance.thumbnail or instance.thumbnail_derivatives):
+        transaction.on_commit(lambda: thumbnails.refresh(instance))
+
+
+@receiver(post_save, sender=NuptialFlight)
+def announce_flight(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        activity.flight_reported(instance)
+
+
+@receiver(post_save, sender=NuptialFlight)
+def push_live_flight(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        live.publish_on_commit("flights", instance.as_json())
+
+
+@receiver(pre_save, sender=ForumPost)
+def render_post_content(sender, instance, raw=False, **kwargs):
+    if not raw:
+        markup.render_post(instance)
+
+
+@receiver(pre_save, sender=ForumPost)
+def screen_post(sender, instance, raw=False, **kwargs):
+    # A thread's opening post is screened by the view, before the thread.
+    screened = hasattr(instance, "_shingle_bands")
+    if spam is not None and not raw and instance.pk is None and not screened:
+        spam.screen(instance)
+
+
+@receiver(post_save, sender=ForumPost)
+def index_post_shingles(sender, instance, created, raw=False, **kwargs):
+    if spam is not None and created and not raw:
+        spam.index(instance)
+
+
+@receiver(post_save, sender=ForumPost)
+def push_live_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and not instance.is_held:
+        live.publish_on_commit(f"thread:{instance.thread_id}", live.post_event(instance))
+
+
+@receiver(post_save, sender=ForumPost)
+@receiver(post_save, sender=ForumThread)
+def index_forum_search(sender, instance, **kwargs):
+    # Fixtures (raw saves) too: the copy must match the row whatever wrote it.
+    search.index(instance)
+
+
+@receiver(post_delete, sender=ForumPost)
+@receiver(post_delete, sender=ForumThread)
+def unindex_forum_search(sender, instance, **kwargs):
+    search.unindex(instance)
+
+
+@receiver(post_save, sender=ForumThread)
+def announce_thread(sender, instance, created, raw=False, **kwargs):
+    # Held threads are announced when released (forum.release_post).
+    if created and not raw and instance.species_id and not instance.is_held:
+        activity.thread_started(instance)
+
+
+@receiver(pre_save, sender=NuptialFlight)
+def remember_flight_calendar_keys(sender, instance, raw=False, **kwargs):
+    # Edits can move a flight to another species, region or week; keep the
+    # old keys so post_save can move the count with it, and the old values so
+    # cluster_flight can tell whether the report left its event.
+    instance._old_calendar_keys = None
+    instance._old_cluster_fields = None
+    if raw or instance.pk is None:
+        return
+    old = NuptialFlight.objects.filter(pk=instance.pk).values_list(
+        "species_id", "date", "latitude", "longitude"
+    ).first()
+    if old is not None:
+        instance._old_calendar_keys = seasonality.calendar_keys(*old)
+        instance._old_cluster_fields = old
+
+
+@receiver(pre_save, sender=NuptialFlight)
+def cluster_flight(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    old = getattr(instance, "_old_cluster_fields", None)
+    moved = old is not None and old != (instance.species_id, instance.date, instance.latitude, instance.longitude)
+    if instance.event_id is not None and moved:
+        # Another species, day or place: leave the old event and match afresh.
+        dedup.release_event(instance.event_id)
+        instance.event = None
+    if instance.event_id is None:
+        dedup.assign_event(instance)
+    elif instance.latitude is not None and instance.longitude is not None:
+        instance.grid_cell = dedup.get_grid().cell(instance.latitude, instance.longitude)
+    else:
+        instance.grid_cell = None
+
+
+@receiver(pre_save, sender=NuptialFlight)
+def geocode_flight(sender, instance, raw=False, **kwargs):
+    if raw or geocoding is None:
+        return
+    geocoding.geocode_flight(instance)
+
+
+@receiver(post_save, sender=NuptialFlight)
+def update_flight_calendar(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    new_keys = seasonality.flight_keys(instance)
+    old_keys = getattr(instance, "_old_calendar_keys", None)
+    if old_keys == new_keys:
+        return
+    if old_keys:
+        seasonality.apply_delta(old_keys, -1)
+    seasonality.apply_delta(new_keys, 1)
+
+
+@receiver(post_delete, sender=NuptialFlight)
+def remove_from_flight_calendar(sender, instance, **kwargs):
+    seasonality.apply_delta(seasonality.flight_keys(instance), -1)
+    if instance.event_id is not None:
+        dedup.release_event(instance.event_id)
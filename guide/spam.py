@@ -0,0 +1,185 @@
+import hashlib
+import re
+import zlib
+from collections import Counter
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .markup import QUOTE
+from .models import ForumPost, PostShingleBand
+
+
+# Near-duplicate detection for new forum posts. A post is cut into
+# overlapping SHINGLE_WORDS-word shingles and summarised by a MinHash
+# signature of BANDS x ROWS values. Posts that agree on every value of any
+# one band share that band's key, and PostShingleBand's (key, created_at)
+# index finds them directly. Only those candidates are then compared, on
+# their actual shingles. A check therefore reads a handful of buckets
+# however many posts are stored.
+#
+# With 20 bands of 3 rows, a pair at similarity 0.7 shares a bucket 99.98%
+# of the time. At 0.5 the figure is 93%, at 0.3 it is 42%.
+SHINGLE_WORDS = 3
+# Shorter posts ("Thanks!", "+1") repeat each other legitimately.
+MIN_SHINGLES = 8
+BANDS, ROWS = 20, 3
+MAX_CANDIDATES = 20
+# Rows read per band key, newest first. A copy-paste flood piles its posts
+# into the same buckets; the newest PER_KEY of each still hold copies, and a
+# check reads at most BANDS * PER_KEY rows however big the flood gets.
+PER_KEY = 50
+
+# h(x) = (a * x + b) mod PRIME over 32-bit shingle hashes. a, b < 2**32,
+# so nothing overflows uint64. The parameters come from a fixed hash,
+# which keeps signatures identical across processes and NumPy versions.
+PRIME = 4294967311  # the first prime above 2**32
+
+
+def _parameters(label):
+    return np.frombuffer(hashlib.shake_128(label).digest(4 * BANDS * ROWS), dtype="<u4").astype(np.uint64)
+
+
+A = _parameters(b"guide.spam a") | np.uint64(1)
+B = _parameters(b"guide.spam b")
+
+WORD = re.compile(r"\w+")
+
+
+def shingles(text):
+    # 32-bit hashes of the post's word shingles. Quoted lines are left out,
+    # so quoting a post is not copying it.
+    lines = [line for line in text.splitlines() if not QUOTE.match(line)]
+    words = WORD.findall(" ".join(lines).lower())
+    return {
+        zlib.crc32(" ".join(words[i:i + SHINGLE_WORDS]).encode())
+        for i in range(len(words) - SHINGLE_WORDS + 1)
+    }
+
+
+def signature(hashes):
+    x = np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+    return ((x[:, None] * A + B) % np.uint64(PRIME)).min(axis=0)
+
+
+def band_keys(sig):
+    # One signed 64-bit key per band. The band number is hashed in, so equal
+    # values in different bands never collide.
+    sig = sig.astype("<u8")
+    return [
+        int.from_bytes(
+            hashlib.blake2b(bytes([band]) + sig[band * ROWS:(band + 1) * ROWS].tobytes(), digest_size=8).digest(),
+            "little",
+            signed=True,
+        )
+        for band in range(BANDS)
+    ]
+
+
+def fingerprint(text):
+    # (shingle hashes, band keys), or None for posts too short to judge.
+    hashes = shingles(text)
+    if len(hashes) < MIN_SHINGLES:
+        return None
+    return hashes, band_keys(signature(hashes))
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b)
+
+
+def window_start():
+    return timezone.now() - timedelta(days=settings.SPAM_WINDOW_DAYS)
+
+
+def bucket_rows(keys, exclude=None):
+    # Post ids from the newest PER_KEY rows of each bucket, one range scan
+    # of the (key, created_at) index per key, in a single query.
+    connection = connections[router.db_for_read(PostShingleBand)]
+    start = connection.ops.adapt_datetimefield_value(window_start())
+    condition = "key = %s AND created_at >= %s" + (" AND post_id <> %s" if exclude is not None else "")
+    parts, params = [], []
+    for i, key in enumerate(keys):
+        parts.append(
+            f"SELECT post_id FROM (SELECT post_id FROM {PostShingleBand._meta.db_table} WHERE {condition} "
+            f"ORDER BY created_at DESC LIMIT %s) AS bucket{i}"
+        )
+        params += [key, start] + ([exclude] if exclude is not None else []) + [PER_KEY]
+    if not parts:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(" UNION ALL ".join(parts), params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def find_duplicate(hashes, keys, exclude=None):
+    # The most similar recent post sharing a bucket, as (post id,
+    # similarity), or None. The posts sharing the most bands are checked.
+    ids = [pk for pk, _ in Counter(bucket_rows(keys, exclude)).most_common(MAX_CANDIDATES)]
+    best = None
+    for pk, content in ForumPost.objects.filter(pk__in=ids).values_list("pk", "content"):
+        similarity = jaccard(hashes, shingles(content))
+        if best is None or similarity > best[1]:
+            best = (pk, similarity)
+    return best
+
+
+def screen(post):
+    # Called before a new post is saved (guide.signals). Holds the post for
+    # review when it nearly repeats a recent post, and keeps its band keys
+    # for index(). Staff posts are indexed but never held.
+    post._shingle_bands = None
+    found = fingerprint(post.content)
+    if found is None:
+        return
+    hashes, post._shingle_bands = found
+    if post.author.is_staff:
+        return
+    match = find_duplicate(hashes, post._shingle_bands, exclude=post.pk)
+    if match is not None and match[1] >= settings.SPAM_SIMILARITY:
+        post.is_held = True
+        post.duplicate_of_id = match[0]
+
+
+def index(post):
+    keys = getattr(post, "_shingle_bands", None)
+    if keys:
+        PostShingleBand.objects.bulk_create(
+            [PostShingleBand(post_id=post.pk, key=key, created_at=post.created_at) for key in keys]
+        )
+
+
+def backfill(batch_size=1000):
+    # Drop bands that have left the window, then index the window's posts
+    # that have no bands yet. These are posts written before this existed
+    # or bulk-created without signals. Nothing is held retroactively.
+    # Returns (posts indexed, bands pruned).
+    start = window_start()
+    pruned, _ = PostShingleBand.objects.filter(created_at__lt=start).delete()
+    ids = list(
+        ForumPost.objects.filter(created_at__gte=start)
+        .filter(~Exists(PostShingleBand.objects.filter(post_id=OuterRef("pk"))))
+        .values_list("pk", flat=True)
+    )
+    connection = connections[router.db_for_write(PostShingleBand)]
+    # executemany() rather than bulk_create(): building a model instance
+    # per band was most of the time.
+    sql = f"INSERT INTO {PostShingleBand._meta.db_table} (post_id, key, created_at) VALUES (%s, %s, %s)"
+    indexed = 0
+    for i in range(0, len(ids), batch_size):
+        rows = []
+        for pk, content, created_at in ForumPost.objects.filter(pk__in=ids[i:i + batch_size]).values_list(
+            "pk", "content", "created_at"
+        ):
+            found = fingerprint(content)
+            if found is not None:
+                created_at = connection.ops.adapt_datetimefield_value(created_at)
+                rows.extend((pk, key, created_at) for key in found[1])
+                indexed += 1
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, rows)
+    return indexed, pruned
@@ -45,7 +45,9 @@ function initHeroViewer() {
     controls.enablePan = false;
     controls.minDistance = 0.5;
     controls.maxDistance = 20;
-    controls.autoRotate = true;
+    // Respect the motion mode main.js picked for this visitor.
+    const reducedMotion = document.documentElement.getAttribute("data-motion") === "reduced";
+    controls.autoRotate = !reducedMotion;
     controls.autoRotateSpeed = 0.8;
 
     // Studio-ish lighting.
@@ -78,7 +80,7 @@ function initHeroViewer() {
         const maxSize = Math.max(size.x, size.y, size.z);
         if (!isFinite(maxSize) || maxSize === 0) return;
 
-        // Center and put on ground.
+        // Center and put on “ground”.
         object.position.sub(center);
         object.position.y -= box.min.y;
 
@@ -156,8 +158,30 @@ function initHeroViewer() {
         renderer.setSize(width, height);
     });
 
+    // Stop rendering while the hero is scrolled away or the tab is hidden.
+    let onScreen = true;
+    let frameId = null;
+    if ("IntersectionObserver" in window) {
+        new IntersectionObserver((entries) => {
+            onScreen = entries[entries.length - 1].isIntersecting;
+            resume();
+        }).observe(container);
+    }
+    document.addEventListener("visibilitychange", resume);
+
+    function resume() {
+        if (frameId === null && onScreen && !document.hidden) {
+            clock.getDelta();
+            frameId = requestAnimationFrame(animate);
+        }
+    }
+
     function animate() {
-        requestAnimationFrame(animate);
+        if (!onScreen || document.hidden) {
+            frameId = null;
+            return;
+        }
+        frameId = requestAnimationFrame(animate);
 
         const delta = clock.getDelta();
         if (mixer) {
@@ -168,7 +192,7 @@ function initHeroViewer() {
         renderer.render(scene, camera);
     }
 
-    animate();
+    resume();
 }
 
 if (document.readyState === "loading") {
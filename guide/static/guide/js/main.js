@@ -1,18 +1,248 @@
 document.addEventListener("DOMContentLoaded", function () {
-    // Speed up keeper note WebM animation if present.
+    // Decorative motion mode. "reduced" when the visitor asks for less motion,
+    // has Save-Data on, runs a low-power device, or picked calm mode in the footer.
+    var motionChoice = null;
+    try {
+        motionChoice = window.localStorage.getItem("antMotion");
+    } catch (err) {
+        motionChoice = null;
+    }
+    var prefersReducedMotion =
+        window.matchMedia &&
+        window.matchMedia("(prefers-reduced-motion: reduce)").matches;
+    var connection = navigator.connection || {};
+    var lowPower =
+        connection.saveData === true ||
+        (navigator.hardwareConcurrency && navigator.hardwareConcurrency <= 2) ||
+        (navigator.deviceMemory && navigator.deviceMemory <= 2);
+    var reducedMotion =
+        motionChoice === "reduced" ||
+        (motionChoice !== "full" && (prefersReducedMotion || lowPower));
+    document.documentElement.setAttribute(
+        "data-motion",
+        reducedMotion ? "reduced" : "full"
+    );
+
+    var motionToggle = document.querySelector("[data-motion-toggle]");
+    if (motionToggle) {
+        motionToggle.textContent = reducedMotion
+            ? "Let the ants roam"
+            : "Calm mode";
+        motionToggle.addEventListener("click", function () {
+            try {
+                window.localStorage.setItem(
+                    "antMotion",
+                    reducedMotion ? "full" : "reduced"
+                );
+            } catch (err) {
+                return;
+            }
+            window.location.reload();
+        });
+    }
+
+    // Run heavy decorative work only once the main thread has nothing better to do.
+    function whenIdle(callback) {
+        if ("requestIdleCallback" in window) {
+            window.requestIdleCallback(callback, { timeout: 2000 });
+        } else {
+            window.setTimeout(callback, 200);
+        }
+    }
+
+    // Call onEnter/onLeave as an element scrolls in and out of view.
+    function watchVisibility(el, onEnter, onLeave, margin) {
+        if (!("IntersectionObserver" in window)) {
+            onEnter();
+            return;
+        }
+        var watcher = new IntersectionObserver(
+            function (entries) {
+                entries.forEach(function (entry) {
+                    if (entry.isIntersecting) {
+                        onEnter(watcher);
+                    } else if (onLeave) {
+                        onLeave(watcher);
+                    }
+                });
+            },
+            { rootMargin: margin || "0px" }
+        );
+        watcher.observe(el);
+    }
+
+    // Server-sent events with catch-up: every (re)connect asks for what came
+    // after the newest id seen, so a "resync" or a hidden tab just reconnects.
+    function liveStream(url, lastId, eventName, onEvent) {
+        if (!("EventSource" in window)) {
+            return;
+        }
+        var source = null;
+
+        function open() {
+            source = new EventSource(url + (url.indexOf("?") >= 0 ? "&" : "?") + "after=" + lastId);
+            source.addEventListener(eventName, function (event) {
+                var data = JSON.parse(event.data);
+                lastId = Math.max(lastId, data.id);
+                onEvent(data);
+            });
+            source.addEventListener("resync", function () {
+                close();
+                open();
+            });
+            source.addEventListener("error", function () {
+                // The browser retries dropped streams itself, but gives up on
+                // an error status (503 when the server is full): back off.
+                if (source && source.readyState === EventSource.CLOSED) {
+                    close();
+                    window.setTimeout(open, 10000 + Math.random() * 10000);
+                }
+            });
+        }
+
+        function close() {
+            if (source) {
+                source.close();
+                source = null;
+            }
+        }
+
+        // Give the connection back while the tab is in the background.
+        document.addEventListener("visibilitychange", function () {
+            if (document.hidden) {
+                close();
+            } else if (!source) {
+                open();
+            }
+        });
+        open();
+    }
+
+    // New replies appear in open threads without a reload.
+    var livePosts = document.querySelector("[data-live-posts]");
+    if (livePosts) {
+        var replyBox = document.querySelector(".rainforest-form textarea[name='content']");
+        liveStream(
+            livePosts.getAttribute("data-live-src"),
+            parseInt(livePosts.getAttribute("data-last-id"), 10) || 0,
+            "post",
+            function (post) {
+                if (document.getElementById("post-" + post.id)) {
+                    return;
+                }
+                var empty = livePosts.querySelector("[data-live-empty]");
+                if (empty) {
+                    empty.remove();
+                }
+                var card = document.createElement("div");
+                card.id = "post-" + post.id;
+                card.className = "card rainforest-card mb-3";
+                var body = document.createElement("div");
+                body.className = "card-body";
+                var header = document.createElement("div");
+                header.className = "d-flex justify-content-between align-items-center mb-2";
+                var author = document.createElement("strong");
+                author.setAttribute("data-post-author", "");
+                author.textContent = post.author;
+                var when = document.createElement("span");
+                when.className = "small text-muted";
+                when.textContent = new Date(post.created_at).toLocaleString();
+                header.appendChild(author);
+                header.appendChild(when);
+                var content = document.createElement("div");
+                content.className = "post-content";
+                // Escaped and formatted server-side.
+                content.innerHTML = post.html;
+                body.appendChild(header);
+                body.appendChild(content);
+                if (replyBox) {
+                    var quote = document.createElement("button");
+                    quote.type = "button";
+                    quote.className = "btn btn-link btn-sm p-0 mt-1";
+                    quote.setAttribute("data-quote-post", "");
+                    quote.textContent = "Quote";
+                    body.appendChild(quote);
+                }
+                card.appendChild(body);
+                livePosts.appendChild(card);
+            }
+        );
+
+        // "Quote" copies the post's text into the reply box as "> " lines.
+        livePosts.addEventListener("click", function (event) {
+            var button = event.target.closest("[data-quote-post]");
+            if (!button || !replyBox) {
+                return;
+            }
+            var card = button.closest(".card");
+            var text = card.querySelector(".post-content").innerText.trim();
+            var author = card.querySelector("[data-post-author]").textContent;
+            var quoted = ("**" + author + "** wrote:\n" + text).split("\n").map(function (line) {
+                return "> " + line;
+            }).join("\n");
+            replyBox.value = (replyBox.value.trim() ? replyBox.value.trim() + "\n\n" : "") + quoted + "\n\n";
+            replyBox.focus();
+        });
+    }
+
+    // Keeper note WebM: nothing is downloaded until the card is on screen.
     var keeperVideos = document.querySelectorAll("video.keeper-note-sprite");
     keeperVideos.forEach(function (v) {
         var rate = 1.8;
-        v.autoplay = true;
         v.loop = true;
         v.muted = true;
         v.playsInline = true;
-        v.playbackRate = rate;
         v.addEventListener("loadedmetadata", function () {
             v.playbackRate = rate;
         });
+
+        watchVisibility(
+            v,
+            function () {
+                if (reducedMotion) {
+                    // Still frame only.
+                    v.preload = "metadata";
+                    return;
+                }
+                whenIdle(function () {
+                    v.preload = "auto";
+                    var playing = v.play();
+                    if (playing && playing.catch) {
+                        playing.catch(function () {});
+                    }
+                });
+            },
+            function () {
+                if (!v.paused) {
+                    v.pause();
+                }
+            },
+            "100px"
+        );
     });
 
+    // 3D hero: three.js and the model are only fetched when the hero is near
+    // the viewport and the browser is idle.
+    var hero = document.getElementById("ant3d-hero");
+    if (hero && hero.getAttribute("data-module-src")) {
+        watchVisibility(
+            hero,
+            function (watcher) {
+                if (watcher) {
+                    watcher.disconnect();
+                }
+                whenIdle(function () {
+                    var script = document.createElement("script");
+                    script.type = "module";
+                    script.src = hero.getAttribute("data-module-src");
+                    document.body.appendChild(script);
+                });
+            },
+            null,
+            "200px"
+        );
+    }
+
     // Try to focus the first field on the main forms so you can just start typing.
     var firstFormField = document.querySelector(
         ".rainforest-form input, .rainforest-form select, .rainforest-form textarea"
@@ -21,6 +251,91 @@ document.addEventListener("DOMContentLoaded", function () {
         firstFormField.focus();
     }
 
+    // "Select all" checkboxes on bulk-action tables (moderation queue).
+    document.querySelectorAll("[data-select-all]").forEach(function (toggle) {
+        var name = toggle.getAttribute("data-select-all");
+        var form = toggle.closest("form");
+        toggle.addEventListener("change", function () {
+            form.querySelectorAll('input[type="checkbox"][name="' + name + '"]').forEach(function (box) {
+                box.checked = toggle.checked;
+            });
+        });
+    });
+
+    // Species filters: refresh the counts beside each option as filters change.
+    var facetForm = document.querySelector("form[data-facets-src]");
+    if (facetForm) {
+        facetForm.querySelectorAll("select").forEach(function (select) {
+            select.addEventListener("change", function () {
+                var params = new URLSearchParams(new FormData(facetForm));
+                fetch(facetForm.getAttribute("data-facets-src") + "?" + params.toString(), {
+                    headers: { Accept: "application/json" },
+                })
+                    .then(function (response) {
+                        if (!response.ok) {
+                            throw new Error(response.status);
+                        }
+                        return response.json();
+                    })
+                    .then(function (data) {
+                        Object.keys(data.facets).forEach(function (name) {
+                            var field = facetForm.querySelector('select[name="' + name + '"]');
+                            if (!field) {
+                                return;
+                            }
+                            var any = 0;
+                            data.facets[name].forEach(function (option) {
+                                any += option.count;
+                                var el = field.querySelector('option[value="' + option.value + '"]');
+                                if (el) {
+                                    el.textContent = option.label + " (" + option.count + ")";
+                                }
+                            });
+                            var anyOption = field.querySelector('option[value=""]');
+                            if (anyOption) {
+                                anyOption.textContent = "Any (" + any + ")";
+                            }
+                        });
+                    })
+                    .catch(function () {});
+            });
+        });
+    }
+
+    // Bookmark buttons toggle in place; without JS the form posts normally.
+    document.querySelectorAll("form[data-bookmark-toggle]").forEach(function (form) {
+        form.addEventListener("submit", function (event) {
+            event.preventDefault();
+            var button = form.querySelector("button");
+            button.disabled = true;
+            fetch(form.action, {
+                method: "POST",
+                headers: {
+                    Accept: "application/json",
+                    "X-CSRFToken": form.querySelector("[name=csrfmiddlewaretoken]").value,
+                },
+                credentials: "same-origin",
+            })
+                .then(function (response) {
+                    if (!response.ok) {
+                        throw new Error(response.status);
+                    }
+                    return response.json();
+                })
+                .then(function (data) {
+                    button.textContent = data.bookmarked ? "Bookmarked" : "Bookmark";
+                    button.classList.toggle("btn-outline-light", data.bookmarked);
+                    button.classList.toggle("btn-success", !data.bookmarked);
+                })
+                .catch(function () {
+                    form.submit();
+                })
+                .finally(function () {
+                    button.disabled = false;
+                });
+        });
+    });
+
     // Fade cards up as they enter the viewport.
     var fadeItems = document.querySelectorAll(".fade-rise");
     if (fadeItems.length > 0 && "IntersectionObserver" in window) {
@@ -88,127 +403,266 @@ document.addEventListener("DOMContentLoaded", function () {
         resetTilt();
     });
 
-    // Flight map positioning, driven by the JSON API.
+    // Flight map, drawn on one canvas from the compact JSON API.
     var map = document.getElementById("flight-map");
     if (map) {
         var tableBody = document.querySelector("[data-flight-table-body]");
-        var markers = [];
+        var flightData = null;
+        var canvas = document.createElement("canvas");
+        canvas.className = "flight-map-canvas";
+        map.insertBefore(canvas, map.firstChild);
+        var ctx = canvas.getContext("2d");
+        var MARKER_RADIUS = 4;
+        var HIT_RADIUS = 7;
+
+        // Simple "good enough" projection to spread markers over the map.
+        function projectX(lng, width) {
+            return ((lng + 180) / 360) * width;
+        }
 
-        function positionMarkers() {
+        function projectY(lat, height) {
+            return ((90 - lat) / 180) * height;
+        }
+
+        function dateLabel(dayNumber) {
+            return new Date(dayNumber * 86400000).toISOString().slice(0, 10);
+        }
+
+        function drawMap() {
             var width = map.clientWidth;
             var height = map.clientHeight;
-            if (!width || !height || !markers.length) {
+            if (!width || !height) {
+                return;
+            }
+            var ratio = window.devicePixelRatio || 1;
+            canvas.width = Math.round(width * ratio);
+            canvas.height = Math.round(height * ratio);
+            canvas.style.width = width + "px";
+            canvas.style.height = height + "px";
+            ctx.setTransform(ratio, 0, 0, ratio, 0, 0);
+            ctx.clearRect(0, 0, width, height);
+
+            if (!flightData) {
                 return;
             }
 
-            markers.forEach(function (marker) {
-                var lat = parseFloat(marker.dataset.lat);
-                var lng = parseFloat(marker.dataset.lng);
-                if (isNaN(lat) || isNaN(lng)) {
-                    return;
+            // One path for every marker, so the whole layer is a single fill.
+            var lat = flightData.lat;
+            var lng = flightData.lng;
+            ctx.beginPath();
+            for (var i = 0; i < lat.length; i++) {
+                if (lat[i] == null || lng[i] == null) {
+                    continue;
                 }
-
-                // Simple "good enough" projection to spread markers over the image.
-                var x = ((lng + 180) / 360) * width;
-                var y = ((90 - lat) / 180) * height;
-
-                marker.style.left = x + "px";
-                marker.style.top = y + "px";
-            });
+                var x = projectX(lng[i], width);
+                var y = projectY(lat[i], height);
+                ctx.moveTo(x + MARKER_RADIUS, y);
+                ctx.arc(x, y, MARKER_RADIUS, 0, Math.PI * 2);
+            }
+            ctx.fillStyle = "rgba(0, 255, 170, 0.85)";
+            ctx.strokeStyle = "rgba(0, 0, 0, 0.8)";
+            ctx.lineWidth = 1;
+            ctx.fill();
+            ctx.stroke();
         }
 
-        function renderFlights(flights) {
-            // Clear previous markers.
-            markers.splice(0, markers.length);
+        function flightAt(clientX, clientY) {
+            if (!flightData) {
+                return -1;
+            }
+            var rect = canvas.getBoundingClientRect();
+            var px = clientX - rect.left;
+            var py = clientY - rect.top;
+            var best = -1;
+            var bestDistSq = HIT_RADIUS * HIT_RADIUS;
+            for (var i = 0; i < flightData.lat.length; i++) {
+                if (flightData.lat[i] == null || flightData.lng[i] == null) {
+                    continue;
+                }
+                var dx = projectX(flightData.lng[i], rect.width) - px;
+                var dy = projectY(flightData.lat[i], rect.height) - py;
+                var d2 = dx * dx + dy * dy;
+                if (d2 <= bestDistSq) {
+                    bestDistSq = d2;
+                    best = i;
+                }
+            }
+            return best;
+        }
 
-            var overlay = map.querySelector(".flight-map-overlay");
-            map.innerHTML = "";
-            if (overlay) {
-                map.appendChild(overlay);
+        canvas.addEventListener("mousemove", function (event) {
+            var i = flightAt(event.clientX, event.clientY);
+            if (i < 0) {
+                canvas.title = "";
+                canvas.style.cursor = "";
+                return;
             }
+            var species = flightData.species[flightData.species_index[i]];
+            canvas.title =
+                ((species && species.name) || "Unknown species") +
+                " at " +
+                (flightData.location_name[i] || "Unknown location") +
+                " on " +
+                dateLabel(flightData.date[i]);
+            canvas.style.cursor = "pointer";
+        });
 
-            flights.forEach(function (flight) {
-                if (flight.latitude == null || flight.longitude == null) {
-                    return;
+        canvas.addEventListener("click", function (event) {
+            var i = flightAt(event.clientX, event.clientY);
+            if (i >= 0) {
+                var species = flightData.species[flightData.species_index[i]];
+                if (species && species.slug) {
+                    window.location.href = "/species/" + species.slug + "/";
                 }
-                var marker = document.createElement("div");
-                marker.className = "flight-marker";
-                marker.dataset.lat = flight.latitude;
-                marker.dataset.lng = flight.longitude;
-                marker.title =
-                    (flight.species_name || "Unknown species") +
-                    " at " +
-                    (flight.location_name || "Unknown location") +
-                    " on " +
-                    (flight.date || "");
-                map.appendChild(marker);
-                markers.push(marker);
-            });
+            }
+        });
 
-            positionMarkers();
-
-            if (tableBody) {
-                tableBody.innerHTML = "";
-                if (!flights.length) {
-                    var row = document.createElement("tr");
-                    var cell = document.createElement("td");
-                    cell.colSpan = 5;
-                    cell.textContent = "No flights recorded yet.";
-                    row.appendChild(cell);
-                    tableBody.appendChild(row);
+        function renderTable() {
+            if (!tableBody) {
+                return;
+            }
+            var count = flightData ? flightData.id.length : 0;
+            var fragment = document.createDocumentFragment();
+
+            if (!count) {
+                var emptyRow = document.createElement("tr");
+                var cell = document.createElement("td");
+                cell.colSpan = 5;
+                cell.textContent = "No flights recorded yet.";
+                emptyRow.appendChild(cell);
+                fragment.appendChild(emptyRow);
+            }
+
+            for (var i = 0; i < count; i++) {
+                var species = flightData.species[flightData.species_index[i]] || {};
+                var reporter = flightData.reporter_index[i];
+                var row = document.createElement("tr");
+
+                var dateCell = document.createElement("td");
+                dateCell.textContent = dateLabel(flightData.date[i]);
+                row.appendChild(dateCell);
+
+                var speciesCell = document.createElement("td");
+                if (species.slug) {
+                    var link = document.createElement("a");
+                    link.href = "/species/" + species.slug + "/";
+                    link.textContent = species.name || "Unknown species";
+                    link.className = "link-light";
+                    speciesCell.appendChild(link);
                 } else {
-                    flights.forEach(function (flight) {
-                        var row = document.createElement("tr");
-
-                        var dateCell = document.createElement("td");
-                        dateCell.textContent = flight.date || "";
-                        row.appendChild(dateCell);
-
-                        var speciesCell = document.createElement("td");
-                        if (flight.species_slug) {
-                            var link = document.createElement("a");
-                            link.href = "/species/" + flight.species_slug + "/";
-                            link.textContent =
-                                flight.species_name || "Unknown species";
-                            link.className = "link-light";
-                            speciesCell.appendChild(link);
-                        } else {
-                            speciesCell.textContent =
-                                flight.species_name || "Unknown species";
-                        }
-                        row.appendChild(speciesCell);
+                    speciesCell.textContent = species.name || "Unknown species";
+                }
+                row.appendChild(speciesCell);
 
-                        var locationCell = document.createElement("td");
-                        locationCell.textContent = flight.location_name || "";
-                        row.appendChild(locationCell);
+                var locationCell = document.createElement("td");
+                locationCell.textContent = flightData.location_name[i] || "";
+                row.appendChild(locationCell);
 
-                        var regionCell = document.createElement("td");
-                        regionCell.textContent = flight.region || "";
-                        row.appendChild(regionCell);
+                var regionCell = document.createElement("td");
+                regionCell.textContent = flightData.region[i] || "";
+                row.appendChild(regionCell);
 
-                        var reporterCell = document.createElement("td");
-                        reporterCell.textContent =
-                            flight.reporter || "Anonymous";
-                        row.appendChild(reporterCell);
+                var reporterCell = document.createElement("td");
+                reporterCell.textContent =
+                    reporter >= 0 ? flightData.reporters[reporter] : "Anonymous";
+                row.appendChild(reporterCell);
 
-                        tableBody.appendChild(row);
-                    });
-                }
+                fragment.appendChild(row);
             }
+
+            tableBody.innerHTML = "";
+            tableBody.appendChild(fragment);
         }
 
-        function loadFlightsFromApi() {
+        var filterParams = new URLSearchParams();
+        (function () {
             var params = new URLSearchParams(window.location.search);
-            var apiParams = new URLSearchParams();
-            var species = params.get("species");
-            var region = params.get("region");
-            if (species) {
-                apiParams.set("species", species);
+            ["species", "region", "code"].forEach(function (name) {
+                if (params.get(name)) {
+                    filterParams.set(name, params.get(name));
+                }
+            });
+        })();
+
+        // Same test the server applies to ?species=, ?region= and ?code=.
+        function matchesFilters(flight) {
+            var species = filterParams.get("species");
+            var region = filterParams.get("region");
+            var code = (filterParams.get("code") || "").trim().toUpperCase();
+            if (species && String(flight.species_id) !== species) {
+                return false;
             }
             if (region) {
-                apiParams.set("region", region);
+                var subdivision = region.trim().toUpperCase();
+                if ((subdivision.indexOf("-") < 0 || subdivision !== flight.admin1_code) &&
+                    (flight.region || "").toLowerCase().indexOf(region.toLowerCase()) < 0) {
+                    return false;
+                }
+            }
+            if (code && code !== (code.indexOf("-") < 0 ? flight.country_code : flight.admin1_code)) {
+                return false;
+            }
+            return true;
+        }
+
+        // Redraw once per frame however many events arrive (catch-up sends
+        // up to a few hundred at once).
+        var redrawPending = false;
+        function scheduleRedraw() {
+            if (!redrawPending) {
+                redrawPending = true;
+                window.requestAnimationFrame(function () {
+                    redrawPending = false;
+                    drawMap();
+                    renderTable();
+                });
             }
+        }
+
+        // Prepend one flight from the live stream to the compact arrays.
+        function addFlight(flight) {
+            if (!matchesFilters(flight) || flightData.id.indexOf(flight.id) >= 0) {
+                return;
+            }
+            var speciesIndex = -1;
+            for (var s = 0; s < flightData.species.length; s++) {
+                if (flightData.species[s].id === flight.species_id) {
+                    speciesIndex = s;
+                    break;
+                }
+            }
+            if (speciesIndex < 0) {
+                speciesIndex = flightData.species.length;
+                flightData.species.push({
+                    id: flight.species_id,
+                    slug: flight.species_slug,
+                    name: flight.species_name,
+                });
+            }
+            var reporterIndex = -1;
+            if (flight.reporter) {
+                reporterIndex = flightData.reporters.indexOf(flight.reporter);
+                if (reporterIndex < 0) {
+                    reporterIndex = flightData.reporters.length;
+                    flightData.reporters.push(flight.reporter);
+                }
+            }
+            flightData.id.unshift(flight.id);
+            flightData.event_id.unshift(flight.event_id);
+            flightData.species_index.unshift(speciesIndex);
+            flightData.reporter_index.unshift(reporterIndex);
+            flightData.lat.unshift(flight.latitude);
+            flightData.lng.unshift(flight.longitude);
+            flightData.date.unshift(Math.floor(Date.parse(flight.date) / 86400000));
+            flightData.location_name.unshift(flight.location_name);
+            flightData.region.unshift(flight.region);
+            scheduleRedraw();
+        }
+
+        function loadFlightsFromApi() {
+            var apiParams = new URLSearchParams(filterParams);
             apiParams.set("limit", "500");
+            apiParams.set("format", "compact");
 
             fetch("/api/flights/?" + apiParams.toString())
                 .then(function (response) {
@@ -218,23 +672,34 @@ document.addEventListener("DOMContentLoaded", function () {
                     return response.json();
                 })
                 .then(function (data) {
-                    var flights = (data && data.results) || [];
-                    renderFlights(flights);
+                    flightData = data;
+                    drawMap();
+                    renderTable();
+                    liveStream(
+                        "/api/flights/events/?" + filterParams.toString(),
+                        Math.max.apply(null, [0].concat(data.id)),
+                        "flight",
+                        addFlight
+                    );
                 })
                 .catch(function (error) {
                     console.error(error);
                 });
         }
 
-        window.addEventListener("resize", positionMarkers);
+        window.addEventListener("resize", drawMap);
         loadFlightsFromApi();
     }
 
     // ---------------------------------------------------------------------
-    // Roaming ants in the background  smarter, stateful behavior + dragging.
+    // Roaming ants in the background – smarter, stateful behavior + dragging.
     // ---------------------------------------------------------------------
     var antLayer = document.getElementById("ant-scout-layer");
-    if (antLayer) {
+    if (antLayer && !reducedMotion) {
+        whenIdle(startAntScouts);
+    }
+
+    function startAntScouts() {
         var videoSrc =
             antLayer.getAttribute("data-ant-video-src") ||
             antLayer.getAttribute("data-ant-gif-src") ||
@@ -251,23 +716,78 @@ document.addEventListener("DOMContentLoaded", function () {
             var dragOffsetY = 0;
             var lastTime = performance.now();
 
-            function spawnAnt() {
-                var video = document.createElement("video");
-                video.className = "ant-scout";
-                video.src = videoSrc;
-                video.autoplay = true;
-                video.loop = true;
-                video.muted = true;
-                video.playsInline = true;
-
-                var targetRate = 1.8;
-                video.playbackRate = targetRate;
-                video.addEventListener("loadedmetadata", function () {
-                    video.playbackRate = targetRate;
+            // One video is decoded for the whole colony; every ant is a small
+            // canvas that copies the current frame from it.
+            var source = document.createElement("video");
+            source.className = "ant-scout-source";
+            source.src = videoSrc;
+            source.loop = true;
+            source.muted = true;
+            source.playsInline = true;
+            source.setAttribute("aria-hidden", "true");
+            antLayer.appendChild(source);
+
+            var targetRate = 1.8;
+            var antHeight = ANT_SIZE;
+            source.addEventListener("loadedmetadata", function () {
+                source.playbackRate = targetRate;
+                if (source.videoWidth) {
+                    antHeight = Math.round(
+                        (ANT_SIZE * source.videoHeight) / source.videoWidth
+                    );
+                }
+                ants.forEach(function (ant) {
+                    ant.el.height = antHeight;
+                });
+            });
+
+            function drawAnts() {
+                if (source.readyState < 2) {
+                    return;
+                }
+                ants.forEach(function (ant) {
+                    ant.ctx.clearRect(0, 0, ANT_SIZE, antHeight);
+                    ant.ctx.drawImage(source, 0, 0, ANT_SIZE, antHeight);
                 });
+            }
+
+            // Copy only when the video actually produced a new frame.
+            var hasFrameCallback = "requestVideoFrameCallback" in source;
+            if (hasFrameCallback) {
+                var onFrame = function () {
+                    drawAnts();
+                    source.requestVideoFrameCallback(onFrame);
+                };
+                source.requestVideoFrameCallback(onFrame);
+            }
+
+            function playSource() {
+                var playing = source.play();
+                if (playing && playing.catch) {
+                    playing.catch(function () {});
+                }
+            }
+
+            // Hidden tabs stop decoding entirely.
+            document.addEventListener("visibilitychange", function () {
+                if (document.hidden) {
+                    source.pause();
+                } else {
+                    lastTime = performance.now();
+                    playSource();
+                }
+            });
+
+            playSource();
+
+            function spawnAnt() {
+                var canvas = document.createElement("canvas");
+                canvas.className = "ant-scout";
+                canvas.width = ANT_SIZE;
+                canvas.height = antHeight;
 
                 // keep ants in the background layer
-                antLayer.appendChild(video);
+                antLayer.appendChild(canvas);
 
                 var width =
                     window.innerWidth ||
@@ -302,7 +822,8 @@ document.addEventListener("DOMContentLoaded", function () {
                 var speed = 110 + Math.random() * 80;
 
                 var ant = {
-                    el: video,
+                    el: canvas,
+                    ctx: canvas.getContext("2d"),
                     x: x,
                     y: y,
                     angle: angle,
@@ -473,6 +994,10 @@ document.addEventListener("DOMContentLoaded", function () {
                 var dt = Math.min((now - lastTime) / 1000, 0.05);
                 lastTime = now;
 
+                if (!hasFrameCallback) {
+                    drawAnts();
+                }
+
                 var nestX = width * 0.5;
                 var nestY = height * 0.85;
 
@@ -0,0 +1,60 @@
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:  # Optional: without it only .gz variants are built.
+    brotli = None
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    # Hashed file names (so nginx can cache them forever) plus pre-built .gz
+    # and .br siblings for gzip_static / brotli_static.
+
+    compress_extensions = (".css", ".js", ".mjs", ".json", ".svg", ".txt", ".html", ".map", ".glb")
+    compress_min_size = 512
+    # Referenced by templates but not shipped in every build; ant3d.js
+    # copes with a 404.
+    optional_assets = {"guide/models/ant.glb"}
+
+    def stored_name(self, name):
+        # Only optional assets fall back to the plain URL. Anything else
+        # missing from the manifest means collectstatic failed or is stale,
+        # and unhashed URLs would then be cached for a year.
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            if name in self.optional_assets:
+                return name
+            raise
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+
+        # Compress both the hashed copies and the originals they came from.
+        for name in list(paths) + list(self.hashed_files.values()):
+            if name.endswith(self.compress_extensions) and self.exists(name):
+                self.write_compressed(name)
+
+    def write_compressed(self, name):
+        with self.open(name) as handle:
+            content = handle.read()
+        if len(content) < self.compress_min_size:
+            return
+
+        variants = [(".gz", gzip.compress(content, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append((".br", brotli.compress(content, quality=11)))
+
+        for suffix, data in variants:
+            # Only keep a variant that actually saves bytes.
+            if len(data) >= len(content):
+                continue
+            target = name + suffix
+            if self.exists(target):
+                self.delete(target)
+            self.save(target, ContentFile(data))
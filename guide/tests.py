@@ -0,0 +1,659 @@
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.db import connection, connections, router, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+import numpy as np
+
+from . import bookmarks, dedup, geocoding, markup, prediction, ratelimit, routing, spam
+from .models import (
+    Activity,
+    FlightEvent,
+    ForumPost,
+    ForumSection,
+    ForumThread,
+    InboxItem,
+    NuptialFlight,
+    PostShingleBand,
+    Species,
+    SpeciesBookmark,
+)
+from .forum import ThreadLocked, publish_post, release_post
+from .storage import CompressedManifestStaticFilesStorage
+
+
+# Pages rendered by the tests link unhashed static files: there is no
+# collectstatic manifest here.
+PLAIN_STATIC = {**settings.STORAGES, "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"}}
+
+
+class PublishPostConcurrencyTests(TransactionTestCase):
+    # Real threads and real commits, so replies genuinely race each other.
+    REPLIERS = 8
+    REPLIES_EACH = 10
+
+    def setUp(self):
+        self.users = [User.objects.create_user(f"replier{i}") for i in range(self.REPLIERS)]
+        section = ForumSection.objects.create(name="General", slug="general", description="")
+        self.thread = ForumThread.objects.create(section=section, title="Race", author=self.users[0])
+
+    def reply_in_parallel(self, during=None):
+        # Every user posts REPLIES_EACH replies at once; `during` runs in its
+        # own thread alongside them. Returns (posted, locked out) counts.
+        start = threading.Barrier(self.REPLIERS + (during is not None))
+        lock = threading.Lock()
+        counts = {"posted": 0, "locked": 0}
+        errors = []
+
+        def reply(user):
+            try:
+                start.wait()
+                for i in range(self.REPLIES_EACH):
+                    try:
+                        publish_post(ForumPost(author=user, content=f"Reply {i} from {user.username}"), self.thread.pk)
+                    except ThreadLocked:
+                        outcome = "locked"
+                    else:
+                        outcome = "posted"
+                    with lock:
+                        counts[outcome] += 1
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        def side_task():
+            try:
+                start.wait()
+                during()
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=reply, args=(user,)) for user in self.users]
+        if during is not None:
+            workers.append(threading.Thread(target=side_task))
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(errors, [])
+        return counts["posted"], counts["locked"]
+
+    def test_parallel_replies_are_all_saved_and_bump_the_thread(self):
+        posted, locked = self.reply_in_parallel()
+
+        self.assertEqual((posted, locked), (self.REPLIERS * self.REPLIES_EACH, 0))
+        self.assertEqual(ForumPost.objects.filter(thread=self.thread).count(), posted)
+        newest = ForumPost.objects.filter(thread=self.thread).latest("created_at").created_at
+        self.thread.refresh_from_db()
+        self.assertEqual(self.thread.updated_at, newest)
+
+    def test_reply_to_locked_thread_is_rolled_back(self):
+        ForumThread.objects.filter(pk=self.thread.pk).update(is_locked=True)
+
+        with self.assertRaises(ThreadLocked):
+            publish_post(ForumPost(author=self.users[1], content="Too late"), self.thread.pk)
+        self.assertFalse(ForumPost.objects.filter(thread=self.thread).exists())
+
+    def test_replies_racing_a_lock_are_saved_or_rolled_back(self):
+        def lock_thread():
+            ForumThread.objects.filter(pk=self.thread.pk).update(is_locked=True)
+
+        posted, locked = self.reply_in_parallel(during=lock_thread)
+
+        self.assertEqual(posted + locked, self.REPLIERS * self.REPLIES_EACH)
+        # Only replies that got past the lock check remain.
+        self.assertEqual(ForumPost.objects.filter(thread=self.thread).count(), posted)
+
+
+@override_settings(
+    RATELIMIT_ENABLED=True,
+    RATELIMIT_BACKEND="guide.ratelimit.MemoryBackend",
+    RATELIMIT_BUDGETS={"test": (3, 60)},
+)
+class RateLimitTests(SimpleTestCase):
+    def setUp(self):
+        ratelimit.reset_backend()
+        self.addCleanup(ratelimit.reset_backend)
+        self.factory = RequestFactory()
+
+    def test_burst_then_refused_until_a_token_refills(self):
+        # 3 tokens, one back every 20 seconds.
+        for _ in range(3):
+            self.assertEqual(ratelimit.take_token("k", 3, 60, now=1000), (True, 0))
+        allowed, retry_after = ratelimit.take_token("k", 3, 60, now=1000)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(retry_after, 20)
+
+        allowed, retry_after = ratelimit.take_token("k", 3, 60, now=1015)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(retry_after, 5)
+        self.assertEqual(ratelimit.take_token("k", 3, 60, now=1020), (True, 0))
+        self.assertFalse(ratelimit.take_token("k", 3, 60, now=1020)[0])
+
+    def test_refill_stops_at_capacity(self):
+        for _ in range(3):
+            ratelimit.take_token("k", 3, 60, now=1000)
+        # An hour later the bucket holds 3 tokens, not 180.
+        for _ in range(3):
+            self.assertTrue(ratelimit.take_token("k", 3, 60, now=4600)[0])
+        self.assertFalse(ratelimit.take_token("k", 3, 60, now=4600)[0])
+
+    def test_refused_request_spends_no_token_from_other_buckets(self):
+        for _ in range(3):
+            ratelimit.take_token("user", 3, 60, now=1000)
+        self.assertFalse(ratelimit.take_tokens(["ip", "user"], 3, 60, now=1000)[0])
+        self.assertFalse(ratelimit.take_tokens(["ip", "user"], 3, 60, now=1000)[0])
+        # The shared IP bucket is still full for everyone else behind it.
+        for _ in range(3):
+            self.assertTrue(ratelimit.take_token("ip", 3, 60, now=1000)[0])
+
+    def post(self, remote_addr="203.0.113.5", **headers):
+        request = self.factory.post("/", REMOTE_ADDR=remote_addr, **headers)
+        request.user = AnonymousUser()
+        return request
+
+    def test_decorator_answers_429_with_retry_after(self):
+        view = ratelimit.ratelimit("test")(lambda request: HttpResponse("ok"))
+        for _ in range(3):
+            self.assertEqual(view(self.post()).status_code, 200)
+        response = view(self.post())
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "20")
+        # GETs are not counted.
+        get = self.factory.get("/", REMOTE_ADDR="203.0.113.5")
+        get.user = AnonymousUser()
+        self.assertEqual(view(get).status_code, 200)
+
+    def test_forwarded_address_is_trusted_only_from_the_proxy(self):
+        self.assertEqual(ratelimit.client_ip(self.post("127.0.0.1", HTTP_X_REAL_IP="198.51.100.7")), "198.51.100.7")
+        self.assertEqual(ratelimit.client_ip(self.post("203.0.113.5", HTTP_X_REAL_IP="198.51.100.7")), "203.0.113.5")
+
+        view = ratelimit.ratelimit("test")(lambda request: HttpResponse("ok"))
+        for n in range(3):
+            view(self.post(HTTP_X_REAL_IP=f"198.51.100.{n}"))
+        # A new header value does not buy a fresh bucket.
+        self.assertEqual(view(self.post(HTTP_X_REAL_IP="198.51.100.99")).status_code, 429)
+
+
+class BookmarkToggleTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("keeper")
+        self.species = Species.objects.create(
+            slug="lasius-niger",
+            genus="Lasius",
+            species="niger",
+            difficulty="easy",
+            region="temperate",
+            founding_mode="claustral",
+            diapause="required",
+        )
+
+    def test_toggle_adds_then_removes(self):
+        self.assertTrue(bookmarks.toggle(self.user, self.species.pk))
+        self.assertTrue(SpeciesBookmark.objects.filter(user=self.user, species=self.species).exists())
+        self.assertFalse(bookmarks.toggle(self.user, self.species.pk))
+        self.assertFalse(SpeciesBookmark.objects.filter(user=self.user, species=self.species).exists())
+
+    def test_toggle_ignores_a_stale_cached_set(self):
+        # Another worker's cache still says "not bookmarked".
+        SpeciesBookmark.objects.create(user=self.user, species=self.species)
+        cache.set(bookmarks.cache_key(self.user.pk), [], bookmarks.CACHE_TIMEOUT)
+        self.addCleanup(cache.delete, bookmarks.cache_key(self.user.pk))
+
+        self.assertFalse(bookmarks.toggle(self.user, self.species.pk))
+        self.assertEqual(SpeciesBookmark.objects.filter(user=self.user).count(), 0)
+
+
+class FlightClusteringTests(TestCase):
+    def setUp(self):
+        self.species = Species.objects.create(
+            slug="lasius-niger",
+            genus="Lasius",
+            species="niger",
+            difficulty="easy",
+            region="temperate",
+            founding_mode="claustral",
+            diapause="required",
+        )
+
+    def report(self, latitude=52.52, longitude=13.40, day=date(2025, 7, 20), **fields):
+        return NuptialFlight.objects.create(
+            species=self.species, location_name="Berlin", latitude=latitude, longitude=longitude, date=day, **fields
+        )
+
+    def test_nearby_reports_share_an_event(self):
+        first, second = self.report(), self.report(latitude=52.53)
+        self.assertEqual(first.event_id, second.event_id)
+        self.assertEqual(FlightEvent.objects.get().report_count, 2)
+
+    def test_moving_a_report_leaves_its_event(self):
+        first, second = self.report(), self.report(latitude=52.53)
+        second.latitude, second.longitude = 48.14, 11.58  # Munich
+        second.save()
+
+        self.assertNotEqual(second.event_id, first.event_id)
+        self.assertEqual(FlightEvent.objects.get(pk=first.event_id).report_count, 1)
+
+    def test_changing_the_day_leaves_the_event_and_drops_it_when_empty(self):
+        report = self.report()
+        old_event = report.event_id
+        report.date = date(2025, 8, 20)
+        report.save()
+
+        self.assertNotEqual(report.event_id, old_event)
+        self.assertFalse(FlightEvent.objects.filter(pk=old_event).exists())
+
+    def test_unclustered_reports_join_existing_events(self):
+        clustered = self.report()
+        # Reports from before clustering existed, as bulk_create() skips signals.
+        [legacy] = NuptialFlight.objects.bulk_create(
+            [
+                NuptialFlight(
+                    species=self.species, location_name="Berlin", latitude=52.53, longitude=13.40, date=date(2025, 7, 20)
+                )
+            ]
+        )
+
+        self.assertEqual(dedup.cluster_unclustered(), 1)
+        legacy.refresh_from_db()
+        self.assertEqual(legacy.event_id, clustered.event_id)
+        self.assertIsNotNone(legacy.grid_cell)
+        self.assertEqual(FlightEvent.objects.get().report_count, 2)
+
+
+class FlightRegionFilterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        species = Species.objects.create(
+            slug="lasius-niger",
+            genus="Lasius",
+            species="niger",
+            difficulty="easy",
+            region="temperate",
+            founding_mode="claustral",
+            diapause="required",
+        )
+        cls.los_angeles = NuptialFlight.objects.create(
+            species=species, location_name="Los Angeles", region="Southern California",
+            latitude=34.05, longitude=-118.25, date=date(2025, 7, 20),
+        )
+        cls.calgary = NuptialFlight.objects.create(
+            species=species, location_name="Calgary", region="Alberta",
+            latitude=51.05, longitude=-114.07, date=date(2025, 7, 20),
+        )
+
+    def flight_ids(self, **params):
+        response = self.client.get("/api/flights/", params)
+        return {flight["id"] for flight in response.json()["results"]}
+
+    def test_two_letter_region_is_text(self):
+        self.assertEqual(self.flight_ids(region="CA"), {self.los_angeles.pk})
+
+    def test_iso_subdivision_region(self):
+        self.assertEqual(self.flight_ids(region="us-ca"), {self.los_angeles.pk})
+
+    def test_explicit_code(self):
+        self.assertEqual(self.flight_ids(code="CA"), {self.calgary.pk})
+        self.assertEqual(self.flight_ids(code="US"), {self.los_angeles.pk})
+        self.assertEqual(self.flight_ids(code="CA-AB"), {self.calgary.pk})
+
+
+@override_settings(RATELIMIT_ENABLED=False, STORAGES=PLAIN_STATIC)
+class HeldThreadTests(TestCase):
+    # The opening post repeats an earlier post, so guide.spam holds it.
+    CONTENT = "Selling healthy Lasius niger colonies with queen and workers, message me for prices and shipping today."
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.species = Species.objects.create(
+            slug="lasius-niger",
+            genus="Lasius",
+            species="niger",
+            difficulty="easy",
+            region="temperate",
+            founding_mode="claustral",
+            diapause="required",
+        )
+        cls.section = ForumSection.objects.create(name="General", slug="general", description="")
+        cls.author = User.objects.create_user("spammer")
+        cls.reader = User.objects.create_user("reader")
+        earlier = ForumThread.objects.create(section=cls.section, title="Colonies for sale", author=cls.reader)
+        ForumPost.objects.create(thread=earlier, author=cls.reader, content=cls.CONTENT)
+
+    def start_thread(self):
+        self.client.force_login(self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                "/forum/section/general/new-thread/",
+                {"title": "Cheap colonies", "species": self.species.pk, "content": self.CONTENT},
+            )
+        return ForumThread.objects.get(title="Cheap colonies")
+
+    def test_held_opening_post_holds_the_thread(self):
+        thread = self.start_thread()
+        self.assertTrue(thread.is_held)
+        self.assertTrue(thread.posts.get().is_held)
+        self.assertFalse(Activity.objects.filter(verb="thread").exists())
+
+        self.assertEqual(self.client.get(f"/forum/thread/{thread.pk}/").status_code, 200)
+        self.client.force_login(self.reader)
+        self.assertEqual(self.client.get(f"/forum/thread/{thread.pk}/").status_code, 404)
+        self.assertNotContains(self.client.get("/forum/section/general/"), "Cheap colonies")
+        self.assertNotContains(self.client.get("/forum/search/", {"q": "cheap"}), f"/forum/thread/{thread.pk}/")
+
+    def test_releasing_the_opening_post_releases_and_announces_the_thread(self):
+        thread = self.start_thread()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(release_post(thread.posts.get()))
+
+        thread.refresh_from_db()
+        self.assertFalse(thread.is_held)
+        self.assertTrue(Activity.objects.filter(verb="thread").exists())
+        self.client.force_login(self.reader)
+        self.assertContains(self.client.get("/forum/section/general/"), "Cheap colonies")
+        self.assertContains(self.client.get("/forum/search/", {"q": "cheap"}), f"/forum/thread/{thread.pk}/")
+
+    def test_releasing_a_reply_bumps_and_notifies(self):
+        thread = ForumThread.objects.create(section=self.section, title="Questions", author=self.reader)
+        ForumPost.objects.create(thread=thread, author=self.reader, content="Any tips on founding chambers?")
+        with self.captureOnCommitCallbacks(execute=True):
+            reply = publish_post(ForumPost(author=self.author, content=self.CONTENT), thread.pk)
+        self.assertTrue(reply.is_held)
+        self.assertFalse(Activity.objects.filter(verb="reply").exists())
+        before = ForumThread.objects.get(pk=thread.pk).updated_at
+
+        ForumPost.objects.filter(pk=reply.pk).update(created_at=before + timedelta(minutes=5))
+        reply.refresh_from_db()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(release_post(reply))
+        self.assertFalse(release_post(reply))
+
+        self.assertEqual(ForumThread.objects.get(pk=thread.pk).updated_at, reply.created_at)
+        self.assertEqual(Activity.objects.filter(verb="reply").count(), 1)
+
+
+class SpeciesMentionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Species.objects.create(
+            slug="lasius-niger",
+            genus="Lasius",
+            species="niger",
+            difficulty="easy",
+            region="temperate",
+            founding_mode="claustral",
+            diapause="required",
+        )
+
+    def test_mention_is_linked(self):
+        html = markup.render("My Lasius niger queen laid eggs.")
+        self.assertIn('<a href="/species/lasius-niger/" class="species-link">Lasius niger</a>', html)
+
+    def test_many_capitalised_pairs(self):
+        # Well past SQLite's expression depth limit if looked up in one query.
+        words = ["".join(chr(97 + int(digit)) for digit in str(i)) for i in range(1000, 2500)]
+        filler = " ".join(f"X{word} {word}" for word in words)
+        html = markup.render(f"{filler} Lasius niger.")
+        self.assertIn('class="species-link">Lasius niger</a>', html)
+
+
+class SeasonModelTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.european, cls.american = [
+            Species.objects.create(
+                slug=slug,
+                genus=genus,
+                species=name,
+                difficulty="easy",
+                region="temperate",
+                founding_mode="claustral",
+                diapause="required",
+            )
+            for slug, genus, name in [("lasius-niger", "Lasius", "niger"), ("lasius-neoniger", "Lasius", "neoniger")]
+        ]
+        # Same latitude band and days, different continents.
+        for day in range(10, 20):
+            NuptialFlight.objects.create(
+                species=cls.european, location_name="Berlin", latitude=52.5, longitude=13.4, date=date(2024, 7, day)
+            )
+            NuptialFlight.objects.create(
+                species=cls.american, location_name="Calgary", latitude=51.0, longitude=-114.1, date=date(2024, 7, day)
+            )
+
+    def likely_slugs(self, latitude, longitude):
+        model = prediction.SeasonModel(prediction.train())
+        return [row["slug"] for row in model.likely_flying(latitude, longitude, date(2025, 7, 12))]
+
+    def test_only_species_from_the_same_region(self):
+        self.assertEqual(self.likely_slugs(51.5, 0.0), ["lasius-niger"])
+        self.assertEqual(self.likely_slugs(49.3, -123.1), ["lasius-neoniger"])
+
+    def test_saved_model_is_loaded(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "flight_season.npz")
+            with override_settings(FLIGHT_MODEL_PATH=path):
+                self.assertIsNone(prediction.get_model())
+                prediction.save(prediction.train())
+                self.assertEqual(os.listdir(directory), ["flight_season.npz"])
+                results = prediction.get_model().likely_flying(52.0, 10.0, date(2025, 7, 12))
+        self.assertEqual([row["slug"] for row in results], ["lasius-niger"])
+
+
+class SuggestionReviewRedirectTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user("moderator", is_staff=True))
+
+    def review(self, next_url):
+        return self.client.post("/suggestions/review/", {"action": "approve", "next": next_url})
+
+    def test_local_next_is_followed(self):
+        response = self.review("/suggestions/?status=all")
+        self.assertRedirects(response, "/suggestions/?status=all", fetch_redirect_response=False)
+
+    def test_other_hosts_are_refused(self):
+        for next_url in ["//evil.example", "/\\evil.example", "https://evil.example/"]:
+            with self.subTest(next_url=next_url):
+                self.assertRedirects(self.review(next_url), "/suggestions/", fetch_redirect_response=False)
+
+
+class SpamDetectionTests(TestCase):
+    ORIGINAL = (
+        "My Camponotus colony moved into the new ytong nest last week and the queen started laying again "
+        "after a long winter diapause in the cellar at eight degrees."
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        section = ForumSection.objects.create(name="General", slug="general", description="")
+        cls.writer = User.objects.create_user("writer")
+        cls.copier = User.objects.create_user("copier")
+        cls.thread = ForumThread.objects.create(section=section, title="Journals", author=cls.writer)
+        cls.original = ForumPost.objects.create(thread=cls.thread, author=cls.writer, content=cls.ORIGINAL)
+
+    def post(self, content, author=None):
+        return ForumPost.objects.create(thread=self.thread, author=author or self.copier, content=content)
+
+    def test_original_post_is_indexed(self):
+        self.assertEqual(PostShingleBand.objects.filter(post=self.original).count(), spam.BANDS)
+
+    def test_near_copy_is_held(self):
+        post = self.post(self.ORIGINAL.replace("last week", "yesterday"))
+        self.assertTrue(post.is_held)
+        self.assertEqual(post.duplicate_of_id, self.original.pk)
+
+    def test_quoting_reply_is_not_held(self):
+        quoted = "\n".join(f"> {line}" for line in self.ORIGINAL.split(". "))
+        post = self.post(f"{quoted}\n\nCongratulations, mine are still asleep in the fridge until the end of March.")
+        self.assertFalse(post.is_held)
+
+    def test_short_posts_are_not_held(self):
+        self.post("Thanks, that helped a lot!")
+        self.assertFalse(self.post("Thanks, that helped a lot!").is_held)
+
+    def test_staff_posts_are_not_held(self):
+        staff = User.objects.create_user("moderator", is_staff=True)
+        self.assertFalse(self.post(self.ORIGINAL, author=staff).is_held)
+
+    def test_flood_reads_bounded_buckets(self):
+        # Many held copies already fill the original's buckets.
+        hashes, keys = spam.fingerprint(self.ORIGINAL)
+        flood = ForumPost.objects.bulk_create(
+            [
+                ForumPost(thread=self.thread, author=self.copier, content=self.ORIGINAL, is_held=True)
+                for _ in range(3 * spam.PER_KEY)
+            ]
+        )
+        PostShingleBand.objects.bulk_create(
+            [PostShingleBand(post=post, key=key, created_at=post.created_at) for post in flood for key in keys]
+        )
+        self.assertEqual(len(spam.bucket_rows(keys)), spam.BANDS * spam.PER_KEY)
+        with self.assertNumQueries(2):
+            pk, similarity = spam.find_duplicate(hashes, keys)
+        self.assertEqual(similarity, 1.0)
+
+    def test_backfill_indexes_missing_posts_and_prunes_old_bands(self):
+        [imported] = ForumPost.objects.bulk_create(
+            [ForumPost(thread=self.thread, author=self.writer, content=self.ORIGINAL.replace("Camponotus", "Messor"))]
+        )
+        # The original has left the window.
+        old = spam.window_start() - timedelta(days=1)
+        ForumPost.objects.filter(pk=self.original.pk).update(created_at=old)
+        PostShingleBand.objects.filter(post=self.original).update(created_at=old)
+
+        self.assertEqual(spam.backfill(), (1, spam.BANDS))
+        self.assertEqual(PostShingleBand.objects.filter(post=imported).count(), spam.BANDS)
+        self.assertFalse(PostShingleBand.objects.filter(post=self.original).exists())
+        self.assertEqual(spam.backfill(), (0, 0))
+
+
+@override_settings(DATABASE_REPLICAS=["replica"], STORAGES=PLAIN_STATIC)
+class ReplicaRoutingTests(TransactionTestCase):
+    # A second SQLite file as the replica, refreshed only by sync(), so rows
+    # written since are visible on the primary alone. The alias is added
+    # after the test runner has set up its databases, so it is a plain copy
+    # rather than a test database.
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.replica_path = os.path.join(cls.directory.name, "replica.sqlite3")
+        connections.settings["replica"] = dict(connections.settings["default"], NAME=cls.replica_path)
+        cls.databases = {"default", "replica"}
+
+    @classmethod
+    def tearDownClass(cls):
+        connections["replica"].close()
+        del connections["replica"]
+        del connections.settings["replica"]
+        cls.databases = {"default"}
+        cls.directory.cleanup()
+        super().tearDownClass()
+
+    def sync(self):
+        connections["replica"].close()
+        source = sqlite3.connect(connections["default"].settings_dict["NAME"])
+        destination = sqlite3.connect(self.replica_path)
+        try:
+            source.backup(destination)
+        finally:
+            destination.close()
+            source.close()
+
+    def species(self, slug):
+        return Species.objects.create(
+            slug=slug,
+            genus="Lasius",
+            species=slug.split("-")[1],
+            difficulty="easy",
+            region="temperate",
+            founding_mode="claustral",
+            diapause="required",
+        )
+
+    def test_router(self):
+        self.assertEqual(router.db_for_read(Species), "default")
+        with routing.replica_reads():
+            self.assertEqual(router.db_for_read(Species), "replica")
+            self.assertEqual(router.db_for_write(Species), "default")
+            with transaction.atomic():
+                self.assertEqual(router.db_for_read(Species), "default")
+
+    def test_get_reads_the_replica(self):
+        self.species("lasius-niger")
+        self.sync()
+        self.species("lasius-flavus")
+
+        self.assertEqual(self.client.get("/species/lasius-niger/").status_code, 200)
+        response = self.client.get("/species/lasius-flavus/")
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn(routing.PIN_COOKIE, response.cookies)
+
+    def test_post_pins_reads_to_the_primary(self):
+        self.sync()
+        self.species("lasius-flavus")
+
+        response = self.client.post("/species/compare/clear/")
+        self.assertIn(routing.PIN_COOKIE, response.cookies)
+        self.assertEqual(self.client.get("/species/lasius-flavus/").status_code, 200)
+
+    def test_get_that_writes_reads_and_pins_the_primary(self):
+        user = User.objects.create_user("keeper")
+        self.client.force_login(user)
+        self.sync()
+        activity = Activity.objects.create(verb="care", summary="Care guide updated", url="/")
+        item = InboxItem.objects.create(user=user, activity=activity, created_at=activity.created_at)
+
+        response = self.client.get("/account/activity/")
+        self.assertContains(response, "Care guide updated")
+        self.assertIn(routing.PIN_COOKIE, response.cookies)
+        item.refresh_from_db()
+        self.assertIsNotNone(item.read_at)
+
+
+class GeocoderTests(SimpleTestCase):
+    def test_nearby_point(self):
+        self.assertEqual(geocoding.get_geocoder().lookup(52.52, 13.40).admin1_code, "DE-BE")
+
+    def test_open_sea_gets_no_area(self):
+        # About 1,300 km off Brazil.
+        self.assertIsNone(geocoding.get_geocoder().lookup(0.0, -25.0))
+
+    def test_matches_brute_force(self):
+        geocoder = geocoding.get_geocoder()
+        points = np.asarray(geocoder.points)
+        rng = random.Random(1)
+        for _ in range(500):
+            latitude, longitude = rng.uniform(-60, 75), rng.uniform(-180, 180)
+            km = geocoding.distances_km(latitude, longitude, points)
+            nearest = int(np.argmin(km))
+            expected = geocoder.area_table[int(geocoder.areas[nearest])] if km[nearest] <= 300 else None
+            found = geocoder.lookup(latitude, longitude, max_km=300)
+            self.assertEqual(found, expected, (latitude, longitude))
+
+
+class StaticManifestTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        # No manifest: as after a failed or skipped collectstatic.
+        self.storage = CompressedManifestStaticFilesStorage(location=directory.name)
+
+    def test_missing_entry_raises(self):
+        with self.assertRaises(ValueError):
+            self.storage.stored_name("guide/css/base.css")
+
+    def test_optional_asset_falls_back(self):
+        self.assertEqual(self.storage.stored_name("guide/models/ant.glb"), "guide/models/ant.glb")
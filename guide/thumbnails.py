@@ -0,0 +1,193 @@
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections
+from PIL import Image, ImageOps
+
+
+# Derivatives live next to the originals under content-hashed names, e.g.
+# species_thumbs/derived/lasius-640w.0123456789ab.webp, so they can be
+# cached forever (guide.delivery), and are listed in
+# Species.thumbnail_derivatives:
+#   {"source": <original name>, "width": w, "height": h,
+#    "webp": [[320, name], ...], "jpeg": [[320, name], ...]}
+# so templates build srcset without touching storage.
+DERIVED_DIR = "derived"
+FORMATS = {
+    "webp": {"format": "WEBP", "quality": 80, "method": 4},
+    "jpeg": {"format": "JPEG", "quality": 82, "optimize": True, "progressive": True},
+}
+
+
+def derived_name(source, width, fmt, data):
+    directory, filename = os.path.split(source)
+    stem = os.path.splitext(filename)[0]
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    return os.path.join(directory, DERIVED_DIR, f"{stem}-{width}w.{digest}.{fmt}")
+
+
+def has_metadata(image):
+    return bool(image.getexif()) or any(key in image.info for key in ("exif", "xmp", "XML:com.adobe.xmp", "comment"))
+
+
+def flatten(image):
+    # JPEG has no alpha: composite transparent uploads onto white.
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def encode(image, fmt, icc_profile=None):
+    # No exif= argument, so nothing but the colour profile is written.
+    buffer = BytesIO()
+    options = dict(FORMATS.get(fmt, {"format": fmt.upper()}))
+    if icc_profile:
+        options["icc_profile"] = icc_profile
+    image.save(buffer, options.pop("format"), **options)
+    return buffer.getvalue()
+
+
+def replace(name, data):
+    # Storage.save() never overwrites; drop the old file first so the name,
+    # and every URL already pointing at it, stays the same.
+    default_storage.delete(name)
+    return default_storage.save(name, ContentFile(data))
+
+
+def render(source, old=None):
+    # Build every derivative for one original, capping the original itself at
+    # THUMBNAIL_MAX_DIMENSION and re-saving it without EXIF/GPS data when
+    # needed. Runs in pool workers, so it only touches storage, never the
+    # database. Returns (name of the original, derivatives dict).
+    with default_storage.open(source) as f:
+        image = Image.open(f)
+        image.load()
+    original_format = image.format
+    icc_profile = image.info.get("icc_profile")
+    stripped = has_metadata(image)
+    image = ImageOps.exif_transpose(image)
+
+    max_dimension = settings.THUMBNAIL_MAX_DIMENSION
+    capped = max(image.size) > max_dimension
+    if capped:
+        image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+    if capped or stripped:
+        # Re-encode in the upload's own format; anything unusual becomes JPEG.
+        if original_format in ("PNG", "WEBP"):
+            data = encode(image, original_format.lower(), icc_profile)
+        else:
+            data = encode(flatten(image), "jpeg", icc_profile)
+        source = replace(source, data)
+
+    width, height = image.size
+    derivatives = {"source": source, "width": width, "height": height, "webp": [], "jpeg": []}
+    # Never upscale: widths above the original collapse to the original width.
+    widths = sorted({min(w, width) for w in settings.THUMBNAIL_WIDTHS})
+    for w in widths:
+        resized = image if w == width else image.resize((w, max(1, round(height * w / width))), Image.Resampling.LANCZOS)
+        for fmt in FORMATS:
+            frame = flatten(resized) if fmt == "jpeg" else resized.convert("RGBA" if resized.has_transparency_data else "RGB")
+            data = encode(frame, fmt, icc_profile)
+            name = derived_name(source, w, fmt, data)
+            if not default_storage.exists(name):
+                name = default_storage.save(name, ContentFile(data))
+            derivatives[fmt].append([w, name])
+
+    if old:
+        remove(old, keep=derivatives)
+    return source, derivatives
+
+
+def remove(derivatives, keep=None):
+    # Delete the files of an old derivatives dict, except ones still listed in `keep`.
+    kept = {name for fmt in FORMATS for _, name in (keep or {}).get(fmt, [])}
+    for fmt in FORMATS:
+        for _, name in derivatives.get(fmt, []):
+            if name not in kept:
+                default_storage.delete(name)
+
+
+def is_current(species):
+    return bool(species.thumbnail) and species.thumbnail_derivatives.get("source") == species.thumbnail.name
+
+
+def refresh(species):
+    # Bring one species' derivatives in line with its thumbnail: build them
+    # for a new upload, delete them when the thumbnail was cleared. Saves
+    # with update() so no signals or revisions fire.
+    from .models import Species
+
+    if not species.thumbnail:
+        if species.thumbnail_derivatives:
+            remove(species.thumbnail_derivatives)
+            Species.objects.filter(pk=species.pk).update(thumbnail_derivatives={})
+            species.thumbnail_derivatives = {}
+        return
+    if is_current(species):
+        return
+    source, derivatives = render(species.thumbnail.name, old=species.thumbnail_derivatives)
+    Species.objects.filter(pk=species.pk).update(thumbnail=source, thumbnail_derivatives=derivatives)
+    species.thumbnail.name, species.thumbnail_derivatives = source, derivatives
+
+
+def init_worker():
+    # Spawned (non-forked) workers start with no app registry.
+    import django
+
+    django.setup()
+
+
+def _render_job(job):
+    pk, source, old = job
+    try:
+        return pk, render(source, old=old), None
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        return pk, None, f"{source}: {e}"
+
+
+def backfill(species_qs, workers=None, force=False, batch_size=50):
+    # Render derivatives for many species across a process pool, saving
+    # results with one bulk_update per batch. Species whose derivatives
+    # already match their thumbnail are skipped unless `force`.
+    # Returns (updated, errors).
+    from .models import Species
+
+    rows = (
+        species_qs.exclude(thumbnail="").exclude(thumbnail__isnull=True)
+        .values_list("pk", "thumbnail", "thumbnail_derivatives")
+        .iterator()
+    )
+    jobs = [(pk, name, old) for pk, name, old in rows if force or old.get("source") != name]
+    if not jobs:
+        return 0, []
+    # Forked workers must not share the parent's database sockets.
+    connections.close_all()
+
+    updated, errors, batch = 0, [], []
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+        for pk, result, error in pool.map(_render_job, jobs, chunksize=4):
+            if error:
+                errors.append(error)
+                continue
+            source, derivatives = result
+            batch.append(Species(pk=pk, thumbnail=source, thumbnail_derivatives=derivatives))
+            if len(batch) >= batch_size:
+                Species.objects.bulk_update(batch, ["thumbnail", "thumbnail_derivatives"])
+                updated += len(batch)
+                batch = []
+    if batch:
+        Species.objects.bulk_update(batch, ["thumbnail", "thumbnail_derivatives"])
+        updated += len(batch)
+    return updated, errors
+
+
+def srcset(derivatives, fmt):
+    return ", ".join(f"{default_storage.url(name)} {w}w" for w, name in derivatives.get(fmt, []))
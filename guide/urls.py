@@ -9,34 +9,43 @@ urlpatterns = [
 
     path("species/", views.species_list, name="species_list"),
     path("species/compare/", views.species_compare, name="species_compare"),
+    path("species/climate/", views.species_climate, name="species_climate"),
     path("species/compare/clear/", views.clear_compare, name="clear_compare"),
     path("species/<slug:slug>/", views.species_detail, name="species_detail"),
     path("species/<int:pk>/bookmark/", views.toggle_bookmark, name="toggle_bookmark"),
+    path("api/bookmarks/", views.api_bookmarks, name="api_bookmarks"),
+    path("api/species/facets/", views.api_species_facets, name="api_species_facets"),
+    path("api/species/climate/", views.api_species_climate, name="api_species_climate"),
     path("species/<int:pk>/add-to-compare/", views.add_to_compare, name="add_to_compare"),
     path("species/<slug:slug>/care-card/", views.care_card_pdf, name="care_card"),
+    path("species/<slug:slug>/history/", views.species_history, name="species_history"),
 
     path("flights/", views.flights_list, name="flights"),
     path("flights/new/", views.flights_add, name="flights_add"),
     path("api/flights/", views.api_flights, name="api_flights"),
+    path("api/flight-calendar/", views.api_flight_calendar, name="api_flight_calendar"),
+    path("api/flights/likely/", views.api_flights_likely, name="api_flights_likely"),
+    path("api/flights/events/", views.api_flight_events, name="api_flight_events"),
 
     path("vendors/", views.vendors_list, name="vendors"),
 
     path("forum/", views.forum_index, name="forum_index"),
+    path("forum/search/", views.forum_search, name="forum_search"),
     path("forum/section/<slug:slug>/", views.forum_section_detail, name="forum_section"),
     path("forum/section/<slug:slug>/new-thread/", views.forum_thread_create, name="forum_thread_create"),
     path("forum/thread/<int:pk>/", views.forum_thread_detail, name="forum_thread"),
+    path("forum/thread/<int:pk>/events/", views.forum_thread_events, name="forum_thread_events"),
 
     path("account/profile/", views.profile_view, name="profile"),
+    path("account/activity/", views.activity_feed, name="activity_feed"),
     path("account/register/", views.register, name="register"),
 
     path("suggestions/", views.suggestion_list, name="suggestion_list"),
     path("suggestions/<int:pk>/", views.suggestion_review, name="suggestion_review"),
+    path("suggestions/review/", views.suggestion_bulk_review, name="suggestion_bulk_review"),
     path("species/<slug:species_slug>/suggest/", views.suggestion_create, name="suggestion_for_species"),
     path("suggest/", views.suggestion_create, name="suggestion_create"),
-]
-
-from django.conf import settings
-from django.conf.urls.static import static
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    # MEDIA_URL: Django picks access and cache policy, nginx sends the file.
+    path("media/<path:path>", views.media_file, name="media_file"),
+]
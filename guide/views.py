@@ -6,11 +6,16 @@ from django.contrib import messages
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.db.models import Q
-from django.db import transaction
+from django.db import IntegrityError, transaction
+from django.urls import reverse
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.core.paginator import Paginator
 
 from django.conf import settings
+import json
 import requests
 from urllib.parse import quote
+from datetime import date
 
 from .models import (
     Species,
@@ -20,19 +25,42 @@ from .models import (
     ForumSection,
     ForumThread,
     ForumPost,
-    SpeciesBookmark,
     SpeciesSuggestion,
     Profile,
+    FlightCalendarCount,
+    Revision,
+    InboxItem,
 )
 from .forms import (
     RegistrationForm,
     SpeciesFilterForm,
+    ClimateMatchForm,
     NuptialFlightForm,
     ForumThreadForm,
     ForumPostForm,
+    ForumSearchForm,
     SpeciesSuggestionForm,
     ProfileForm,
 )
+from .forum import ThreadLocked, publish_post
+from .ratelimit import ratelimit
+from .routing import primary_reads
+from . import seasonality, moderation, revisions, bookmarks, activity, live, delivery, carecards, facets, search
+
+try:
+    from . import geocoding
+except ImportError:  # Optional: region filters stay text searches without NumPy.
+    geocoding = None
+
+try:
+    from . import climate
+except ImportError:  # The climate matcher needs NumPy.
+    climate = None
+
+try:
+    from . import spam
+except ImportError:  # Without NumPy new posts are not screened for duplicates.
+    spam = None
 
 def ensure_demo_content():
     # Create a bit of starter data when the database is empty. 
@@ -307,7 +335,7 @@ def home(request):
     ensure_demo_content()
     popular_species = Species.objects.all()[:6]
     recent_flights = NuptialFlight.objects.select_related("species").all()[:5]
-    recent_threads = ForumThread.objects.select_related("section", "author").all()[:5]
+    recent_threads = ForumThread.objects.select_related("section", "author").filter(is_held=False)[:5]
     context = {
         "popular_species": popular_species,
         "recent_flights": recent_flights,
@@ -316,44 +344,41 @@ def home(request):
     return render(request, "guide/home.html", context)
 
 
+def species_filters(form):
+    # (search text, {facet: value}) from a SpeciesFilterForm; nothing when invalid.
+    if not form.is_bound or not form.is_valid():
+        return "", {}
+    data = form.cleaned_data
+    return data.get("q", ""), {f: data[f] for f in facets.FACETS if data.get(f)}
+
+
 def species_list(request):
     ensure_demo_content()
     form = SpeciesFilterForm(request.GET or None)
     species_qs = Species.objects.all()
+    q, selected = species_filters(form)
 
-    if form.is_valid():
-        q = form.cleaned_data.get("q")
-        difficulty = form.cleaned_data.get("difficulty")
-        region = form.cleaned_data.get("region")
-        founding_mode = form.cleaned_data.get("founding_mode")
-        diapause = form.cleaned_data.get("diapause")
-
-        if q:
-            species_qs = species_qs.filter(
-                Q(genus__icontains=q)
-                | Q(species__icontains=q)
-                | Q(common_name__icontains=q)
-            )
-        if difficulty:
-            species_qs = species_qs.filter(difficulty=difficulty)
-        if region:
-            species_qs = species_qs.filter(region=region)
-        if founding_mode:
-            species_qs = species_qs.filter(founding_mode=founding_mode)
-        if diapause:
-            species_qs = species_qs.filter(diapause=diapause)
+    if q:
+        species_qs = species_qs.filter(facets.search_filter(q))
+    species_qs = species_qs.filter(**selected)
+    _, counts = facets.facet_counts(selected, q)
+    form.show_counts(counts)
 
     context = {
         "form": form,
         "species_list": species_qs,
+        "bookmarked_ids": bookmarks.bookmarked_ids(request.user),
     }
     return render(request, "guide/species_list.html", context)
 
 
+MONTH_LABELS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+
 def species_detail(request, slug):
     species = get_object_or_404(Species, slug=slug)
     flights = species.flights.all()[:5]
-    threads = species.threads.all()[:5]
+    threads = species.threads.filter(is_held=False)[:5]
     vendors = species.vendors.all()
 
     try:
@@ -361,16 +386,22 @@ def species_detail(request, slug):
     except SpeciesCare.DoesNotExist:
         care = None
 
-    is_bookmarked = False
-    if request.user.is_authenticated:
-        is_bookmarked = SpeciesBookmark.objects.filter(
-            user=request.user,
-            species=species,
-        ).exists()
+    is_bookmarked = species.id in bookmarks.bookmarked_ids(request.user)
 
     compare_list = request.session.get("compare_species", [])
     in_compare = species.id in compare_list
 
+    month_counts = seasonality.species_calendar(species.id, period="month")
+    peak = max(month_counts)
+    flight_months = [
+        {
+            "label": month_label,
+            "count": count,
+            "percent": round(100 * count / peak) if peak else 0,
+        }
+        for month_label, count in zip(MONTH_LABELS, month_counts)
+    ]
+
     # If there is no uploaded thumbnail, try AntWeb first and then fall back to Wikipedia.
     external_image_url = None
     if not species.thumbnail:
@@ -387,22 +418,121 @@ def species_detail(request, slug):
         "is_bookmarked": is_bookmarked,
         "in_compare": in_compare,
         "external_image_url": external_image_url,
+        "flight_months": flight_months if peak else None,
     }
     return render(request, "guide/species_detail.html", context)
+
+
+BOOKMARK_BATCH_LIMIT = 500
+ACTIVITY_PAGE_SIZE = 30
+
+
+def wants_json(request):
+    return "application/json" in request.headers.get("Accept", "")
+
+
+@login_required
 def toggle_bookmark(request, pk):
     species = get_object_or_404(Species, pk=pk)
-    bookmark, created = SpeciesBookmark.objects.get_or_create(
-        user=request.user,
-        species=species,
-    )
-    if created:
+    if request.method != "POST":
+        return redirect("guide:species_detail", slug=species.slug)
+
+    bookmarked = bookmarks.toggle(request.user, species.id)
+    # The bookmark buttons post here with fetch() and just swap their label.
+    if wants_json(request):
+        return JsonResponse({"species_id": species.id, "bookmarked": bookmarked})
+    if bookmarked:
         messages.success(request, "Species added to your rainforest shelf.")
     else:
-        bookmark.delete()
         messages.info(request, "Species removed from your rainforest shelf.")
     return redirect("guide:species_detail", slug=species.slug)
 
 
+CLIMATE_RESULT_LIMIT = 50
+
+
+def climate_matches(form):
+    # (total, rows) for a valid ClimateMatchForm, from the in-memory index.
+    return climate.get_index().match(
+        temperature=form.range("temperature"),
+        humidity=form.range("humidity"),
+        mode=form.cleaned_data.get("mode") or "contains",
+        limit=CLIMATE_RESULT_LIMIT,
+    )
+
+
+def species_climate(request):
+    # "Which species suit my room?" Matches keeper conditions against the
+    # care ranges of every species.
+    form = ClimateMatchForm(request.GET or None)
+    total, results = None, []
+    if climate is not None and form.is_valid():
+        total, results = climate_matches(form)
+    context = {"form": form, "total": total, "results": results, "available": climate is not None}
+    return render(request, "guide/species_climate.html", context)
+
+
+def api_species_climate(request):
+    # ?temperature_min=22&temperature_max=26&humidity_min=50&humidity_max=70
+    # [&mode=contains|overlap] -> {"count": n, "results": [...]}, best fit first.
+    if climate is None:
+        return JsonResponse({"error": "The climate matcher needs NumPy installed."}, status=503)
+    form = ClimateMatchForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({"errors": form.errors}, status=400)
+    total, results = climate_matches(form)
+    return JsonResponse({"count": total, "results": results})
+
+
+def api_species_facets(request):
+    # Facet counts for the species filters, taking the same parameters as
+    # the species index: {"total": n, "facets": {facet: [{value, label, count}]}}.
+    form = SpeciesFilterForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({"errors": form.errors}, status=400)
+    q, selected = species_filters(form)
+    total, counts = facets.facet_counts(selected, q)
+    return JsonResponse(
+        {
+            "total": total,
+            "selected": selected,
+            "facets": {
+                name: [{"value": value, "label": label, "count": counts[name][value]} for value, label in choices]
+                for name, choices in facets.FACETS.items()
+            },
+        }
+    )
+
+
+def api_bookmarks(request):
+    # GET: the user's bookmarked species ids.
+    # POST {"add": [ids], "remove": [ids]}: change many at once.
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "login required"}, status=401)
+
+    added = removed = set()
+    if request.method == "POST":
+        try:
+            body = json.loads(request.body or b"{}")
+            add = [int(pk) for pk in body.get("add", [])]
+            remove = [int(pk) for pk in body.get("remove", [])]
+        except (ValueError, TypeError, AttributeError):
+            return JsonResponse({"error": "expected {\"add\": [ids], \"remove\": [ids]}"}, status=400)
+        if len(add) + len(remove) > BOOKMARK_BATCH_LIMIT:
+            return JsonResponse({"error": f"at most {BOOKMARK_BATCH_LIMIT} ids per request"}, status=400)
+        added, removed = bookmarks.update(request.user, add=add, remove=remove)
+    elif request.method != "GET":
+        return JsonResponse({"error": "method not allowed"}, status=405)
+
+    return JsonResponse(
+        {
+            "species_ids": sorted(bookmarks.bookmarked_ids(request.user)),
+            "added": sorted(added),
+            "removed": sorted(removed),
+        }
+    )
+
+
 @login_required
 def add_to_compare(request, pk):
     species = get_object_or_404(Species, pk=pk)
@@ -421,21 +551,41 @@ def species_compare(request):
 
 
 def clear_compare(request):
-    request.session["compare_species"] = []
-    messages.info(request, "Compare tray cleared.")
+    # pop() leaves the session untouched when the tray was already empty, and
+    # an emptied session is dropped rather than saved.
+    if request.session.pop("compare_species", None):
+        messages.info(request, "Compare tray cleared.")
     return redirect("guide:species_list")
 
 
+def flight_region_lookup(region):
+    # Subdivision codes ("US-WA") hit the indexed code column; other text
+    # falls back to searching what reporters typed.
+    if geocoding is None:
+        return {"region__icontains": region}
+    return geocoding.region_lookup(region)
+
+
+def flight_code_lookup(code):
+    # ?code= is always a country ("DE") or subdivision ("US-WA") code. The
+    # code columns are only filled when NumPy is installed.
+    code = code.strip().upper()
+    return {"admin1_code": code} if "-" in code else {"country_code": code}
+
+
 def flights_list(request):
     ensure_demo_content()
     flights = NuptialFlight.objects.select_related("species").all()
     species_id = request.GET.get("species")
     region = request.GET.get("region")
+    code = request.GET.get("code")
 
     if species_id:
         flights = flights.filter(species_id=species_id)
     if region:
-        flights = flights.filter(region__icontains=region)
+        flights = flights.filter(**flight_region_lookup(region))
+    if code:
+        flights = flights.filter(**flight_code_lookup(code))
 
     species_options = Species.objects.all()
     context = {
@@ -445,17 +595,99 @@ def flights_list(request):
     return render(request, "guide/flights.html", context)
 
 
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def compact_flights_payload(qs):
+    # Columnar form of the flight list: species and reporters are sent once in
+    # lookup tables and each flight is a position in parallel arrays. Built
+    # straight from values_list() so no model instances are created.
+    rows = list(
+        qs.values_list(
+            "id",
+            "species_id",
+            "event_id",
+            "user__username",
+            "latitude",
+            "longitude",
+            "date",
+            "location_name",
+            "region",
+        )
+    )
+
+    species_index = {}
+    reporter_index = {}
+    reporters = []
+    payload = {
+        "format": "compact",
+        "id": [],
+        "event_id": [],
+        "species_index": [],
+        "reporter_index": [],
+        "lat": [],
+        "lng": [],
+        "date": [],
+        "location_name": [],
+        "region": [],
+    }
+    for flight_id, species_id, event_id, username, lat, lng, day, location_name, region in rows:
+        if species_id not in species_index:
+            species_index[species_id] = len(species_index)
+        if username is None:
+            reporter = -1
+        else:
+            reporter = reporter_index.get(username)
+            if reporter is None:
+                reporter = reporter_index[username] = len(reporters)
+                reporters.append(username)
+
+        payload["id"].append(flight_id)
+        payload["event_id"].append(event_id)
+        payload["species_index"].append(species_index[species_id])
+        payload["reporter_index"].append(reporter)
+        payload["lat"].append(lat)
+        payload["lng"].append(lng)
+        payload["date"].append(day.toordinal() - EPOCH_ORDINAL)
+        payload["location_name"].append(location_name)
+        payload["region"].append(region)
+
+    species_rows = {
+        row[0]: row
+        for row in Species.objects.filter(id__in=species_index).values_list(
+            "id", "slug", "genus", "species", "common_name"
+        )
+    }
+    species = [None] * len(species_index)
+    for species_id, position in species_index.items():
+        _, slug, genus, sp, common_name = species_rows[species_id]
+        species[position] = {
+            "id": species_id,
+            "slug": slug,
+            "name": Species.format_display_name(genus, sp, common_name),
+        }
+
+    payload["species"] = species
+    payload["reporters"] = reporters
+    return payload
+
+
 def api_flights(request):
     # Return nuptial flights as JSON for the map and table views.
+    # ?format=compact returns parallel arrays instead of one object per flight
+    # (dates there are days since 1970-01-01, reporter -1 means anonymous).
     ensure_demo_content()
-    qs = NuptialFlight.objects.select_related("species").all()
+    qs = NuptialFlight.objects.select_related("species", "user").all()
 
     species_id = request.GET.get("species")
     region = request.GET.get("region")
+    code = request.GET.get("code")
     if species_id:
         qs = qs.filter(species_id=species_id)
     if region:
-        qs = qs.filter(region__icontains=region)
+        qs = qs.filter(**flight_region_lookup(region))
+    if code:
+        qs = qs.filter(**flight_code_lookup(code))
 
     try:
         limit = int(request.GET.get("limit", 500))
@@ -464,27 +696,104 @@ def api_flights(request):
     limit = max(1, min(limit, 1000))
     qs = qs[:limit]
 
-    results = []
-    for flight in qs:
-        results.append(
-            {
-                "id": flight.id,
-                "species_id": flight.species_id,
-                "species_name": flight.species.display_name(),
-                "species_slug": flight.species.slug,
-                "date": flight.date.isoformat(),
-                "location_name": flight.location_name,
-                "region": flight.region,
-                "latitude": flight.latitude,
-                "longitude": flight.longitude,
-                "reporter": flight.user.username if flight.user else None,
-            }
-        )
+    if request.GET.get("format") == "compact":
+        return JsonResponse(compact_flights_payload(qs))
 
-    return JsonResponse({"results": results})
+    return JsonResponse({"results": [flight.as_json() for flight in qs]})
+
+
+FLIGHT_CATCH_UP_LIMIT = 200
+
+
+def api_flight_events(request):
+    # Server-sent stream of newly reported flights for the map. Reports
+    # missed since Last-Event-ID (or ?after=) are replayed first, filtered
+    # like /api/flights/; live events carry species and area codes so the
+    # page filters those itself.
+    after = live.last_event_id(request)
+    species_id = request.GET.get("species")
+    region = request.GET.get("region")
+    code = request.GET.get("code")
+
+    def catch_up():
+        if after is None:
+            return
+        qs = NuptialFlight.objects.select_related("species", "user").filter(pk__gt=after)
+        if species_id:
+            qs = qs.filter(species_id=species_id)
+        if region:
+            qs = qs.filter(**flight_region_lookup(region))
+        if code:
+            qs = qs.filter(**flight_code_lookup(code))
+        for flight in qs.order_by("pk")[:FLIGHT_CATCH_UP_LIMIT]:
+            yield flight.pk, flight.as_json()
+
+    return live.stream("flights", "flight", catch_up)
+
+
+def api_flight_calendar(request):
+    # Flights per ISO week (or month) for one species, read from the
+    # precomputed FlightCalendarCount table.
+    species_param = request.GET.get("species", "")
+    lookup = {"pk": species_param} if species_param.isdigit() else {"slug": species_param}
+    species = get_object_or_404(Species, **lookup)
+
+    period = request.GET.get("period", "week")
+    if period not in dict(FlightCalendarCount.PERIOD_CHOICES):
+        return JsonResponse({"error": "period must be 'week' or 'month'"}, status=400)
+    region = request.GET.get("region") or None
+    if region and region not in dict(FlightCalendarCount.REGION_CHOICES):
+        return JsonResponse({"error": f"unknown region {region!r}"}, status=400)
+
+    return JsonResponse(
+        {
+            "species": {"id": species.id, "slug": species.slug, "name": species.display_name()},
+            "period": period,
+            "region": region,
+            "counts": seasonality.species_calendar(species.id, period=period, region=region),
+        }
+    )
+
+
+def api_flights_likely(request):
+    # "Likely flying near you this week", answered from the in-memory season
+    # model without querying the flights table.
+    try:
+        from . import prediction
+    except ImportError:
+        return JsonResponse({"error": "Season predictions need NumPy installed."}, status=503)
+
+    try:
+        latitude = float(request.GET["lat"])
+        longitude = float(request.GET["lng"])
+    except (KeyError, TypeError, ValueError):
+        return JsonResponse({"error": "lat and lng are required numbers"}, status=400)
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return JsonResponse({"error": "lat/lng out of range"}, status=400)
+
+    try:
+        day = date.fromisoformat(request.GET["date"]) if request.GET.get("date") else timezone.now().date()
+        days = max(1, min(int(request.GET.get("days", 7)), 31))
+        limit = max(1, min(int(request.GET.get("limit", 10)), 50))
+    except ValueError:
+        return JsonResponse({"error": "invalid date, days or limit"}, status=400)
+
+    model = prediction.get_model()
+    if model is None:
+        return JsonResponse({"error": "The season model has not been trained yet."}, status=503)
+
+    return JsonResponse(
+        {
+            "date": day.isoformat(),
+            "days": days,
+            "trained_on": model.trained_on,
+            "results": model.likely_flying(latitude, longitude, day, days=days, limit=limit),
+        }
+    )
 
 
 @login_required
+@ratelimit("flights_add")
 def flights_add(request):
     if request.method == "POST":
         form = NuptialFlightForm(request.POST)
@@ -513,13 +822,71 @@ def forum_index(request):
     return render(request, "guide/forum_index.html", {"sections": sections})
 
 
+FORUM_SECTION_PAGE_SIZE = 50
+
+
 def forum_section_detail(request, slug):
     section = get_object_or_404(ForumSection, slug=slug)
-    threads = section.threads.select_related("author").all()
-    return render(request, "guide/forum_section.html", {"section": section, "threads": threads})
+    # Newest activity first (thread_section_idx), a page at a time.
+    threads = section.threads.select_related("author", "species").filter(is_held=False).order_by("-updated_at", "-id")
+    page = Paginator(threads, FORUM_SECTION_PAGE_SIZE).get_page(request.GET.get("page"))
+    return render(request, "guide/forum_section.html", {"section": section, "threads": page, "page": page})
+
+
+SEARCH_PAGE_SIZE = 20
+SEARCH_THREAD_LIMIT = 5
+
+
+def forum_search(request):
+    form = ForumSearchForm(request.GET or None)
+    context = {"form": form, "threads": [], "posts": [], "next_url": None, "previous_url": None}
+    if form.is_valid():
+        data = form.cleaned_data
+        filters = dict(
+            section_id=data["section"].pk if data["section"] else None,
+            species_id=data["species"].pk if data["species"] else None,
+            order=data["order"] or "relevance",
+        )
+        page = data["page"] or 1
+        # One row past the page tells whether there is a next one, without
+        # counting every match.
+        post_hits = search.search(
+            ForumPost, data["q"], limit=SEARCH_PAGE_SIZE + 1, offset=(page - 1) * SEARCH_PAGE_SIZE, **filters
+        )
+        posts = ForumPost.objects.select_related("author", "thread", "thread__section").in_bulk(
+            [pk for pk, _ in post_hits]
+        )
+        context["posts"] = [(posts[pk], snippet) for pk, snippet in post_hits[:SEARCH_PAGE_SIZE] if pk in posts]
+        if page == 1:
+            thread_hits = search.search(ForumThread, data["q"], limit=SEARCH_THREAD_LIMIT, **filters)
+            threads = ForumThread.objects.select_related("section").in_bulk([pk for pk, _ in thread_hits])
+            context["threads"] = [(threads[pk], snippet) for pk, snippet in thread_hits if pk in threads]
+
+        params = request.GET.copy()
+        if len(post_hits) > SEARCH_PAGE_SIZE:
+            params["page"] = page + 1
+            context["next_url"] = "?" + params.urlencode()
+        if page > 1:
+            params["page"] = page - 1
+            context["previous_url"] = "?" + params.urlencode()
+        context["species"] = data["species"]
+        context["searched"] = True
+    return render(request, "guide/forum_search.html", context)
+
+
+def visible_threads(user):
+    # Held threads are visible to their author only, like held posts.
+    visible = Q(is_held=False)
+    if user.is_authenticated:
+        visible |= Q(author=user)
+    return ForumThread.objects.filter(visible)
+
+
+HELD_MESSAGE = "Your post looks very like another recent post, so a moderator will check it before it appears."
 
 
 @login_required
+@ratelimit("forum_thread_create")
 def forum_thread_create(request, slug):
     section = get_object_or_404(ForumSection, slug=slug)
     if request.method == "POST":
@@ -529,12 +896,22 @@ def forum_thread_create(request, slug):
             thread = thread_form.save(commit=False)
             thread.section = section
             thread.author = request.user
-            thread.save()
             post = post_form.save(commit=False)
-            post.thread = thread
             post.author = request.user
-            post.save()
-            messages.success(request, "Thread created.")
+            if spam is not None:
+                # Screen the opening post before the thread exists: if it is
+                # held, so is the thread, which keeps the title out of lists,
+                # search and followers' feeds until a moderator releases it.
+                spam.screen(post)
+            thread.is_held = post.is_held
+            with transaction.atomic():
+                thread.save()
+                post.thread = thread
+                post.save()
+            if post.is_held:
+                messages.warning(request, HELD_MESSAGE)
+            else:
+                messages.success(request, "Thread created.")
             return redirect("guide:forum_thread", pk=thread.pk)
     else:
         thread_form = ForumThreadForm()
@@ -546,9 +923,9 @@ def forum_thread_create(request, slug):
     )
 
 
+@ratelimit("forum_post")
 def forum_thread_detail(request, pk):
-    thread = get_object_or_404(ForumThread, pk=pk)
-    posts = thread.posts.select_related("author").all()
+    thread = get_object_or_404(visible_threads(request.user), pk=pk)
     post_form = None
 
     if request.user.is_authenticated and not thread.is_locked:
@@ -556,18 +933,52 @@ def forum_thread_detail(request, pk):
             post_form = ForumPostForm(request.POST)
             if post_form.is_valid():
                 post = post_form.save(commit=False)
-                post.thread = thread
                 post.author = request.user
-                post.save()
-                messages.success(request, "Reply posted.")
+                try:
+                    publish_post(post, thread.pk)
+                except ThreadLocked:
+                    messages.error(request, "This thread was locked before your reply was posted.")
+                else:
+                    if post.is_held:
+                        messages.warning(request, HELD_MESSAGE)
+                    else:
+                        messages.success(request, "Reply posted.")
                 return redirect("guide:forum_thread", pk=thread.pk)
         else:
             post_form = ForumPostForm()
 
-    context = {"thread": thread, "posts": posts, "post_form": post_form}
+    # Held posts are visible to their author only.
+    visible = Q(is_held=False)
+    if request.user.is_authenticated:
+        visible |= Q(author=request.user)
+    posts = list(thread.posts.select_related("author").filter(visible))
+    context = {
+        "thread": thread,
+        "posts": posts,
+        "post_form": post_form,
+        "last_post_id": max((post.pk for post in posts), default=0),
+    }
     return render(request, "guide/forum_thread.html", context)
 
 
+POST_CATCH_UP_LIMIT = 100
+
+
+def forum_thread_events(request, pk):
+    # Server-sent stream of new replies to one thread.
+    thread = get_object_or_404(visible_threads(request.user).only("pk"), pk=pk)
+    after = live.last_event_id(request)
+
+    def catch_up():
+        if after is None:
+            return
+        posts = thread.posts.select_related("author").filter(pk__gt=after, is_held=False).order_by("pk")
+        for post in posts[:POST_CATCH_UP_LIMIT]:
+            yield post.pk, live.post_event(post)
+
+    return live.stream(f"thread:{thread.pk}", "post", catch_up)
+
+
 @login_required
 def profile_view(request):
     profile, created = Profile.objects.get_or_create(user=request.user)
@@ -589,14 +1000,39 @@ def profile_view(request):
         "flights": flights,
         "bookmarks": bookmarks,
         "posts": posts,
+        "unread_activity": request.user.inbox.filter(read_at__isnull=True).count(),
     }
     return render(request, "guide/profile.html", context)
 
 
+@login_required
+@primary_reads
+def activity_feed(request):
+    # The user's inbox, newest first, paged by id (?before=<id>).
+    items = request.user.inbox.select_related("activity", "activity__actor")
+    before = request.GET.get("before", "")
+    if before.isdigit():
+        items = items.filter(pk__lt=int(before))
+    items = list(items[:ACTIVITY_PAGE_SIZE + 1])
+    page, more = items[:ACTIVITY_PAGE_SIZE], len(items) > ACTIVITY_PAGE_SIZE
+
+    unread = [item.pk for item in page if item.read_at is None]
+    if unread:
+        InboxItem.objects.filter(pk__in=unread).update(read_at=timezone.now())
+
+    context = {
+        "items": page,
+        "unread": set(unread),
+        "next_before": page[-1].pk if more else None,
+    }
+    return render(request, "guide/activity_feed.html", context)
+
+
 def about(request):
     return render(request, "guide/about.html")
 
 
+@ratelimit("register")
 def register(request):
     if request.method == "POST":
         form = RegistrationForm(request.POST)
@@ -611,6 +1047,7 @@ def register(request):
 
 
 @login_required
+@ratelimit("suggestion_create")
 def suggestion_create(request, species_slug=None):
     initial = {}
     species = None
@@ -643,8 +1080,45 @@ def staff_check(user):
 
 @user_passes_test(staff_check)
 def suggestion_list(request):
-    suggestions = SpeciesSuggestion.objects.all()
-    return render(request, "guide/suggestion_list.html", {"suggestions": suggestions})
+    # Moderation queue: keyset-paginated by status, with bulk actions.
+    status = request.GET.get("status", "pending")
+    if status not in moderation.QUEUE_STATUSES and status != "all":
+        status = "pending"
+    try:
+        per_page = int(request.GET.get("per_page", moderation.PAGE_SIZE))
+    except (TypeError, ValueError):
+        per_page = moderation.PAGE_SIZE
+    per_page = max(1, min(per_page, moderation.MAX_PAGE_SIZE))
+
+    suggestions, next_cursor = moderation.queue_page(status, request.GET.get("after"), per_page)
+    context = {
+        "suggestions": suggestions,
+        "status": status,
+        "status_choices": SpeciesSuggestion.STATUS_CHOICES,
+        "per_page": per_page,
+        "next_cursor": next_cursor,
+        "reviewer_stats": moderation.reviewer_stats(),
+    }
+    return render(request, "guide/suggestion_list.html", context)
+
+
+@user_passes_test(staff_check)
+def suggestion_bulk_review(request):
+    if request.method != "POST":
+        return redirect("guide:suggestion_list")
+
+    action = request.POST.get("action")
+    ids = [int(pk) for pk in request.POST.getlist("ids") if pk.isdigit()]
+    if action in ["approve", "reject"] and ids:
+        changed = moderation.review(ids, action, request.user)
+        messages.success(request, f"{changed} suggestion{'s' if changed != 1 else ''} {action}d.")
+    else:
+        messages.info(request, "Select suggestions and an action first.")
+
+    next_url = request.POST.get("next", "")
+    if url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}, require_https=request.is_secure()):
+        return redirect(next_url)
+    return redirect("guide:suggestion_list")
 
 
 @user_passes_test(staff_check)
@@ -654,93 +1128,90 @@ def suggestion_review(request, pk):
     if request.method == "POST":
         action = request.POST.get("action")
         if action in ["approve", "reject"]:
-            suggestion.status = "approved" if action == "approve" else "rejected"
-            suggestion.reviewer = request.user
-            suggestion.reviewed_at = timezone.now()
-            suggestion.save()
-
-            if action == "approve" and not suggestion.species:
-                species = Species.objects.create(
-                    slug=f"{suggestion.proposed_genus.lower()}-{suggestion.proposed_species.lower()}",
-                    genus=suggestion.proposed_genus,
-                    species=suggestion.proposed_species,
-                    common_name=suggestion.proposed_common_name,
-                    difficulty="medium",
-                    region="temperate",
-                    founding_mode="claustral",
-                    diapause="required",
-                )
-                suggestion.species = species
-                suggestion.save()
-
-            messages.success(request, "Suggestion updated.")
+            if moderation.review([suggestion.pk], action, request.user):
+                messages.success(request, "Suggestion updated.")
+            else:
+                messages.info(request, "That suggestion was already reviewed.")
             return redirect("guide:suggestion_list")
 
+    moderation.annotate_duplicates([suggestion])
     return render(request, "guide/suggestion_review.html", {"suggestion": suggestion})
 
 
-def care_card_pdf(request, slug):
+@user_passes_test(staff_check)
+def species_history(request, slug):
+    # Revision history for a species and its care record, with a diff
+    # between any two revisions (?target=care&a=3&b=7) and restore.
     species = get_object_or_404(Species, slug=slug)
+    target = request.GET.get("target") or request.POST.get("target") or "care"
+    if target not in revisions.TARGETS:
+        target = "care"
+
+    if request.method == "POST":
+        try:
+            number = int(request.POST.get("number", ""))
+            restored = revisions.restore(target, species.pk, number, author=request.user)
+        except (ValueError, Revision.DoesNotExist):
+            messages.error(request, "That revision does not exist.")
+        except IntegrityError:
+            messages.error(request, "That revision conflicts with another species (the slug is taken).")
+        else:
+            messages.success(request, f"Restored revision {number}.")
+            if target == "species":
+                species = restored
+        return redirect(f"{reverse('guide:species_history', kwargs={'slug': species.slug})}?target={target}")
+
+    history = list(revisions.history(target, species.pk))
+    wants_json = request.GET.get("format") == "json"
+    changes = a = b = None
+    if history and (wants_json or "a" in request.GET or "b" in request.GET):
+        try:
+            b = int(request.GET.get("b") or history[0].number)
+            a = int(request.GET.get("a") or max(b - 1, 1))
+            changes = revisions.diff(target, species.pk, a, b)
+        except (ValueError, Revision.DoesNotExist):
+            if wants_json:
+                return JsonResponse({"error": "unknown revision"}, status=404)
+            messages.error(request, "That revision does not exist.")
+        else:
+            if wants_json:
+                return JsonResponse({"target": target, "from": a, "to": b, "changes": changes})
+
+    context = {
+        "species": species,
+        "target": target,
+        "targets": Revision.TARGET_CHOICES,
+        "history": history,
+        "changes": changes,
+        "a": a,
+        "b": b,
+    }
+    return render(request, "guide/species_history.html", context)
+
+
+def care_card_pdf(request, slug):
+    species = get_object_or_404(Species.objects.select_related("care"), slug=slug)
 
     try:
-        from reportlab.lib.pagesizes import letter
-        from reportlab.pdfgen import canvas
+        import reportlab  # noqa: F401
     except ImportError:
         return HttpResponse(
             "ReportLab is not installed. Add it to requirements.txt to enable care cards.",
             content_type="text/plain",
         )
 
-    response = HttpResponse(content_type="application/pdf")
+    # Rendered once per version of the text and handed to nginx like any
+    # other media file. The URL stays the same across edits, so browsers
+    # revalidate (nginx answers with 304 while the card is unchanged).
+    name = carecards.care_card(species)
     filename = f"{species.genus}_{species.species}_care_card.pdf".replace(" ", "_")
-    response["Content-Disposition"] = f'attachment; filename="{filename}"'
-
-    p = canvas.Canvas(response, pagesize=letter)
-    width, height = letter
+    return delivery.send_file(name, download_name=filename, cache="public, no-cache")
 
-    y = height - 72
-    p.setFont("Helvetica-Bold", 16)
-    p.drawString(72, y, f"Care card for {species.display_name()}")
-    y -= 30
-
-    try:
-        care = species.care
-    except SpeciesCare.DoesNotExist:
-        care = None
 
-    p.setFont("Helvetica", 11)
-    lines = []
-
-    if care:
-        lines.append(f"Temperature: {care.temperature_min_c} to {care.temperature_max_c} C")
-        lines.append(f"Humidity: {care.humidity_min} to {care.humidity_max} percent")
-        lines.append(f"Diapause: {species.get_diapause_display()}")
-        lines.append("")
-        lines.append("Founding setup:")
-        lines.extend(care.founding_setup.splitlines())
-        lines.append("")
-        lines.append("Small colony setup:")
-        lines.extend(care.small_colony_setup.splitlines())
-        lines.append("")
-        lines.append("Diet:")
-        lines.extend(care.diet.splitlines())
-        lines.append("")
-        lines.append("Common issues:")
-        lines.extend(care.common_issues.splitlines())
-    else:
-        lines.append("No detailed care record has been added for this species yet.")
-
-    for line in lines:
-        if y < 72:
-            p.showPage()
-            y = height - 72
-            p.setFont("Helvetica", 11)
-        p.drawString(72, y, line[:100])
-        y -= 14
-
-    p.showPage()
-    p.save()
-    return response
+def media_file(request, path):
+    # Uploaded and generated media. Django only decides whether and how long
+    # a file may be cached; nginx sends the bytes (see guide.delivery).
+    return delivery.send_file(delivery.public_name(path))
 
 
 def server_info(request):